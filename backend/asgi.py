@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Read by backend/database.py: no persistent connections by default under ASGI
+os.environ.setdefault('DJANGO_SERVER', 'asgi')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# /api/live/ (Server-Sent Events) is answered in front of Django, everything else goes to it
+from listings.live import LiveEventsApp  # noqa: E402  (needs the apps loaded above)
+
+application = LiveEventsApp(django_application)
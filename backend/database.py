@@ -0,0 +1,84 @@
+"""
+Builds settings.DATABASES['default'].
+
+Knobs (all environment variables):
+    DATABASE_URL            PostgreSQL URL on Render; SQLite file locally when unset
+    DB_CONN_MAX_AGE         seconds to keep a connection between requests (0 = close every request). Default 600
+                            under WSGI, 0 under ASGI: each async request runs its sync code on a new thread, so
+                            persistent connections would pile up (use DB_POOL there for reuse)
+    DB_CONN_HEALTH_CHECKS   ping reused connections before handing them out (default on)
+    DB_POOL                 use psycopg 3's connection pool instead of persistent connections
+    DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE / DB_POOL_TIMEOUT
+    SQLITE_BUSY_TIMEOUT     seconds a writer waits for the lock before "database is locked" (default 20)
+    SQLITE_MMAP_SIZE        bytes of the file to memory-map (default 128 MB)
+"""
+import os
+import warnings
+
+import dj_database_url
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _sqlite_options():
+    # WAL lets readers carry on while one writer commits, and synchronous=NORMAL
+    # is safe in WAL mode (only the last transactions can be lost on power failure).
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return {
+        'init_command': ';'.join(pragmas) + ';',
+        # sqlite3.connect(timeout=...) is the busy_timeout
+        'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+        # Take the write lock up front so two writers can't deadlock upgrading a read lock
+        'transaction_mode': 'IMMEDIATE',
+    }
+
+
+def _pool_options():
+    try:
+        import psycopg_pool  # noqa: F401  (psycopg 3 only, psycopg2 has no pool support in Django)
+    except ImportError:
+        warnings.warn("DB_POOL is set but psycopg[pool] is not installed; using persistent connections instead.")
+        return None
+    return {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+
+def database_config(base_dir):
+    # DJANGO_SERVER is set by backend/asgi.py before the settings load
+    asgi = os.environ.get('DJANGO_SERVER') == 'asgi'
+    conn_max_age = int(os.environ.get('DB_CONN_MAX_AGE', 0 if asgi else 600))
+    health_checks = _env_bool('DB_CONN_HEALTH_CHECKS', True)
+
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        # DEFAULT: Use SQLite locally (No passwords, no installation needed)
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': base_dir / 'db.sqlite3',
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': health_checks,
+            'OPTIONS': _sqlite_options(),
+        }
+
+    config = dj_database_url.parse(database_url, conn_max_age=conn_max_age, conn_health_checks=health_checks)
+
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        config.setdefault('OPTIONS', {}).update(_sqlite_options())
+    elif config['ENGINE'] == 'django.db.backends.postgresql' and _env_bool('DB_POOL', False):
+        pool = _pool_options()
+        if pool:
+            # The pool owns connection lifetime; Django refuses CONN_MAX_AGE alongside it
+            config.setdefault('OPTIONS', {})['pool'] = pool
+            config['CONN_MAX_AGE'] = 0
+
+    return config
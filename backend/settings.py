@@ -10,9 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 import os
-import dj_database_url
 from pathlib import Path
 
+from backend.database import database_config
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,14 +45,17 @@ INSTALLED_APPS = [
     'rest_framework',
     'listings',
     'corsheaders',
-    'cloudinary_storage',
-    'cloudinary',
     'rest_framework.authtoken',
 ]
 
+# --- NEW: Cloudinary only stores media on Render; elsewhere loading it just slows down every worker's boot ---
+if 'RENDER' in os.environ:
+    INSTALLED_APPS += ['cloudinary_storage', 'cloudinary']
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # <--- ADD THIS right after SecurityMiddleware
+    'listings.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -61,6 +65,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'listings.querylog.SlowQueryMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -98,19 +103,20 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 # ... (keep other settings) ...
 
-# DEFAULT: Use SQLite locally (No passwords, no installation needed)
+# DEFAULT: SQLite locally (WAL mode, see backend/database.py)
+# OVERRIDE: On Render, 'DATABASE_URL' points at the real PostgreSQL database.
+# Under WSGI both keep connections open between requests (DB_CONN_MAX_AGE) with health checks;
+# under ASGI they close after each request unless DB_POOL is on.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
-# OVERRIDE: If we are on Render, use the real PostgreSQL database
-# Render automatically sets the 'DATABASE_URL' environment variable
-database_url = os.environ.get("DATABASE_URL")
-if database_url:
-    DATABASES["default"] = dj_database_url.parse(database_url)
+# --- SLOW QUERY CAPTURE ---
+# Statements slower than this (in milliseconds) are recorded with their EXPLAIN
+# plan and shown at /admin/slow-queries/. Set SLOW_QUERY_MS=off to disable.
+_slow_query_ms = os.environ.get('SLOW_QUERY_MS', '200')
+SLOW_QUERY_MS = None if _slow_query_ms.lower() == 'off' else float(_slow_query_ms)
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', '200'))
 
 
 
@@ -170,6 +176,10 @@ CORS_ALLOWED_ORIGINS = [
     "https://www.studenthousing.co.zw", # NEW DOMAIN (WWW)
 ]
 
+# Let the frontend send Idempotency-Key on booking requests
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:5173",
@@ -197,9 +207,56 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    # orjson-backed when installed, identical output to DRF's JSONRenderer otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'listings.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'listings.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Proxies in front of the app that append to X-Forwarded-For (Render has one). The client IP used
+    # for throttling is taken that many entries from the end; with 0 it's REMOTE_ADDR and the header,
+    # which anyone can forge, is ignored
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1 if 'RENDER' in os.environ else 0)),
 }
 
+# --- LISTING RANKING (listings/features.py, listings/ranking.py) ---
+FEATURE_SNAPSHOT_TTL = 300  # seconds before a worker rebuilds its in-memory listing snapshot from the DB
+# VALUE_SCORE_WEIGHTS = {'price': 0.35, 'distance': 0.25, ...}  # overrides ranking.DEFAULT_WEIGHTS
+
+# --- BACKGROUND WORK (listings/tasks.py) ---
+BACKGROUND_WORKERS = 2  # threads per process for alerts and other off-request work
+
+# --- API RESPONSE COMPRESSION (listings/compression.py) ---
+API_COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies aren't worth compressing
+API_COMPRESS_CACHE_BYTES = 8 * 1024 * 1024  # compressed bodies kept for reuse, per worker
+
+# --- MAP TILES (listings/maptiles.py) ---
+MAPTILES_CACHE = 'default'  # tiles + invalidation counter; must be a cache all workers share with more than one
+
+# --- RATE LIMITS (listings/throttling.py) ---
+THROTTLE_BACKEND = os.environ.get('THROTTLE_BACKEND', 'local')  # 'cache' shares buckets between workers
+THROTTLE_CACHE = 'default'  # cache alias used when THROTTLE_BACKEND = 'cache'
+# THROTTLE_RATES = {'whatsapp': '20/min', 'token_user': '10/min', ...}  # overrides throttling.DEFAULT_RATES; None disables one
+
+# --- IDEMPOTENT BOOKINGS / WEBHOOK RETRIES (listings/idempotency.py) ---
+IDEMPOTENCY_TTL = 24 * 3600  # seconds a booking response / webhook reply is kept for replays
+IDEMPOTENCY_CACHE = 'default'  # use a shared cache with more than one worker
+
+# --- LIVE UPDATES (listings/live.py; SSE at /api/live/, ASGI only) ---
+LIVE_MAX_CONNECTIONS = int(os.environ.get('LIVE_MAX_CONNECTIONS', 10000))  # open streams per worker
+LIVE_QUEUE_SIZE = 100  # events buffered per stream before it's told to resync
+LIVE_HEARTBEAT = 20  # seconds between keep-alive comments on an idle stream
+
+# --- SCHEDULED JOBS (listings/jobs.py, run by `manage.py run_scheduler`) ---
+SCHEDULER_POLL_SECONDS = 30  # how often the scheduler checks for due jobs
+BOOKING_PENDING_DAYS = 14  # pending requests older than this are marked expired
+MEDIA_GC_GRACE_HOURS = 24  # orphaned uploads younger than this are kept (gc_media / prune_orphaned_media)
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1), # Token lasts 1 day for convenience
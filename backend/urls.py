@@ -21,6 +21,7 @@ from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.http import HttpResponse
 from django.contrib.auth.models import User
+from listings.admin import duplicate_listings_view, slow_queries_view
 
 
 def emergency_reset(request):
@@ -46,6 +47,8 @@ def emergency_reset(request):
 
 
 urlpatterns = [
+    path('admin/slow-queries/', admin.site.admin_view(slow_queries_view), name='admin-slow-queries'),
+    path('admin/duplicate-listings/', admin.site.admin_view(duplicate_listings_view), name='admin-duplicate-listings'),
     path('admin/', admin.site.urls),
     path('api/', include('listings.urls')),
     path('api/', include('listings.urls')),
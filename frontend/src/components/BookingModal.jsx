@@ -19,6 +19,8 @@ const BookingModal = ({
   });
   const [loading, setLoading] = useState(false);
   const [status, setStatus] = useState("idle");
+  // Same key for every retry/double-click of this request, so the server books it only once
+  const [idempotencyKey, setIdempotencyKey] = useState(() => crypto.randomUUID());
 
   if (!isOpen) return null;
 
@@ -55,10 +57,16 @@ const BookingModal = ({
           move_in_date: formData.move_in_date,
           message: formData.message,
         },
-        { headers: { Authorization: `Bearer ${token}` } },
+        {
+          headers: {
+            Authorization: `Bearer ${token}`,
+            "Idempotency-Key": idempotencyKey,
+          },
+        },
       );
 
       setStatus("success");
+      setIdempotencyKey(crypto.randomUUID());
       setTimeout(() => {
         onClose();
         setStatus("idle");
@@ -40,6 +40,28 @@ const campusIcon = new L.Icon({
 const NUST_LAT = -20.165;
 const NUST_LNG = 28.642;
 
+// --- NEW: LOCAL COPY OF THE CATALOGUE, KEPT UP TO DATE THROUGH /api/properties/changes/ ---
+// (per user, since is_favorited differs between users)
+const replicaKey = () =>
+  `listings_replica:${localStorage.getItem("username") || "anonymous"}`;
+
+const loadReplica = () => {
+  try {
+    return JSON.parse(localStorage.getItem(replicaKey()));
+  } catch {
+    return null;
+  }
+};
+
+const saveReplica = (replica) => {
+  try {
+    localStorage.setItem(replicaKey(), JSON.stringify(replica));
+  } catch {
+    // Storage full: the next visit just does a full sync
+    localStorage.removeItem(replicaKey());
+  }
+};
+
 const Listings = () => {
   const [properties, setProperties] = useState([]);
   const [filteredProperties, setFilteredProperties] = useState([]);
@@ -76,35 +98,82 @@ const Listings = () => {
     const token = localStorage.getItem("access_token");
     const headers = token ? { Authorization: `Bearer ${token}` } : {};
 
-    axios
-      .get(import.meta.env.VITE_API_URL + "/api/properties/", { headers })
-      .then((res) => {
-        const processedProperties = res.data.map((p) => {
-          const avgRating =
-            p.reviews && p.reviews.length > 0
-              ? (
-                  p.reviews.reduce((sum, r) => sum + r.rating, 0) /
-                  p.reviews.length
-                ).toFixed(1)
-              : null;
-
-          return {
-            ...p,
-            calculatedDistance: calculateDistance(
-              NUST_LAT,
-              NUST_LNG,
-              p.latitude,
-              p.longitude,
-            ),
-            averageRating: avgRating,
-          };
+    const sync = () => {
+      const replica = loadReplica();
+
+      axios
+        .get(import.meta.env.VITE_API_URL + "/api/properties/changes/", {
+          headers,
+          params: replica ? { since: replica.token } : {},
+        })
+        .then((res) => {
+          // Merge the delta into the local copy (or start over when the server says reset)
+          const { token: nextToken, reset, changed, removed } = res.data;
+          const byId = new Map(
+            reset || !replica ? [] : replica.items.map((p) => [p.id, p]),
+          );
+          changed.forEach((p) => byId.set(p.id, p));
+          removed.forEach((id) => byId.delete(id));
+          const items = [...byId.values()].sort((a, b) => a.id - b.id);
+          saveReplica({ token: nextToken, items });
+
+          const processedProperties = items.map((p) => {
+            const avgRating =
+              p.rating_avg !== null && p.rating_avg !== undefined
+                ? p.rating_avg.toFixed(1)
+                : null;
+
+            return {
+              ...p,
+              calculatedDistance: calculateDistance(
+                NUST_LAT,
+                NUST_LNG,
+                p.latitude,
+                p.longitude,
+              ),
+              averageRating: avgRating,
+            };
+          });
+
+          setProperties(processedProperties);
+          setFilteredProperties(processedProperties);
+          setLoading(false);
+        })
+        .catch((err) => {
+          localStorage.removeItem(replicaKey());
+          console.error(err);
         });
+    };
+
+    sync();
 
-        setProperties(processedProperties);
-        setFilteredProperties(processedProperties);
-        setLoading(false);
-      })
-      .catch((err) => console.error(err));
+    // --- NEW: LIVE AVAILABILITY (SSE, only served under ASGI; public events need no token) ---
+    const live = new EventSource(`${import.meta.env.VITE_API_URL}/api/live/`);
+    live.addEventListener("availability", (e) => {
+      const { properties: changedProps, rooms: changedRooms } = JSON.parse(
+        e.data,
+      );
+      const propAvailability = new Map(
+        changedProps.map((p) => [p.id, p.is_available]),
+      );
+      const roomAvailability = new Map(
+        changedRooms.map((r) => [r.id, r.is_available]),
+      );
+      setProperties((prev) =>
+        prev.map((p) => ({
+          ...p,
+          is_available: propAvailability.get(p.id) ?? p.is_available,
+          rooms: p.rooms?.map((r) => ({
+            ...r,
+            is_available: roomAvailability.get(r.id) ?? r.is_available,
+          })),
+        })),
+      );
+    });
+    // We fell behind and missed events: catch up through the change feed
+    live.addEventListener("resync", sync);
+
+    return () => live.close();
   }, []);
 
   useEffect(() => {
@@ -181,6 +250,18 @@ const Listings = () => {
         p.id === propertyId ? { ...p, is_favorited: res.data.is_favorited } : p,
       );
       setProperties(updatedProps);
+
+      // Favouriting doesn't show up in the change feed, so patch the local copy too
+      const replica = loadReplica();
+      if (replica)
+        saveReplica({
+          ...replica,
+          items: replica.items.map((p) =>
+            p.id === propertyId
+              ? { ...p, is_favorited: res.data.is_favorited }
+              : p,
+          ),
+        });
     } catch (err) {
       console.error("Failed to toggle favorite", err);
     }
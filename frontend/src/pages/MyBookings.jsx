@@ -41,6 +41,23 @@ const MyBookings = () => {
     fetchBookings();
   }, [API_URL]);
 
+  // --- NEW: LIVE STATUS UPDATES (SSE) when the landlord accepts or rejects ---
+  useEffect(() => {
+    const token = localStorage.getItem("access_token");
+    if (!token) return;
+
+    const live = new EventSource(
+      `${API_URL}/api/live/?token=${encodeURIComponent(token)}`,
+    );
+    live.addEventListener("booking", (e) => {
+      const { id, status } = JSON.parse(e.data);
+      setBookings((prev) =>
+        prev.map((b) => (b.id === id ? { ...b, status } : b)),
+      );
+    });
+    return () => live.close();
+  }, [API_URL]);
+
   const handleDeleteBooking = async (bookingId) => {
     if (
       !window.confirm(
@@ -78,6 +95,12 @@ const MyBookings = () => {
             <XCircle size={14} /> Rejected
           </span>
         );
+      case "expired":
+        return (
+          <span className="flex items-center gap-1 bg-gray-100 text-gray-600 px-3 py-1 rounded-full text-xs font-bold uppercase tracking-wide">
+            <Clock size={14} /> Expired
+          </span>
+        );
       default: // pending
         return (
           <span className="flex items-center gap-1 bg-yellow-100 text-yellow-700 px-3 py-1 rounded-full text-xs font-bold uppercase tracking-wide">
@@ -69,6 +69,11 @@ const PropertyDetail = () => {
   const [reportDescription, setReportDescription] = useState("");
   const [reportStatus, setReportStatus] = useState("");
 
+  const [similar, setSimilar] = useState([]);
+
+  // Older reviews are paged in from /reviews/ (the property only embeds the newest few)
+  const [reviewPage, setReviewPage] = useState({ items: null, next: null });
+
   const calculateDistance = (lat1, lon1, lat2, lon2) => {
     const R = 6371;
     const dLat = (lat2 - lat1) * (Math.PI / 180);
@@ -92,6 +97,7 @@ const PropertyDetail = () => {
       .get(`${API_URL}/api/properties/${id}/`, { headers })
       .then((res) => {
         setProperty(res.data);
+        setReviewPage({ items: null, next: null });
         if (res.data.images && res.data.images.length > 0)
           setActiveImage(res.data.images[0]); // Whole image object
         if (res.data.latitude && res.data.longitude)
@@ -104,6 +110,18 @@ const PropertyDetail = () => {
             ),
           );
         setLoading(false);
+
+        // When this one is taken, offer the closest available alternatives
+        if (!res.data.is_available) {
+          axios
+            .get(`${API_URL}/api/properties/${id}/similar/`, {
+              params: { fields: "id,title,address,price_per_month,cover_image" },
+            })
+            .then((similarRes) => setSimilar(similarRes.data))
+            .catch((err) => console.error(err));
+        } else {
+          setSimilar([]);
+        }
       })
       .catch((err) => {
         console.error(err);
@@ -178,17 +196,31 @@ const PropertyDetail = () => {
   if (!property)
     return <div className="text-center py-20">Property not found.</div>;
 
+  const loadMoreReviews = () => {
+    const url = reviewPage.next || `${API_URL}/api/properties/${id}/reviews/`;
+    axios
+      .get(url)
+      .then((res) =>
+        setReviewPage((page) => ({
+          items: [...(page.items || []), ...res.data.results],
+          next: res.data.next,
+        })),
+      )
+      .catch((err) => console.error(err));
+  };
+
   const walkingTime = distance ? Math.round(parseFloat(distance) * 12) : null;
   const shareMessage = `Hey, check out this student accommodation: ${property.title} - ${window.location.href}`;
   const whatsappUrl = `https://wa.me/?text=${encodeURIComponent(shareMessage)}`;
 
   const averageRating =
-    property.reviews && property.reviews.length > 0
-      ? (
-          property.reviews.reduce((sum, review) => sum + review.rating, 0) /
-          property.reviews.length
-        ).toFixed(1)
+    property.rating_avg !== null && property.rating_avg !== undefined
+      ? property.rating_avg.toFixed(1)
       : null;
+  const shownReviews = reviewPage.items || property.reviews || [];
+  const hasMoreReviews = reviewPage.items
+    ? Boolean(reviewPage.next)
+    : property.review_count > shownReviews.length;
 
   return (
     <div className="min-h-screen bg-gray-50 pb-20">
@@ -286,7 +318,7 @@ const PropertyDetail = () => {
                         />
                         <span className="font-bold">{averageRating}</span>
                         <span className="text-yellow-600 font-medium text-sm">
-                          ({property.reviews.length})
+                          ({property.review_count})
                         </span>
                       </div>
                     )}
@@ -479,15 +511,53 @@ const PropertyDetail = () => {
                 </div>
               </div>
 
+              {/* SIMILAR LISTINGS (only fetched when this one is taken) */}
+              {similar.length > 0 && (
+                <div>
+                  <h3 className="text-xl font-bold text-gray-900 mb-4">
+                    This place is taken. Similar available places
+                  </h3>
+                  <div className="grid grid-cols-1 sm:grid-cols-2 gap-4">
+                    {similar.map((alt) => (
+                      <Link
+                        key={alt.id}
+                        to={`/property/${alt.id}`}
+                        className="flex gap-3 p-3 bg-white border border-gray-200 rounded-xl hover:border-primary transition-colors"
+                      >
+                        <div className="w-20 h-20 rounded-lg bg-gray-200 overflow-hidden flex-shrink-0">
+                          {alt.cover_image && (
+                            <img
+                              src={alt.cover_image}
+                              className="w-full h-full object-cover"
+                            />
+                          )}
+                        </div>
+                        <div className="min-w-0">
+                          <p className="font-bold text-gray-900 truncate">
+                            {alt.title}
+                          </p>
+                          <p className="text-sm text-gray-500 truncate">
+                            {alt.address}
+                          </p>
+                          <p className="text-sm font-bold text-primary">
+                            ${alt.price_per_month}/mo
+                          </p>
+                        </div>
+                      </Link>
+                    ))}
+                  </div>
+                </div>
+              )}
+
               {/* REVIEWS */}
               <div>
                 <h3 className="text-xl font-bold text-gray-900 mb-4 flex items-center gap-2">
                   <Star className="fill-yellow-400 text-yellow-400" />
-                  Reviews ({property.reviews ? property.reviews.length : 0})
+                  Reviews ({property.review_count || 0})
                 </h3>
                 <div className="space-y-4 mb-8">
-                  {property.reviews && property.reviews.length > 0 ? (
-                    property.reviews.map((review) => (
+                  {shownReviews.length > 0 ? (
+                    shownReviews.map((review) => (
                       <div
                         key={review.id}
                         className="bg-gray-50 p-4 rounded-xl border border-gray-100"
@@ -511,6 +581,15 @@ const PropertyDetail = () => {
                   ) : (
                     <p className="text-gray-500 italic">No reviews yet.</p>
                   )}
+                  {hasMoreReviews && (
+                    <button
+                      type="button"
+                      onClick={loadMoreReviews}
+                      className="w-full py-2 text-sm font-bold text-blue-600 hover:text-blue-800"
+                    >
+                      Show more reviews
+                    </button>
+                  )}
                 </div>
 
                 <div className="bg-white border border-gray-200 rounded-2xl p-6">
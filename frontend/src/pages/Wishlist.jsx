@@ -23,6 +23,8 @@ const Wishlist = () => {
         import.meta.env.VITE_API_URL + "/api/properties/favorites/",
         {
           headers: { Authorization: `Bearer ${token}` },
+          // Only what the cards below render
+          params: { fields: "id,title,address,price_per_month,cover_image" },
         },
       );
       setSavedProperties(res.data);
@@ -102,9 +104,9 @@ const Wishlist = () => {
                   className="bg-white rounded-xl shadow-sm hover:shadow-md transition-shadow overflow-hidden border border-gray-100 relative"
                 >
                   <div className="relative h-48 bg-gray-200 overflow-hidden">
-                    {property.images && property.images.length > 0 ? (
+                    {property.cover_image ? (
                       <img
-                        src={property.images[0].image}
+                        src={property.cover_image}
                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
                       />
                     ) : (
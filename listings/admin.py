@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Property, PropertyImage, Review, Booking, Profile, Report, Room 
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from .models import Campus, Property, PropertyImage, Review, Booking, Profile, Report, Room, SavedSearch, JobLease
+from . import querylog, textdup
 
 # This tells Django to show these tables in the Admin Dashboard
 admin.site.register(Property)
@@ -7,5 +11,72 @@ admin.site.register(PropertyImage)
 admin.site.register(Review)
 admin.site.register(Booking)
 admin.site.register(Profile)
-admin.site.register(Report)
-admin.site.register(Room)
\ No newline at end of file
+admin.site.register(Room)
+admin.site.register(SavedSearch)
+
+
+class AutomaticReportFilter(admin.SimpleListFilter):
+    title = 'source'
+    parameter_name = 'source'
+
+    def lookups(self, request, model_admin):
+        return [('automatic', 'Automatic (duplicates)'), ('users', 'Filed by users')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'automatic':
+            return queryset.filter(reporter__isnull=True)
+        if self.value() == 'users':
+            return queryset.filter(reporter__isnull=False)
+        return queryset
+
+
+@admin.register(Report)
+class ReportAdmin(admin.ModelAdmin):
+    list_display = ('property', 'reason', 'reporter', 'duplicate_of', 'is_resolved', 'created_at')
+    list_filter = ('is_resolved', 'reason', AutomaticReportFilter)
+    list_select_related = ('property', 'reporter', 'duplicate_of')
+    raw_id_fields = ('property', 'duplicate_of', 'reporter')
+
+
+@admin.register(Campus)
+class CampusAdmin(admin.ModelAdmin):
+    list_display = ('short_name', 'name', 'city', 'latitude', 'longitude', 'is_default')
+    prepopulated_fields = {'slug': ('short_name',)}
+
+
+@admin.register(JobLease)
+class JobLeaseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'next_run_at', 'owner', 'lease_expires_at', 'runs', 'failures', 'last_duration_ms', 'max_duration_ms')
+    readonly_fields = ('owner', 'lease_expires_at', 'runs', 'failures', 'last_started_at', 'last_duration_ms',
+                       'total_duration_ms', 'max_duration_ms', 'last_result', 'last_error')
+
+
+# --- SLOW QUERY LOG (wired up in backend/urls.py) ---
+def slow_queries_view(request):
+    if request.method == 'POST':
+        querylog.clear()
+        return redirect('admin-slow-queries')
+
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Slow queries',
+        'queries': querylog.recent_queries(),
+        'threshold_ms': settings.SLOW_QUERY_MS,
+    }
+    return TemplateResponse(request, 'admin/slow_queries.html', context)
+
+
+# --- DUPLICATE LISTING CLUSTERS (wired up in backend/urls.py) ---
+def duplicate_listings_view(request):
+    found = textdup.clusters()
+    properties = Property.objects.select_related('landlord').in_bulk({pk for _, members in found for pk, _ in members})
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Duplicate listings',
+        'threshold': textdup.SIMILARITY,
+        'clusters': [
+            {'original': properties[oldest], 'members': [(properties[pk], score) for pk, score in members]}
+            for oldest, members in found
+        ],
+    }
+    return TemplateResponse(request, 'admin/duplicate_listings.html', context)
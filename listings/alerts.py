@@ -0,0 +1,103 @@
+"""
+Saved-search alerts.
+
+When a listing is published or becomes available again, matches_for() finds the
+saved searches it satisfies with one indexed query: active searches for this
+gender (or 'All') whose max price covers it, narrowed by the amenity bitmask,
+room size and radius (against the listing's stored distance to each search's
+campus) in the same statement. Nothing is done per saved search in Python, so
+the cost grows with the number of matches, not the number of searches.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import campuses
+from .models import Property, PropertyCampusDistance, SavedSearch, SavedSearchAlert
+from .tasks import run_in_background
+from .whatsapp import send_whatsapp
+
+logger = logging.getLogger(__name__)
+
+ALL_AMENITIES = sum(SavedSearch.AMENITY_BITS.values())
+
+
+def amenity_mask(prop):
+    mask = 0
+    for name, bit in SavedSearch.AMENITY_BITS.items():
+        if getattr(prop, f'has_{name}'):
+            mask |= bit
+    return mask
+
+
+def matches_for(prop):
+    """Active saved searches (other than the landlord's own) that this property satisfies."""
+    searches = SavedSearch.objects.filter(
+        is_active=True,
+        gender_preference__in=['All', prop.gender_preference],
+        max_price__gte=prop.price_per_month,
+    ).exclude(user_id=prop.landlord_id)
+
+    # Every amenity the search requires must be one the property has
+    missing = ~amenity_mask(prop) & ALL_AMENITIES
+    searches = searches.annotate(missing_amenities=F('amenities_mask').bitand(missing)).filter(missing_amenities=0)
+
+    # Room sizes: same rule as the listings page (exact size, 5 means 5+, only available rooms)
+    capacities = {min(c, 5) for c in prop.rooms.filter(is_available=True).values_list('capacity', flat=True)}
+    searches = searches.filter(Q(room_capacity__isnull=True) | Q(room_capacity__in=capacities))
+
+    # Listings without coordinates pass the distance filter, as they do on the listings page.
+    # A saved search's radius is from its own campus (the default one when it has none), read
+    # off the listing's precomputed distance row for that campus
+    if prop.latitude and prop.longitude:
+        default = campuses.default_campus()
+        distance = PropertyCampusDistance.objects.filter(
+            property=prop, campus_id=Coalesce(OuterRef('campus_id'), Value(default.pk if default else None)),
+        ).values('distance_km')[:1]
+        searches = searches.annotate(distance_km=Subquery(distance)).filter(
+            Q(radius_km__isnull=True) | Q(radius_km__gte=F('distance_km'))
+        )
+
+    already_sent = SavedSearchAlert.objects.filter(property=prop).values('saved_search_id')
+    return searches.exclude(id__in=already_sent).select_related('user__profile')
+
+
+def _notify(search, prop):
+    link = f"https://studenthousing.co.zw/property/{prop.id}"
+    text = f"A new room matches your saved search: '{prop.title}' for ${prop.price_per_month}/month."
+
+    if search.channel == 'whatsapp' and search.user.profile.phone_number:
+        phone = search.user.profile.phone_number
+        if not phone.startswith('+'): phone = '+' + phone
+        send_whatsapp(f'whatsapp:{phone}', f"🔔 {text}\n\n👉 {link}\nOr reply 'BOOK {prop.id}' to request it.")
+    elif search.user.email:
+        send_mail(
+            subject=f"New match for your saved search: {prop.title}",
+            message=f"Hello {search.user.username},\n\n{text}\n\nView it here: {link}\n\nBest,\nThe CampusAcc Team",
+            from_email=settings.EMAIL_HOST_USER,
+            recipient_list=[search.user.email],
+            fail_silently=True,
+        )
+
+
+def send_alerts(property_ids):
+    for prop in Property.objects.filter(id__in=property_ids, is_available=True):
+        for search in matches_for(prop):
+            # Record first: a failed send is better than a repeated one
+            _, created = SavedSearchAlert.objects.get_or_create(saved_search=search, property=prop)
+            if not created:
+                continue
+            try:
+                _notify(search, prop)
+            except Exception as e:
+                logger.warning("Failed to send saved-search alert %s for property %s: %s", search.id, prop.id, e)
+
+
+def listings_published(property_ids):
+    """Queue alerts for listings that were just created or made available again."""
+    property_ids = list(property_ids)
+    if property_ids:
+        run_in_background(send_alerts, property_ids)
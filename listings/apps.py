@@ -5,4 +5,6 @@ class ListingsConfig(AppConfig):
     name = 'listings'
 
     def ready(self):
-            import listings.signals
\ No newline at end of file
+        import listings.signals
+        from listings import ranking
+        ranking.check_settings()
@@ -0,0 +1,121 @@
+"""
+Async versions of the read-heavy endpoints and the WhatsApp webhook.
+
+These are plain Django async views (DRF views are sync only) and only help when
+the project is served through backend/asgi.py, e.g.
+
+    uvicorn backend.asgi:application --workers 2
+
+Under WSGI they still work, but Django runs them in a thread per request.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import throttling
+from .idempotency import Replay
+from .models import Property
+from .serializers import PropertySerializer, latest_reviews_prefetch
+from .whatsapp import handle_message, send_whatsapp_async, twiml_reply
+
+logger = logging.getLogger(__name__)
+
+
+def _property_queryset():
+    return Property.objects.select_related('landlord__profile').prefetch_related(
+        'images__room', latest_reviews_prefetch(), 'rooms',
+    )
+
+
+@sync_to_async
+def _authenticate(request):
+    result = JWTAuthentication().authenticate(request)
+    return result[0] if result else AnonymousUser()
+
+
+async def _favorite_ids(user):
+    if not user.is_authenticated:
+        return set()
+    return {pk async for pk in Property.objects.filter(favorited_by=user).values_list('pk', flat=True)}
+
+
+@sync_to_async
+def _serialize(instance, request, favorite_ids, many=False):
+    context = {'request': request, 'favorite_ids': favorite_ids}
+    return PropertySerializer(instance, many=many, context=context).data
+
+
+async def _prepare(request):
+    """Authenticate the caller, returning (user, error_response)."""
+    try:
+        user = await _authenticate(request)
+    except AuthenticationFailed as e:
+        # Same body DRF's exception handler would produce
+        data = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+        return None, JsonResponse(data, status=401)
+    request.user = user
+    return user, None
+
+
+@require_GET
+async def property_list(request):
+    user, error = await _prepare(request)
+    if error:
+        return error
+
+    properties = [prop async for prop in _property_queryset()]
+    data = await _serialize(properties, request, await _favorite_ids(user), many=True)
+    return JsonResponse(data, safe=False)
+
+
+@require_GET
+async def property_detail(request, pk):
+    user, error = await _prepare(request)
+    if error:
+        return error
+
+    try:
+        prop = await _property_queryset().aget(pk=pk)
+    except Property.DoesNotExist:
+        return JsonResponse({'detail': 'No Property matches the given query.'}, status=404)
+
+    data = await _serialize(prop, request, await _favorite_ids(user))
+    return JsonResponse(data)
+
+
+@csrf_exempt
+@require_POST
+async def whatsapp_webhook(request):
+    if not throttling.allow('whatsapp', request.POST.get('From', ''))[0]:
+        return HttpResponse(twiml_reply(''), content_type='application/xml')
+
+    replay = Replay('twilio', 'message', request.POST['MessageSid']) if request.POST.get('MessageSid') else None
+    if replay:
+        stored, busy = await sync_to_async(replay.begin)()
+        if stored is not None or busy:
+            return HttpResponse(stored[1] if stored else twiml_reply(''), content_type='application/xml')
+
+    try:
+        reply, outbox = await sync_to_async(handle_message)(request.POST.get('Body', ''), request.POST.get('From', ''))
+    except Exception:
+        if replay:
+            await sync_to_async(replay.release)()
+        raise
+    twiml = twiml_reply(reply)
+    if replay:
+        await sync_to_async(replay.store)(twiml)
+
+    # Twilio calls go out on the event loop instead of holding a worker thread
+    for to, body in outbox:
+        try:
+            await send_whatsapp_async(to, body)
+        except Exception:
+            logger.exception("Failed to send WhatsApp to %s", to)
+
+    return HttpResponse(twiml, content_type='application/xml')
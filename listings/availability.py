@@ -0,0 +1,62 @@
+"""
+Bulk availability changes for landlords (the API endpoint and the bot's FULL/OPEN).
+
+.update() skips save() and so the per-instance post_save receivers; instead
+availability_changed is sent once per batch and signals.py hangs the snapshot,
+map and saved-search hooks off it. updated_at is bumped here for the change feed.
+"""
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.dispatch import Signal
+
+from . import changefeed
+from .models import Property, Room
+
+# kwargs: property_ids (every property touched, directly or through a room),
+#         published_ids (properties that went from full to available),
+#         optionally properties ({id: is_available}) and rooms ([(id, property id, is_available)])
+#         with the rows whose availability actually flipped
+availability_changed = Signal()
+
+
+def _apply(queryset, changes):
+    """One UPDATE for every owned row in changes ({id: bool}); returns ({id: new}, {id: old})."""
+    before = dict(queryset.select_for_update().filter(id__in=changes).values_list('id', 'is_available'))
+    if before:
+        queryset.filter(id__in=before).update(is_available=Case(
+            *[When(id=pk, then=Value(changes[pk])) for pk in before],
+            default='is_available',
+        ))
+    return {pk: changes[pk] for pk in before}, before
+
+
+def set_availability(user, properties=None, rooms=None):
+    """
+    properties / rooms map id -> is_available. Ids the user doesn't own are
+    left alone and reported back under 'skipped'.
+    """
+    properties, rooms = properties or {}, rooms or {}
+
+    with transaction.atomic():
+        new_properties, old_properties = _apply(Property.objects.filter(landlord=user), properties)
+        new_rooms, old_rooms = _apply(Room.objects.filter(property__landlord=user), rooms)
+
+        room_properties = dict(Room.objects.filter(id__in=new_rooms).values_list('id', 'property_id'))
+        touched = set(new_properties) | set(room_properties.values())
+        if touched:
+            changefeed.touch(touched)
+            published = [pk for pk, available in new_properties.items() if available and not old_properties[pk]]
+            availability_changed.send(
+                sender=Property, property_ids=sorted(touched), published_ids=published,
+                properties={pk: value for pk, value in new_properties.items() if value != old_properties[pk]},
+                rooms=[(pk, room_properties[pk], value) for pk, value in new_rooms.items() if value != old_rooms[pk]],
+            )
+
+    return {
+        'properties': [{'id': pk, 'is_available': value} for pk, value in sorted(new_properties.items())],
+        'rooms': [{'id': pk, 'is_available': value} for pk, value in sorted(new_rooms.items())],
+        'skipped': {
+            'properties': sorted(set(properties) - set(new_properties)),
+            'rooms': sorted(set(rooms) - set(new_rooms)),
+        },
+    }
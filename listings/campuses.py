@@ -0,0 +1,91 @@
+"""
+Campuses, and how far every listing is from each of them.
+
+Distances are precomputed into PropertyCampusDistance, indexed on (campus,
+distance_km), whenever a listing's coordinates change or a campus is added or
+moved (signals.py). ?campus= filters and sorts listings through that index
+instead of working out a haversine per row. Listings without coordinates have
+no rows and, as before, pass any distance filter.
+
+Distances shown without a campus picked are to the default campus. The campus
+list is cached per process for CACHE_SECONDS (and dropped at once in the process
+that changed it), since it's read on nearly every listing request.
+"""
+import time
+
+import numpy as np
+from django.db import transaction
+
+from .geo import haversine_km
+from .models import Campus, Property, PropertyCampusDistance
+
+CACHE_SECONDS = 60
+# Used until any campus exists (NUST, the only campus before campuses could be added)
+FALLBACK_POINT = (-20.165, 28.642)
+
+_cache = (0.0, None)
+
+
+def all_campuses():
+    global _cache
+    expires, campuses = _cache
+    if campuses is None or time.monotonic() > expires:
+        campuses = list(Campus.objects.all())
+        _cache = (time.monotonic() + CACHE_SECONDS, campuses)
+    return campuses
+
+
+def campuses_changed():
+    global _cache
+    _cache = (0.0, None)
+
+
+def default_campus():
+    campuses = all_campuses()
+    return next((campus for campus in campuses if campus.is_default), campuses[0] if campuses else None)
+
+
+def point(campus=None):
+    """(latitude, longitude) of the campus, or of the default one."""
+    campus = campus or default_campus()
+    return (campus.latitude, campus.longitude) if campus else FALLBACK_POINT
+
+
+def resolve(value):
+    """The campus a ?campus= value (slug or id) names; None when it's empty. ValueError if there's no such campus."""
+    value = (value or '').strip().lower()
+    if not value:
+        return None
+    for campus in all_campuses():
+        if value in (campus.slug, str(campus.pk), campus.short_name.lower()):
+            return campus
+    raise ValueError(f"Unknown campus '{value}'. Pick one from /api/campuses/.")
+
+
+def update_distances(property_ids=None, campus_ids=None, batch_size=2000):
+    """
+    Recompute the distance rows for the given properties and/or campuses (all of
+    them when neither is given). Returns how many rows were written.
+    """
+    properties = Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    campuses = Campus.objects.all()
+    stale = PropertyCampusDistance.objects.all()
+    if property_ids is not None:
+        properties = properties.filter(id__in=property_ids)
+        stale = stale.filter(property_id__in=property_ids)
+    if campus_ids is not None:
+        campuses = campuses.filter(id__in=campus_ids)
+        stale = stale.filter(campus_id__in=campus_ids)
+
+    rows = np.array(list(properties.values_list('id', 'latitude', 'longitude')), dtype=np.float64).reshape(-1, 3)
+    ids = rows[:, 0].astype(np.int64)
+    distances = []
+    for campus in campuses:
+        km = haversine_km(campus.latitude, campus.longitude, rows[:, 1], rows[:, 2])
+        distances += [PropertyCampusDistance(property_id=int(pk), campus_id=campus.pk, distance_km=float(d))
+                      for pk, d in zip(ids, km)]
+
+    with transaction.atomic():
+        stale.delete()
+        PropertyCampusDistance.objects.bulk_create(distances, batch_size=batch_size)
+    return len(distances)
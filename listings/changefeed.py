@@ -0,0 +1,73 @@
+"""
+Change feed for the listings page (/api/properties/changes/).
+
+A client keeps its own copy of the catalogue: the first call (no token) gets
+every property plus a change token, each later call passes ?since=<token> and
+gets only the properties created or changed since then (is_available=false
+ones included, so they can be hidden) and the ids deleted since then.
+
+Changes are found through Property.updated_at (indexed) and deletes through
+PropertyTombstone. Anything that alters what a listing shows without going
+through Property.save() - rooms, images, review aggregates, bulk availability,
+landlord profile - has to bump updated_at with touch().
+
+The token is a timestamp in microseconds. It's handed out OVERLAP behind the
+time of the query so a write still committing when we read is picked up next
+time; clients just upsert, so seeing a row twice is harmless.
+"""
+import datetime
+
+from django.utils import timezone
+
+from .models import Property, PropertyTombstone
+
+OVERLAP = datetime.timedelta(seconds=5)
+# Tombstones older than this are pruned (jobs.py); a client that's been away longer starts over
+TOMBSTONE_DAYS = 30
+
+
+def encode_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_token(token):
+    try:
+        return datetime.datetime.fromtimestamp(int(token) / 1_000_000, tz=datetime.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        # OverflowError / OSError: a number too far from now for a datetime
+        raise ValueError("since must be a token returned by this endpoint.")
+
+
+def touch(property_ids):
+    """Bump updated_at for properties changed outside Property.save()."""
+    property_ids = list(property_ids)
+    if property_ids:
+        Property.objects.filter(id__in=property_ids).update(updated_at=timezone.now())
+
+
+def property_deleted(property_id):
+    PropertyTombstone.objects.create(property_id=property_id, deleted_at=timezone.now())
+
+
+def prune_tombstones(dry_run=False):
+    """Drops tombstones no token can still ask about (the prune_tombstones job)."""
+    expired = PropertyTombstone.objects.filter(deleted_at__lt=timezone.now() - datetime.timedelta(days=TOMBSTONE_DAYS))
+    return expired.count() if dry_run else expired.delete()[0]
+
+
+def changes(queryset, since=None):
+    """
+    (properties, removed ids, next token, reset). reset means `since` was missing
+    or too old to answer from tombstones: properties is then the whole queryset
+    and the client should replace its copy rather than merge into it.
+    """
+    now = timezone.now()
+    token = encode_token(now - OVERLAP)
+    since = decode_token(since) if since else None
+
+    if since is None or since < now - datetime.timedelta(days=TOMBSTONE_DAYS):
+        return queryset.order_by('id'), [], token, True
+
+    changed = queryset.filter(updated_at__gte=since).order_by('id')
+    removed = PropertyTombstone.objects.filter(deleted_at__gte=since).order_by('property_id')
+    return changed, list(removed.values_list('property_id', flat=True).distinct()), token, False
@@ -0,0 +1,141 @@
+"""
+gzip/brotli compression for API responses.
+
+Unlike Django's GZipMiddleware this negotiates brotli when the client accepts it
+(and the brotli package is installed), skips small bodies, and remembers the
+compressed form of recent GET responses keyed by a hash of the body, so the
+same property list isn't recompressed for every visitor.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = _accepted_encodings(header or '')
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    # mtime=0 keeps the output deterministic for the same body
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'API_COMPRESS_MIN_SIZE', 1024)
+        self.prefixes = tuple(getattr(settings, 'API_COMPRESS_PATH_PREFIXES', ('/api/',)))
+        self.cache = CompressedBodyCache(getattr(settings, 'API_COMPRESS_CACHE_BYTES', 8 * 1024 * 1024))
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if not request.path.startswith(self.prefixes):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        body = response.content
+        reusable = request.method in ('GET', 'HEAD') and 'no-store' not in response.get('Cache-Control', '')
+        key = (encoding, hashlib.sha1(body).digest()) if reusable else None
+
+        compressed = self.cache.get(key) if key else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if key:
+                self.cache.set(key, compressed)
+
+        # Compressing isn't worth it for incompressible bodies
+        if len(compressed) >= len(body):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            # Same rule as Django's GZipMiddleware: the bytes changed, so the ETag becomes weak
+            etag = response['ETag']
+            if not etag.startswith('W/'):
+                response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,121 @@
+"""
+Streaming CSV / NDJSON exports (the /api/export/ endpoint and the export_data command).
+
+Rows come straight off QuerySet.values_list().iterator(), which uses a
+server-side cursor on PostgreSQL and fetches chunk_size rows at a time
+elsewhere, and are encoded and yielded a chunk at a time. Nothing holds more
+than one chunk, so memory stays flat however many rows are exported.
+"""
+import csv
+import datetime
+import decimal
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Booking, Property, Report, Review
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 2000
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# name -> (model, landlord lookup, columns); columns are values_list() paths and double as headers
+EXPORTS = {
+    'properties': (Property, 'landlord_id', [
+        'id', 'title', 'landlord_id', 'landlord__username', 'price_per_month', 'deposit_amount',
+        'address', 'latitude', 'longitude', 'gender_preference', 'is_available',
+        'has_wifi', 'has_solar', 'has_borehole', 'curfew', 'visitors_allowed',
+        'review_count', 'rating_avg', 'created_at',
+    ]),
+    'bookings': (Booking, 'property__landlord_id', [
+        'id', 'property_id', 'property__title', 'room_id', 'room__label', 'student_id', 'student__username',
+        'move_in_date', 'status', 'message', 'created_at',
+    ]),
+    'reviews': (Review, 'property__landlord_id', [
+        'id', 'property_id', 'property__title', 'user_id', 'user__username', 'rating', 'comment', 'created_at',
+    ]),
+    'reports': (Report, 'property__landlord_id', [
+        'id', 'property_id', 'property__title', 'reporter_id', 'reporter__username', 'reason', 'description',
+        'is_resolved', 'created_at',
+    ]),
+}
+
+
+def _day_start(value, name):
+    day = parse_date(value) if isinstance(value, str) else value
+    if day is None:
+        raise ValueError(f"{name} must be a date like 2025-01-31.")
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def export_queryset(name, since=None, until=None, landlord=None):
+    """values_list() queryset for an export; since/until are inclusive dates (or 'YYYY-MM-DD')."""
+    model, landlord_lookup, columns = EXPORTS[name]
+    queryset = model.objects.all()
+    if since:
+        queryset = queryset.filter(created_at__gte=_day_start(since, 'since'))
+    if until:
+        queryset = queryset.filter(created_at__lt=_day_start(until, 'until') + datetime.timedelta(days=1))
+    if landlord is not None:
+        queryset = queryset.filter(**{landlord_lookup: landlord})
+    return queryset.order_by('id').values_list(*columns)
+
+
+def _plain(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+# Spreadsheets run a cell starting with one of these as a formula; prefixing a quote makes it text
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _plain(value)
+
+
+class _Echo:
+    """csv.writer target that hands back each line instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream(name, fmt, **filters):
+    """Yields the encoded export as bytes, one chunk of rows at a time."""
+    columns = EXPORTS[name][2]
+    rows = export_queryset(name, **filters).iterator(chunk_size=CHUNK_SIZE)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns).encode()
+        for chunk in _chunks(rows):
+            yield ''.join(writer.writerow(map(_cell, row)) for row in chunk).encode()
+    else:
+        dumps = orjson.dumps if orjson else lambda obj: json.dumps(obj, ensure_ascii=False).encode()
+        for chunk in _chunks(rows):
+            yield b''.join(dumps(dict(zip(columns, map(_plain, row)))) + b'\n' for row in chunk)
+
+
+def filename(name, fmt):
+    return f"{name}-{timezone.localdate():%Y%m%d}.{fmt}"
@@ -0,0 +1,190 @@
+"""
+Facet counts for the listings filter sidebar.
+
+Computed with NumPy from the feature snapshot (features.py) rather than the
+database. Each facet is counted with every filter applied except its own, so
+"Solar (42)" is what you'd get by ticking Solar on top of the current filters.
+Results are cached per filter set until the snapshot changes.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from . import campuses
+from .features import CAPACITY_BUCKETS, GENDER_CODES, get_features
+
+AMENITIES = ('wifi', 'solar', 'borehole')
+DISTANCE_BANDS = (1, 2, 5, 10)  # km; plus "more than 10" and "unknown"
+ROOM_LABELS = [str(n) for n in range(1, CAPACITY_BUCKETS)] + [f'{CAPACITY_BUCKETS}+']
+# Price histogram: when the whole range needs more than MAX_BINS bins, prices above the
+# PRICE_PERCENTILE go in one open-ended bin and the bins are widened (in multiples of the
+# requested width) as far as needed, so one absurd price can't blow it up
+MAX_BINS = 50
+PRICE_PERCENTILE = 99
+MAX_BIN_WIDTH = 100000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 256
+
+
+def _number(value, cast=float):
+    try:
+        return cast(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(params):
+    """
+    Query string -> normalized, hashable filter tuple (mirrors the filters on Listings.jsx).
+    ValueError for a ?campus= that doesn't exist or a bin_width that isn't a sensible number.
+    """
+    campus = campuses.resolve(params.get('campus'))
+    bin_width = 50
+    if params.get('bin_width') not in (None, ''):
+        bin_width = _number(params.get('bin_width'), int)
+        if bin_width is None or not 0 < bin_width <= MAX_BIN_WIDTH:
+            raise ValueError(f"bin_width must be a whole number from 1 to {MAX_BIN_WIDTH}.")
+    gender = params.get('gender', 'All')
+    room_type = params.get('room_type', 'Any')
+    amenities = tuple(sorted({a for a in params.get('amenities', '').split(',') if a in AMENITIES}))
+    return (
+        ('max_price', _number(params.get('max_price'))),
+        ('min_price', _number(params.get('min_price'))),
+        ('gender', gender if gender in GENDER_CODES else 'All'),
+        ('room_type', room_type if room_type in ROOM_LABELS else 'Any'),
+        ('max_distance', _number(params.get('max_distance'))),
+        ('campus', campus.slug if campus else None),
+        ('only_available', params.get('only_available', '').lower() in ('1', 'true', 'yes')),
+        ('amenities', amenities),
+        ('bin_width', max(bin_width, 5)),
+    )
+
+
+def _masks(features, filters, distance):
+    """One boolean mask per filter dimension (distance: km to the filtered campus, per row)."""
+    n = len(features)
+    everything = np.ones(n, dtype=bool)
+    masks = {}
+
+    price = features['price']
+    masks['price'] = everything.copy()
+    if filters['max_price'] is not None:
+        masks['price'] &= price <= filters['max_price']
+    if filters['min_price'] is not None:
+        masks['price'] &= price >= filters['min_price']
+
+    masks['gender'] = everything if filters['gender'] == 'All' else features['gender'] == GENDER_CODES[filters['gender']]
+
+    if filters['room_type'] == 'Any':
+        masks['room_type'] = everything
+    else:
+        bit = 1 << ROOM_LABELS.index(filters['room_type'])
+        masks['room_type'] = (features['room_capacity_mask'] & bit) != 0
+
+    # Listings without coordinates stay in, like on the listings page
+    if filters['max_distance'] is None:
+        masks['distance'] = everything
+    else:
+        masks['distance'] = np.isnan(distance) | (distance <= filters['max_distance'])
+
+    masks['available'] = features['is_available'] if filters['only_available'] else everything
+
+    masks['amenities'] = everything.copy()
+    for name in filters['amenities']:
+        masks['amenities'] &= features[f'has_{name}']
+
+    return masks
+
+
+def _all_but(masks, skip):
+    result = np.ones_like(next(iter(masks.values())))
+    for name, mask in masks.items():
+        if name != skip:
+            result &= mask
+    return result
+
+
+def _bin_top(price, width):
+    """Upper edge of the last bin that includes price."""
+    return int(price // width + 1) * width
+
+
+def compute(features, filters):
+    filters = dict(filters)
+    distance = features.distance_to(campuses.resolve(filters['campus']))
+    masks = _masks(features, filters, distance)
+    selected = _all_but(masks, None)
+
+    in_gender = _all_but(masks, 'gender')
+    genders = np.bincount(features['gender'][in_gender], minlength=len(GENDER_CODES))
+
+    in_amenities = _all_but(masks, 'amenities')
+    amenities = {name: int(np.count_nonzero(features[f'has_{name}'][in_amenities])) for name in AMENITIES}
+
+    in_rooms = features['room_capacity_mask'][_all_but(masks, 'room_type')]
+    rooms = {label: int(np.count_nonzero(in_rooms & (1 << bit))) for bit, label in enumerate(ROOM_LABELS)}
+
+    distances = distance[_all_but(masks, 'distance')]
+    known = distances[~np.isnan(distances)]
+    edges = (0,) + DISTANCE_BANDS + (np.inf,)
+    band_counts = np.histogram(known, bins=edges)[0] if len(known) else np.zeros(len(edges) - 1, dtype=int)
+    distance_bands = [
+        {'min_km': low, 'max_km': None if np.isinf(high) else high, 'count': int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], band_counts)
+    ] + [{'min_km': None, 'max_km': None, 'count': int(len(distances) - len(known))}]
+
+    # The histogram ignores the price filter so the slider can show the whole range
+    prices = features['price'][_all_but(masks, 'price')]
+    width = filters['bin_width']
+    bins = []
+    if len(prices):
+        top = _bin_top(prices.max(), width)
+        if top // width > MAX_BINS:
+            # Too many bins: stop at the PRICE_PERCENTILE ('lower': an actual price, so one
+            # outlier among a few listings doesn't drag it up) and widen the bins if still needed
+            typical_max = np.percentile(prices, PRICE_PERCENTILE, method='lower')
+            top = _bin_top(typical_max, width)
+            if top // width > MAX_BINS:
+                width *= -(-top // (width * (MAX_BINS - 1)))
+                top = _bin_top(typical_max, width)
+        counts = np.histogram(prices[prices < top], bins=np.arange(0, top + 1, width))[0]
+        bins = [{'min': i * width, 'max': (i + 1) * width, 'count': int(c)} for i, c in enumerate(counts)]
+        over = int(np.count_nonzero(prices >= top))
+        if over:
+            bins.append({'min': top, 'max': None, 'count': over})
+
+    return {
+        'total': int(np.count_nonzero(selected)),
+        'gender': {name: int(genders[code]) for name, code in GENDER_CODES.items()},
+        'amenities': amenities,
+        'room_type': rooms,
+        'distance': distance_bands,
+        'price': {
+            'min': float(prices.min()) if len(prices) else None,
+            'max': float(prices.max()) if len(prices) else None,
+            'bin_width': width,
+            'histogram': bins,
+        },
+    }
+
+
+def facets(params):
+    filters = parse_filters(params)
+    features = get_features()
+    key = (features.version, filters)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    with features.lock:
+        result = compute(features, filters)
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
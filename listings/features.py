@@ -0,0 +1,196 @@
+"""
+In-memory columnar snapshot of every property, one NumPy array per feature.
+
+The ranking engine (ranking.py) scores straight off these arrays instead of
+walking model instances. The snapshot is built on first use, patched row by row
+when a Property, Room or Review changes in this process (see signals.py), and
+rebuilt from scratch every FEATURE_SNAPSHOT_TTL seconds so that changes made by
+other gunicorn workers are picked up too.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from . import campuses
+from .geo import haversine_km
+from .models import Property, Room, Review
+
+GENDER_CODES = {'Mixed': 0, 'Gents': 1, 'Ladies': 2}
+
+# Room capacities 1..4 get their own bit, 5 and up share the last one
+CAPACITY_BUCKETS = 5
+
+
+def capacity_bit(capacity):
+    return 1 << (min(max(capacity, 1), CAPACITY_BUCKETS) - 1)
+
+
+COLUMNS = {
+    'id': np.int64,
+    'price': np.float64,
+    'deposit': np.float64,
+    'latitude': np.float64,
+    'longitude': np.float64,
+    'distance': np.float64,      # km to the default campus, NaN without coordinates
+    'gender': np.int8,           # GENDER_CODES
+    'has_wifi': np.bool_,
+    'has_solar': np.bool_,
+    'has_borehole': np.bool_,
+    'has_curfew': np.bool_,
+    'visitors_allowed': np.bool_,
+    'is_available': np.bool_,
+    'rating': np.float64,        # average review rating, NaN without reviews
+    'review_count': np.int32,
+    'room_capacity_mask': np.int16,  # capacity_bit() of every available room
+    'room_count': np.int16,
+}
+
+
+class PropertyFeatures:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.index = {}  # property id -> row
+        self.version = 0
+        self.built_at = None
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    # --- loading ---
+
+    def _fetch(self, ids=None):
+        """Rows for the given property ids (all properties when None), as a dict of columns."""
+        properties = Property.objects.all()
+        rooms = Room.objects.filter(is_available=True)
+        reviews = Review.objects.all()
+        if ids is not None:
+            properties = properties.filter(id__in=ids)
+            rooms = rooms.filter(property_id__in=ids)
+            reviews = reviews.filter(property_id__in=ids)
+
+        ratings = {
+            row['property_id']: (row['avg'], row['count'])
+            for row in reviews.values('property_id').annotate(avg=Avg('rating'), count=Count('id'))
+        }
+        capacity_masks = {}
+        room_counts = {}
+        for property_id, capacity in rooms.values_list('property_id', 'capacity').iterator(chunk_size=5000):
+            capacity_masks[property_id] = capacity_masks.get(property_id, 0) | capacity_bit(capacity)
+            room_counts[property_id] = room_counts.get(property_id, 0) + 1
+
+        rows = list(properties.values_list(
+            'id', 'price_per_month', 'deposit_amount', 'latitude', 'longitude', 'gender_preference',
+            'has_wifi', 'has_solar', 'has_borehole', 'curfew', 'visitors_allowed', 'is_available',
+        ).iterator(chunk_size=5000))
+
+        data = {name: np.empty(len(rows), dtype=dtype) for name, dtype in COLUMNS.items()}
+        for i, (pk, price, deposit, lat, lng, gender, wifi, solar, borehole, curfew, visitors, available) in enumerate(rows):
+            avg, count = ratings.get(pk, (None, 0))
+            data['id'][i] = pk
+            data['price'][i] = float(price)
+            data['deposit'][i] = float(deposit or 0)
+            data['latitude'][i] = np.nan if lat is None else lat
+            data['longitude'][i] = np.nan if lng is None else lng
+            data['gender'][i] = GENDER_CODES.get(gender, 0)
+            data['has_wifi'][i] = wifi
+            data['has_solar'][i] = solar
+            data['has_borehole'][i] = borehole
+            data['has_curfew'][i] = bool(curfew and curfew.strip())
+            data['visitors_allowed'][i] = visitors
+            data['is_available'][i] = available
+            data['rating'][i] = np.nan if avg is None else avg
+            data['review_count'][i] = count
+            data['room_capacity_mask'][i] = capacity_masks.get(pk, 0)
+            data['room_count'][i] = room_counts.get(pk, 0)
+
+        data['distance'] = haversine_km(*campuses.point(), data['latitude'], data['longitude'])
+        return data
+
+    def build(self):
+        data = self._fetch()
+        with self.lock:
+            self.columns = data
+            self.index = {int(pk): i for i, pk in enumerate(data['id'])}
+            self.version += 1
+            self.built_at = time.monotonic()
+
+    def refresh(self, ids):
+        """Re-read the given properties, adding, updating or dropping their rows."""
+        ids = set(ids)
+        if not ids:
+            return
+        data = self._fetch(ids)
+
+        with self.lock:
+            found = set()
+            new_rows = []
+            for i, pk in enumerate(data['id']):
+                pk = int(pk)
+                found.add(pk)
+                row = self.index.get(pk)
+                if row is None:
+                    new_rows.append(i)
+                else:
+                    for name in COLUMNS:
+                        self.columns[name][row] = data[name][i]
+
+            if new_rows:
+                start = len(self)
+                for name in COLUMNS:
+                    self.columns[name] = np.concatenate([self.columns[name], data[name][new_rows]])
+                for offset, i in enumerate(new_rows):
+                    self.index[int(data['id'][i])] = start + offset
+
+            deleted = [self.index[pk] for pk in ids - found if pk in self.index]
+            if deleted:
+                keep = np.ones(len(self), dtype=bool)
+                keep[deleted] = False
+                for name in COLUMNS:
+                    self.columns[name] = self.columns[name][keep]
+                self.index = {int(pk): i for i, pk in enumerate(self.columns['id'])}
+
+            self.version += 1
+
+    def distance_to(self, campus=None):
+        """km from every row to the campus (the default one: the precomputed column); NaN without coordinates."""
+        if campus is None or campus == campuses.default_campus():
+            return self.columns['distance']
+        return haversine_km(campus.latitude, campus.longitude, self.columns['latitude'], self.columns['longitude'])
+
+    def is_stale(self):
+        ttl = getattr(settings, 'FEATURE_SNAPSHOT_TTL', 300)
+        return self.built_at is None or time.monotonic() - self.built_at > ttl
+
+
+_snapshot = PropertyFeatures()
+_build_lock = threading.Lock()
+
+
+def get_features():
+    """The process-wide snapshot, (re)built if it is missing or past its TTL."""
+    if _snapshot.is_stale():
+        with _build_lock:
+            if _snapshot.is_stale():
+                _snapshot.build()
+    return _snapshot
+
+
+def property_changed(property_ids):
+    """Patch the snapshot once the current transaction commits (no-op if it was never built)."""
+    if _snapshot.built_at is None:
+        return
+    property_ids = list(property_ids)
+    transaction.on_commit(lambda: _snapshot.refresh(property_ids))
+
+
+def campuses_changed():
+    """The default campus may have moved: rebuild on next use rather than patch every row."""
+    _snapshot.built_at = None
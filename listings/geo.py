@@ -0,0 +1,127 @@
+"""
+Geohash, slippy-map tile and distance helpers.
+
+Every Property with coordinates carries its geohash (models.Property.save), so
+clustering at a given zoom is a GROUP BY on a prefix of that column.
+"""
+import math
+
+import numpy as np
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_LENGTH = 9  # ~5 m cells, far finer than any zoom level we cluster at
+
+
+def encode_geohash(latitude, longitude, length=GEOHASH_LENGTH):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < length:
+        # Bits alternate longitude, latitude, ... starting with longitude
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) in degrees of a geohash cell of this length."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def geohash_bounds(geohash):
+    """(south, west, north, east) of a geohash cell."""
+    lat_range, lng_range, even = [-90.0, 90.0], [-180.0, 180.0], True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_cover(south, west, north, east, precision, max_cells=16):
+    """
+    Geohash prefixes whose cells together cover the box: the longest ones (at most
+    `precision` characters) that take no more than max_cells cells.
+    """
+    for length in range(precision, 0, -1):
+        height, width = _cell_size(length)
+        rows = range(int((south + 90.0) // height), int((min(north, 90.0) - 1e-12 + 90.0) // height) + 1)
+        columns = range(int((west + 180.0) // width), int((min(east, 180.0) - 1e-12 + 180.0) // width) + 1)
+        if len(rows) * len(columns) <= max_cells or length == 1:
+            return sorted({
+                encode_geohash(-90.0 + (row + 0.5) * height, -180.0 + (column + 0.5) * width, length)
+                for row in rows for column in columns
+            })
+
+
+def prefix_range(prefix):
+    """(low, high) such that low <= geohash < high exactly for geohashes starting with prefix; high is None past 'zzz...'."""
+    stripped = prefix.rstrip(BASE32[-1])
+    if not stripped:
+        return prefix, None
+    return prefix, stripped[:-1] + BASE32[BASE32.index(stripped[-1]) + 1]
+
+
+def tile_bounds(z, x, y):
+    """(south, west, north, east) of a Web Mercator tile, as Leaflet/OSM number them."""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_for_bbox(south, west, north, east, z):
+    """(x range, y range) of the tiles covering a bounding box at zoom z."""
+    n = 2 ** z
+
+    def column(lng):
+        return min(n - 1, max(0, int((lng + 180.0) / 360.0 * n)))
+
+    def row(lat):
+        lat = max(min(lat, 85.0511), -85.0511)
+        rad = math.radians(lat)
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(rad)) / math.pi) / 2 * n)))
+
+    return range(column(west), column(east) + 1), range(row(north), row(south) + 1)
+
+
+def precision_for_zoom(z):
+    # Geohash cells of this length come out at a few dozen pixels across on screen
+    # (zoom 10 -> 5 chars ~ 4.9 km, zoom 12 -> 6 chars ~ 1.2 km, zoom 14 -> 7 chars ~ 150 m)
+    return max(1, min(GEOHASH_LENGTH, z // 2))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Works on scalars and NumPy arrays alike."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 6371 * 2 * np.arcsin(np.sqrt(a))
+
+
+def distance_km(latitude, longitude, lat_field='latitude', lng_field='longitude'):
+    """Haversine distance in km from (latitude, longitude) to each row, as a database expression."""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    lat2, lng2 = Radians(F(lat_field)), Radians(F(lng_field))
+    a = Power(Sin((lat2 - lat1) / 2), 2) + math.cos(lat1) * Cos(lat2) * Power(Sin((lng2 - lng1) / 2), 2)
+    return ExpressionWrapper(6371 * 2 * ASin(Sqrt(a)), output_field=FloatField())
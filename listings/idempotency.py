@@ -0,0 +1,70 @@
+"""
+Replay protection for booking POSTs (Idempotency-Key header) and Twilio
+webhook retries (MessageSid).
+
+The first request with a key runs normally and its response is kept for
+IDEMPOTENCY_TTL seconds in the IDEMPOTENCY_CACHE cache (bounded by that cache's
+own size limit); a repeat gets the stored response back without creating
+anything or notifying anyone again. Use a shared cache (Redis, database) when
+running several workers, since a retry can land on any of them. The partial
+unique constraints on Booking are the backstop either way.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+# A request still in flight holds its key this long at most
+CLAIM_SECONDS = 60
+
+
+def _cache():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE', 'default')]
+
+
+def _ttl():
+    return getattr(settings, 'IDEMPOTENCY_TTL', 24 * 3600)
+
+
+def fingerprint(data):
+    return hashlib.sha256(repr(sorted(data.items())).encode()).hexdigest()
+
+
+class Replay:
+    """
+    One idempotent operation:
+
+        replay = Replay('booking', request.user.pk, key, fingerprint(request.data))
+        stored, busy = replay.begin()
+        if stored is None and not busy:
+            ... do the work ...
+            replay.store(value)         # or replay.release() if it failed
+    """
+    def __init__(self, scope, owner, key, request_fingerprint=''):
+        # Hashed so any client-chosen key is a safe cache key
+        self.key = f'idem:{scope}:{owner}:{hashlib.sha256(key.encode()).hexdigest()}'
+        self.request_fingerprint = request_fingerprint
+
+    def begin(self):
+        """
+        (stored, busy): stored is (fingerprint, value) from an earlier attempt, busy
+        means another attempt is running right now. Neither means this one should run.
+        """
+        cache = _cache()
+        stored = cache.get(self.key)
+        if stored is not None:
+            return stored, False
+        if not cache.add(f'{self.key}:claim', 1, CLAIM_SECONDS):
+            return None, True
+        # The other attempt may have finished between the two checks
+        stored = cache.get(self.key)
+        if stored is not None:
+            self.release()
+        return stored, False
+
+    def store(self, value):
+        _cache().set(self.key, (self.request_fingerprint, value), _ttl())
+        self.release()
+
+    def release(self):
+        _cache().delete(f'{self.key}:claim')
@@ -0,0 +1,152 @@
+"""
+Bulk import of properties and their rooms from CSV or XLSX (agencies).
+
+One row per room. Rows that share a `ref` belong to the same property: the
+property columns are read from the first of them, the room_* columns from each
+(leave them blank for a property without rooms). For example
+
+    ref,title,price_per_month,address,gender_preference,room_label,room_capacity
+    A1,Hillside Cottage,120,12 Main Rd,Ladies,Room 1,2
+    A1,,,,,Room 2,3
+
+Rows are validated with the same serializer rules as the API and written with
+bulk_create, one transaction per batch. A property with any invalid row is
+skipped and its errors reported; the rest of the file still goes in.
+"""
+import csv
+import io
+from itertools import groupby
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from . import campuses, textdup
+from .availability import availability_changed
+from .geo import encode_geohash
+from .models import Property, Room
+from .serializers import PropertySerializer, RoomSerializer
+from .tasks import run_in_background
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+BATCH_SIZE = 500  # properties per transaction
+ROOM_PREFIX = 'room_'
+
+
+class ImportRoomSerializer(RoomSerializer):
+    class Meta(RoomSerializer.Meta):
+        fields = ['label', 'capacity', 'is_available']
+
+
+def read_rows(file, name):
+    """Yields (row number, {column: value}) from a binary CSV or XLSX file, skipping blank lines."""
+    if name.lower().endswith('.xlsx'):
+        if openpyxl is None:
+            raise ValueError("XLSX import needs openpyxl installed; upload a CSV instead.")
+        sheet = openpyxl.load_workbook(file, read_only=True, data_only=True).active
+        lines = sheet.iter_rows(values_only=True)
+        header = [str(cell or '').strip() for cell in next(lines, [])]
+        numbered = enumerate(lines, start=2)
+    else:
+        reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+        header = [cell.strip() for cell in next(reader, [])]
+        numbered = enumerate(reader, start=2)
+
+    if 'ref' not in header:
+        raise ValueError("The first row must be a header that includes a 'ref' column.")
+    for number, values in numbered:
+        row = {key: value for key, value in zip(header, values) if key and value not in (None, '')}
+        row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        if row:
+            yield number, row
+
+
+def _validate_group(rows, property_serializer, room_serializer):
+    """(property data, [room data], errors) for the rows of one ref."""
+    first_number, first = rows[0]
+    data, errors = None, []
+
+    try:
+        data = property_serializer.run_validation({k: v for k, v in first.items() if not k.startswith(ROOM_PREFIX)})
+    except ValidationError as e:
+        errors.append({'row': first_number, 'errors': e.detail})
+
+    rooms = []
+    for number, row in rows:
+        room = {k[len(ROOM_PREFIX):]: v for k, v in row.items() if k.startswith(ROOM_PREFIX)}
+        if not room:
+            continue
+        try:
+            rooms.append(room_serializer.run_validation(room))
+        except ValidationError as e:
+            errors.append({'row': number, 'errors': {f'{ROOM_PREFIX}{k}': v for k, v in e.detail.items()}})
+
+    return (data if not errors else None), rooms, errors
+
+
+def _write_batch(landlord, batch):
+    properties = []
+    for data, rooms in batch:
+        prop = Property(landlord=landlord, **data)
+        # bulk_create skips save(), which is what normally fills this in
+        if prop.latitude is not None and prop.longitude is not None:
+            prop.geohash = encode_geohash(prop.latitude, prop.longitude)
+        properties.append(prop)
+
+    with transaction.atomic():
+        Property.objects.bulk_create(properties)
+        rooms = [Room(property=prop, **room) for prop, (_, room_list) in zip(properties, batch) for room in room_list]
+        Room.objects.bulk_create(rooms)
+        campuses.update_distances(property_ids=[prop.pk for prop in properties])
+        # bulk_create skips post_save as well: refresh the snapshot/map and send alerts once for the batch
+        availability_changed.send(
+            sender=Property,
+            property_ids=[prop.pk for prop in properties],
+            published_ids=[prop.pk for prop in properties if prop.is_available],
+        )
+        # ...and the duplicate-text check (signals.py step 9), for the whole batch in one job
+        run_in_background(textdup.check_properties, [prop.pk for prop in properties])
+    return len(properties), len(rooms)
+
+
+def import_properties(landlord, rows, batch_size=BATCH_SIZE):
+    """
+    rows: iterable of (row number, dict) as from read_rows(). Returns a summary
+    with the number of properties/rooms created and the row-level errors.
+    """
+    summary = {'properties': 0, 'rooms': 0, 'errors': []}
+    batch = []
+    # One serializer of each kind validates every row, as ListSerializer does: building
+    # a serializer's fields costs far more than running them
+    property_serializer, room_serializer = PropertySerializer(), ImportRoomSerializer()
+
+    def flush():
+        created_properties, created_rooms = _write_batch(landlord, batch)
+        summary['properties'] += created_properties
+        summary['rooms'] += created_rooms
+        batch.clear()
+
+    # Rows of one property have to be next to each other; a ref seen again later is an error
+    seen = set()
+    for ref, group in groupby(rows, key=lambda item: str(item[1].get('ref', ''))):
+        group = list(group)
+        if not ref or ref in seen:
+            message = "Missing ref." if not ref else f"ref '{ref}' appears again after other properties; keep its rows together."
+            summary['errors'] += [{'row': number, 'errors': {'ref': [message]}} for number, _ in group]
+            continue
+        seen.add(ref)
+
+        data, rooms, errors = _validate_group(group, property_serializer, room_serializer)
+        if errors:
+            summary['errors'] += errors
+            continue
+        batch.append((data, rooms))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return summary
@@ -0,0 +1,53 @@
+"""
+The maintenance jobs run by `python manage.py run_scheduler` (see scheduler.py).
+
+Each takes dry_run and returns a small summary that ends up in the job's
+metrics; with dry_run it reports what it would change and changes nothing.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import changefeed, mediagc
+from .models import Booking, Property
+from .scheduler import job
+
+# Rows per UPDATE when expiring bookings, so no single statement holds locks for long
+EXPIRE_BATCH_SIZE = 1000
+
+
+@job(every=datetime.timedelta(hours=1))
+def expire_pending_bookings(dry_run=False):
+    """Pending requests the landlord never answered within BOOKING_PENDING_DAYS become 'expired'."""
+    cutoff = timezone.now() - datetime.timedelta(days=getattr(settings, 'BOOKING_PENDING_DAYS', 14))
+    stale = Booking.objects.filter(status='pending', created_at__lt=cutoff)
+    if dry_run:
+        return {'expired': stale.count()}
+
+    expired = 0
+    while True:
+        ids = list(stale.order_by('id').values_list('id', flat=True)[:EXPIRE_BATCH_SIZE])
+        if not ids:
+            break
+        # Re-checked in the UPDATE in case the landlord answered in between
+        expired += Booking.objects.filter(id__in=ids, status='pending').update(status='expired')
+    return {'expired': expired}
+
+
+@job(every=datetime.timedelta(days=1))
+def recompute_review_stats(dry_run=False):
+    """Fixes review_count / rating_avg drift (reviews changed without signals, e.g. from raw SQL)."""
+    return {'updated': Property.update_review_stats(dry_run=dry_run)}
+
+
+@job(every=datetime.timedelta(days=1))
+def prune_tombstones(dry_run=False):
+    return {'pruned': changefeed.prune_tombstones(dry_run=dry_run)}
+
+
+@job(every=datetime.timedelta(days=1))
+def prune_orphaned_media(dry_run=False):
+    """Uploads no image/profile row points at any more, past MEDIA_GC_GRACE_HOURS (see mediagc.py)."""
+    summary = mediagc.collect(dry_run=dry_run)
+    return {key: summary[key] for key in ('orphans', 'deleted', 'too_new', 'bytes')}
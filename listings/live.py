@@ -0,0 +1,232 @@
+"""
+Live updates over Server-Sent Events at /api/live/ (ASGI only, see backend/asgi.py).
+
+An in-process hub fans events out to every open stream in this worker:
+availability changes of properties and rooms go to everyone, booking status
+changes only to the student and the landlord concerned. signals.py publishes
+them once the transaction commits.
+
+Each stream has its own bounded queue. A client too slow to keep up doesn't
+hold anything back: its backlog is thrown away and it gets a single `resync`
+event, after which it should re-read /api/properties/changes/. Idle streams
+get a comment line every LIVE_HEARTBEAT seconds so proxies keep them open and
+dead ones are noticed.
+
+The stream is a small ASGI app in front of Django rather than a Django view: a
+view's request would hold on to its middleware thread, resolver match and
+request objects for as long as the connection stays open, which comes to tens
+of KB per idle client. Here an idle client costs its socket, one task and a queue.
+
+The hub only reaches streams held by the same process, so events raised in one
+worker aren't seen by clients connected to another. Serve the stream and the
+API from the same ASGI process, or put a shared broker behind publish() before
+scaling out.
+"""
+import asyncio
+import json
+import threading
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Subscription:
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=_setting('LIVE_QUEUE_SIZE', 100))
+        self.dropped = 0
+
+    def offer(self, event):
+        """Runs on the subscription's loop."""
+        audience = event.get('audience')
+        if audience is not None and self.user_id not in audience:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class Hub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # loop -> subscriptions, so publishing from a worker thread can hop onto each loop once
+        self.subscriptions = {}
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(subs) for subs in self.subscriptions.values())
+
+    def full(self):
+        return len(self) >= _setting('LIVE_MAX_CONNECTIONS', 10000)
+
+    def subscribe(self, user_id=None):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions.setdefault(subscription.loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subs = self.subscriptions.get(subscription.loop, set())
+            subs.discard(subscription)
+            if not subs:
+                self.subscriptions.pop(subscription.loop, None)
+
+    def publish(self, event, data, audience=None):
+        """Thread-safe. audience: user ids allowed to see the event, None for everyone."""
+        # Encoded once here rather than once per stream
+        message = {'payload': format_event(event, data), 'audience': set(audience) if audience is not None else None}
+        with self.lock:
+            targets = [(loop, list(subs)) for loop, subs in self.subscriptions.items()]
+        for loop, subs in targets:
+            if loop.is_closed():
+                continue
+            loop.call_soon_threadsafe(self._deliver, subs, message)
+
+    @staticmethod
+    def _deliver(subs, message):
+        for subscription in subs:
+            subscription.offer(message)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+hub = Hub()
+RESYNC = {'payload': format_event('resync', {}), 'audience': None}
+
+
+def _user_id(raw_token):
+    """
+    User id from an access token passed as ?token= (EventSource can't send headers).
+    Only the signature and expiry are checked, not the database: the stream is read
+    only and a user just gets their own booking events, so a reconnect storm costs
+    no queries.
+    """
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    try:
+        return int(AccessToken(raw_token)[api_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError, ValueError):
+        return None
+
+
+def _cors_headers(origin):
+    if not origin:
+        return []
+    if getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False):
+        return [(b'access-control-allow-origin', b'*')]
+    if origin.decode('latin-1') in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+        return [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+    return []
+
+
+async def _send_json(send, status, detail, headers=()):
+    body = json.dumps({'detail': detail}).encode()
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()), *headers,
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class LiveEventsApp:
+    """ASGI app serving `path` itself and passing every other request on to `app` (Django)."""
+    def __init__(self, app, path='/api/live/'):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope['headers'])
+        cors = _cors_headers(headers.get(b'origin'))
+        if scope['method'] != 'GET':
+            return await _send_json(send, 405, f'Method "{scope["method"]}" not allowed.', [(b'allow', b'GET'), *cors])
+
+        user_id = None
+        token = parse_qs(scope['query_string'].decode('latin-1')).get('token', [''])[0]
+        if token:
+            user_id = _user_id(token)
+            if user_id is None:
+                return await _send_json(send, 401, 'Given token not valid for any token type', cors)
+        if hub.full():
+            return await _send_json(send, 503, 'Too many live connections, try again shortly.',
+                                    [(b'retry-after', b'30'), *cors])
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # nginx: pass events through as they come
+            *cors,
+        ]})
+        await self.stream(user_id, receive, send)
+
+    async def stream(self, user_id, receive, send):
+        heartbeat = _setting('LIVE_HEARTBEAT', 20)
+        subscription = hub.subscribe(user_id)
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            # Tells EventSource how long to wait before reconnecting
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while True:
+                message = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait({message, disconnected}, timeout=heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    message.cancel()
+                    return
+                if message in done:
+                    body = message.result()['payload']
+                else:
+                    message.cancel()
+                    body = b': ping\n\n'
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            disconnected.cancel()
+            hub.unsubscribe(subscription)
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+
+# --- What gets published (called from signals.py, after commit) ---
+
+def publish_availability(properties=None, rooms=None):
+    """
+    One event for a whole batch, so a bulk update costs one message per stream.
+    properties: {property id: is_available}; rooms: [(room id, property id, is_available)]
+    """
+    data = {
+        'properties': [{'id': pk, 'is_available': available} for pk, available in (properties or {}).items()],
+        'rooms': [{'id': pk, 'property': property_id, 'is_available': available}
+                  for pk, property_id, available in rooms or []],
+    }
+    if data['properties'] or data['rooms']:
+        hub.publish('availability', data)
+
+
+def publish_booking(booking_id, property_id, status, student_id):
+    from .models import Property
+
+    # Looked up here, after commit, rather than through booking.property during the save
+    landlord_id = Property.objects.filter(pk=property_id).values_list('landlord_id', flat=True).first()
+    hub.publish(
+        'booking',
+        {'id': booking_id, 'property': property_id, 'status': status},
+        audience={student_id, landlord_id},
+    )
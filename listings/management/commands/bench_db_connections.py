@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request database connection overhead by replaying the "
+        "request_started/request_finished cycle around a trivial query, first with "
+        "a fresh connection per request (the old behaviour) and then with the "
+        "configured CONN_MAX_AGE / pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Engine: {connection.vendor}, configured CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']}")
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.stdout.write(f"SQLite journal_mode: {cursor.fetchone()[0]}")
+
+        configured = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = 0
+            before = self.measure(options['requests'])
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = configured
+        after = self.measure(options['requests'])
+        connection.close()
+
+        self.report("Before (new connection per request)", before)
+        self.report("After (configured settings)", after)
+        self.stdout.write(f"Saved per request: {statistics.mean(before) - statistics.mean(after):.3f} ms")
+
+    def measure(self, n):
+        timings = []
+        for _ in range(n):
+            start = time.perf_counter()
+            # Django closes connections that are past CONN_MAX_AGE on both signals
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f"{label}: mean {statistics.mean(timings):.3f} ms, p95 {p95:.3f} ms")
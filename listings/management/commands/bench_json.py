@@ -0,0 +1,56 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from listings import compression
+from listings.renderers import FastJSONRenderer, orjson
+from listings.views import PropertyViewSet
+from listings.serializers import PropertySerializer
+
+
+class Command(BaseCommand):
+    help = "Compare JSON rendering CPU time and bytes on the wire for the property list payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=1, help="Repeat the listings N times to simulate a bigger catalog")
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/properties/'))
+        view = PropertyViewSet(request=request, format_kwarg=None)
+        data = PropertySerializer(view.get_queryset(), many=True, context={'request': request}).data
+        data = list(data) * options['repeat']
+        self.stdout.write(f"Payload: {len(data)} listings")
+
+        iterations = options['iterations']
+        body = None
+        for label, renderer in [('stdlib json (DRF)', JSONRenderer()), ('orjson', FastJSONRenderer())]:
+            if label == 'orjson' and orjson is None:
+                self.stdout.write("orjson: not installed, skipped")
+                continue
+            start = time.perf_counter()
+            for _ in range(iterations):
+                body = renderer.render(data)
+            ms = (time.perf_counter() - start) * 1000 / iterations
+            self.stdout.write(f"{label:<20} {ms:8.2f} ms/render  {len(body):>10} bytes")
+
+        encodings = ['gzip'] + (['br'] if compression.brotli else [])
+        for encoding in encodings:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                compressed = compression.compress(body, encoding)
+            ms = (time.perf_counter() - start) * 1000 / iterations
+            self.stdout.write(f"{encoding:<20} {ms:8.2f} ms/compress {len(compressed):>9} bytes ({len(compressed) / len(body):.0%})")
+
+        cache = compression.CompressedBodyCache(64 * 1024 * 1024)
+        key = ('gzip', compression.hashlib.sha1(body).digest())
+        cache.set(key, gzip.compress(body))
+        start = time.perf_counter()
+        for _ in range(iterations):
+            cache.get(('gzip', compression.hashlib.sha1(body).digest()))
+        ms = (time.perf_counter() - start) * 1000 / iterations
+        self.stdout.write(f"{'cached gzip reuse':<20} {ms:8.2f} ms/response (hash + lookup)")
@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from listings.management.commands.bench_ranking import synthetic_features
+from listings.similarity import SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = "Time building the similar-listings KD-tree and querying it over a synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('-k', type=int, default=5)
+
+    def handle(self, *args, **options):
+        features = synthetic_features(options['rows'])
+        index = SimilarityIndex()
+
+        start = time.perf_counter()
+        index.build(features)
+        self.stdout.write(f"Built index over {options['rows']} listings in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        rng = np.random.default_rng(1)
+        ids = rng.choice(features['id'], options['queries'])
+        timings = []
+        # Query the tree directly: similar() would swap our synthetic snapshot for the real one
+        for pk in ids:
+            start = time.perf_counter()
+            tree, tree_ids, vectors, rows = index.state
+            tree.query(vectors[rows[int(pk)]], k=options['k'] + 1)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        self.stdout.write(
+            f"k={options['k']} query: mean {np.mean(timings):.3f} ms, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms"
+        )
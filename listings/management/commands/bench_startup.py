@@ -0,0 +1,213 @@
+import os
+import shlex
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker does before it can answer: load the app (django.setup) and, on the first request, the URLconf
+BOOT = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')\n"
+    "from backend.{server} import application\n"
+    "from django.urls import get_resolver; get_resolver().url_patterns\n"
+)
+DEFAULT_COMMAND = "{python} -m gunicorn backend.wsgi:application --workers {workers} --bind 127.0.0.1:{port}"
+# Heavy optional integrations that should only load on first use
+WATCHED = ['twilio', 'cloudinary', 'cloudinary_storage', 'scipy', 'PIL']
+
+
+def _rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def _children(pid):
+    """Pids of every descendant of pid, from /proc (Linux only, like Render)."""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces; ppid is the 2nd field after it
+                    parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    found, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        kids = [child for child, ppid in parents.items() if ppid == parent]
+        found += kids
+        frontier += kids
+    return found
+
+
+def _role(pid, master):
+    if pid == master:
+        return 'master'
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            cmdline = f.read()
+    except OSError:
+        return None
+    # multiprocessing's resource tracker / spawn helpers (uvicorn --workers) aren't workers
+    return 'helper' if b'resource_tracker' in cmdline or b'forkserver' in cmdline else 'worker'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def parse_importtime(stderr):
+    """[(name, depth, self us, cumulative us)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure a worker's cold start: import time of the app with a per-package "
+        "breakdown (python -X importtime), time from launching the server to its first "
+        "response, and the resident memory of each worker. Pass --max-* limits to make "
+        "it fail on a regression, e.g. in CI: "
+        "bench_startup --max-import-ms 1500 --max-first-response-ms 4000 --max-worker-rss-mb 150"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi', help="Entry point whose imports are timed")
+        parser.add_argument('--runs', type=int, default=3, help="Cold starts per measurement; the median is reported")
+        parser.add_argument('--top', type=int, default=15, help="Packages to list in the import breakdown")
+        parser.add_argument('--command', default=DEFAULT_COMMAND,
+                            help="Server command line; {python}, {port} and {workers} are filled in")
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--path', default='/api/properties/', help="URL path requested for the first response")
+        parser.add_argument('--timeout', type=float, default=60.0, help="Seconds to wait for the first response")
+        parser.add_argument('--no-server', action='store_true', help="Only measure imports")
+        parser.add_argument('--max-import-ms', type=float, default=None)
+        parser.add_argument('--max-first-response-ms', type=float, default=None)
+        parser.add_argument('--max-worker-rss-mb', type=float, default=None)
+
+    def handle(self, *args, **options):
+        failures = []
+
+        import_ms = self.bench_imports(options)
+        if options['max_import_ms'] is not None and import_ms > options['max_import_ms']:
+            failures.append(f"import time {import_ms:.0f} ms > {options['max_import_ms']:.0f} ms")
+
+        if not options['no_server']:
+            first_ms, worker_rss = self.bench_server(options)
+            if options['max_first_response_ms'] is not None and first_ms > options['max_first_response_ms']:
+                failures.append(f"first response {first_ms:.0f} ms > {options['max_first_response_ms']:.0f} ms")
+            if options['max_worker_rss_mb'] is not None and worker_rss and max(worker_rss) > options['max_worker_rss_mb']:
+                failures.append(f"worker RSS {max(worker_rss):.0f} MB > {options['max_worker_rss_mb']:.0f} MB")
+
+        if failures:
+            raise CommandError("Cold start regressed: " + "; ".join(failures))
+
+    # 1. Imports, each run in a fresh interpreter
+    def bench_imports(self, options):
+        code = BOOT.format(server=options['server'])
+        totals, runs = [], []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True)
+            wall = (time.perf_counter() - start) * 1000
+            if result.returncode != 0:
+                raise CommandError(f"Booting the app failed:\n{result.stderr[-2000:]}")
+            rows = parse_importtime(result.stderr)
+            totals.append(sum(cumulative for _, depth, _, cumulative in rows if depth == 0) / 1000)
+            runs.append((rows, wall))
+
+        # Break down the median run by top-level package (self time, so nothing is counted twice)
+        median = statistics.median(totals)
+        rows, wall = runs[min(range(len(totals)), key=lambda i: abs(totals[i] - median))]
+        by_package, modules = defaultdict(int), defaultdict(int)
+        for name, _, self_us, _ in rows:
+            by_package[name.split('.')[0]] += self_us
+            modules[name.split('.')[0]] += 1
+
+        self.stdout.write(f"Import time ({options['server']}, median of {len(totals)}): {median:.0f} ms "
+                          f"(interpreter start to URLconf loaded: {wall:.0f} ms), {len(rows)} modules")
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {package} ({modules[package]} modules)")
+        loaded = [package for package in WATCHED if package in by_package]
+        self.stdout.write(f"Optional integrations loaded at boot: {', '.join(loaded) or 'none'}")
+        return median
+
+    # 2. A real server: time to first response, then memory per process
+    def bench_server(self, options):
+        timings, rss = [], {}
+        for run in range(options['runs']):
+            port = _free_port()
+            command = options['command'].format(python=shlex.quote(sys.executable), port=port, workers=options['workers'])
+            url = f"http://127.0.0.1:{port}{options['path']}"
+            log = tempfile.TemporaryFile()
+            start = time.perf_counter()
+            process = subprocess.Popen(shlex.split(command), stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+            try:
+                status = self.wait_for_response(url, process, log, start + options['timeout'])
+                elapsed = (time.perf_counter() - start) * 1000
+                timings.append(elapsed)
+                self.stdout.write(f"  run {run + 1}: HTTP {status} after {elapsed:.0f} ms")
+                if run == options['runs'] - 1:
+                    # Give the other workers time to finish booting before measuring them
+                    time.sleep(2)
+                    rss = {pid: (_role(pid, process.pid), _rss_mb(pid)) for pid in [process.pid] + _children(process.pid)}
+            finally:
+                os.killpg(process.pid, signal.SIGTERM)
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+                log.close()
+
+        first_ms = statistics.median(timings)
+        self.stdout.write(f"First response (median of {len(timings)}): {first_ms:.0f} ms")
+        for pid, (role, mb) in rss.items():
+            if mb is not None:
+                self.stdout.write(f"  pid {pid}: {mb:.1f} MB ({role})")
+        # With a process manager (gunicorn, uvicorn --workers) the launched process is the master;
+        # without one it is the only worker
+        workers = {pid: mb for pid, (role, mb) in rss.items() if role == 'worker' and mb is not None}
+        if not workers and rss:
+            workers = {pid: mb for pid, (role, mb) in rss.items() if role == 'master' and mb is not None}
+        if workers:
+            self.stdout.write(f"Worker RSS: max {max(workers.values()):.1f} MB, "
+                              f"mean {statistics.mean(workers.values()):.1f} MB over {len(workers)} workers")
+        return first_ms, list(workers.values())
+
+    def wait_for_response(self, url, process, log, deadline):
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"The server exited with {process.returncode}:\n{log.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                # Any answer from Django counts, even a 401/404
+                return e.code
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.02)
+        raise CommandError(f"No response from {url} within the timeout")
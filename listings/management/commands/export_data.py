@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings import exports
+
+
+class Command(BaseCommand):
+    help = "Stream properties, bookings, reviews or reports to CSV / NDJSON without loading them into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--since', help="Only rows created on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--until', help="Only rows created on or before this date (YYYY-MM-DD)")
+        parser.add_argument('--landlord', type=int, help="Only rows for this landlord's properties (user id)")
+        parser.add_argument('--output', '-o', default='-', help="File to write to ('-' for stdout)")
+
+    def handle(self, *args, **options):
+        filters = {'since': options['since'], 'until': options['until'], 'landlord': options['landlord']}
+        try:
+            exports.export_queryset(options['name'], **filters)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        out = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in exports.stream(options['name'], options['format'], **filters):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
@@ -0,0 +1,43 @@
+import datetime
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+
+from listings import mediagc
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete uploaded property/profile images that no row references any more. "
+        "Streams the storage listing and the referenced names in sorted order and merge-joins them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--storage', default='default', help="STORAGES alias to clean")
+        parser.add_argument('--grace-hours', type=float, default=getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24),
+                            help="Leave orphans younger than this alone (uploads still being saved)")
+        parser.add_argument('--batch-size', type=int, default=mediagc.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Only list what would be deleted")
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 1 or options['dry_run']
+
+        def show(name, size, modified):
+            if verbose:
+                size = f"{size / 1024:.0f} KB" if size is not None else "? KB"
+                self.stdout.write(f"  {name}  {size}  {modified:%Y-%m-%d %H:%M}")
+
+        summary = mediagc.collect(
+            storages[options['storage']],
+            grace=datetime.timedelta(hours=options['grace_hours']),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            on_orphan=show,
+        )
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(
+            f"{verb} {summary['deleted']} of {summary['orphans']} orphaned files "
+            f"({summary['bytes'] / 1024 / 1024:.1f} MB); kept {summary['too_new']} newer than the grace period"
+            + (f" and {summary['unknown_age']} of unknown age" if summary['unknown_age'] else "")
+        )
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from listings import photohash
+from listings.models import PropertyImage
+
+
+def _init_worker():
+    # Spawned (not forked) workers start without Django set up
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_one(item):
+    pk, name = item
+    try:
+        return pk, photohash.hash_file(name), None
+    except Exception as e:
+        return pk, None, f"{name}: {e}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill perceptual hashes for property photos across a pool of processes, then flag "
+        "photos reused across different landlords' listings as automatic 'fake' reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--all', action='store_true', help="Rehash images that already have a hash")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Hashes saved per transaction")
+        parser.add_argument('--no-flag', action='store_true', help="Only compute hashes, don't look for matches")
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.exclude(image='')
+        if not options['all']:
+            images = images.filter(phash__isnull=True)
+        todo = images.order_by('id').values_list('id', 'image')
+        total = todo.count()
+
+        start = time.perf_counter()
+        hashed, failed, pending = 0, [], {}
+        if total:
+            # Children only read files; they must not share the parent's database sockets
+            connections.close_all()
+            with multiprocessing.Pool(options['workers'], initializer=_init_worker) as pool:
+                for pk, value, error in pool.imap_unordered(_hash_one, todo.iterator(chunk_size=2000), chunksize=32):
+                    if error:
+                        failed.append(error)
+                        continue
+                    pending[pk] = value
+                    if len(pending) >= options['batch_size']:
+                        photohash.save_hashes(pending)
+                        hashed += len(pending)
+                        pending = {}
+                        self.stdout.write(f"  {hashed}/{total} hashed ({hashed / (time.perf_counter() - start):.0f}/s)")
+            if pending:
+                photohash.save_hashes(pending)
+                hashed += len(pending)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Hashed {hashed} images in {elapsed:.1f}s with {options['workers']} workers"
+            + (f" ({hashed / elapsed:.0f}/s)" if hashed else "")
+        )
+        for error in failed[:20]:
+            self.stderr.write(f"  could not hash {error}")
+        if len(failed) > 20:
+            self.stderr.write(f"  ... and {len(failed) - 20} more")
+
+        if not options['no_flag']:
+            self.flag_duplicates()
+
+    def flag_duplicates(self):
+        start = time.perf_counter()
+        rows = PropertyImage.objects.filter(phash__isnull=False).values_list('id', 'phash', 'property__landlord_id')
+        hashes, landlords = {}, {}
+        for pk, value, landlord_id in rows.iterator(chunk_size=5000):
+            hashes[pk], landlords[pk] = value, landlord_id
+
+        pairs = list(photohash.find_pairs(hashes, landlords))
+        flagged = 0
+        if pairs:
+            images = PropertyImage.objects.select_related('property__landlord').in_bulk({pk for pair in pairs for pk in pair[:2]})
+            for older, newer, dist in sorted(pairs, key=lambda pair: (pair[2], pair[0])):
+                flagged += photohash.flag(images[newer], images[older], dist) is not None
+        self.stdout.write(
+            f"Compared {len(hashes)} hashes in {time.perf_counter() - start:.1f}s: "
+            f"{len(pairs)} cross-landlord matches, {flagged} new reports"
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from listings import imports
+
+
+class Command(BaseCommand):
+    help = "Import properties and their rooms from a CSV or XLSX file (see listings/imports.py for the layout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--landlord', required=True, help="Username of the landlord the listings belong to")
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            landlord = User.objects.get(username=options['landlord'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user called {options['landlord']!r}.")
+
+        start = time.perf_counter()
+        with open(options['path'], 'rb') as f:
+            try:
+                summary = imports.import_properties(landlord, imports.read_rows(f, options['path']), options['batch_size'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            f"Imported {summary['properties']} properties and {summary['rooms']} rooms "
+            f"in {time.perf_counter() - start:.1f}s ({len(summary['errors'])} rows rejected)"
+        )
@@ -0,0 +1,112 @@
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import aiohttp
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at a running server and report throughput. "
+        "Run it once against the sync deployment (gunicorn backend.wsgi) and once "
+        "against the ASGI one (uvicorn backend.asgi) with the same --server-workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="e.g. http://127.0.0.1:8000/api/async/properties/")
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--method', default='GET')
+        parser.add_argument('--data', default=None, help="Form body for POSTs, e.g. 'Body=hi&From=whatsapp:+263771234567'")
+        parser.add_argument('--header', action='append', default=[], help="Extra 'Name: value' header, repeatable")
+        parser.add_argument('--server-workers', type=int, default=1, help="Worker processes behind the URL, to report req/s per worker")
+        parser.add_argument('--probe', default=None, help="A URL fetched once every --probe-interval during the run, "
+                            "to see how normal traffic fares while the main URL is hammered (e.g. a throttled endpoint)")
+        parser.add_argument('--probe-interval', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        headers = dict(h.split(':', 1) for h in options['header'])
+        headers = {k.strip(): v.strip() for k, v in headers.items()}
+        if options['data']:
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+
+        latencies, statuses, elapsed, probes = asyncio.run(self.run(options, headers))
+        self.report(latencies, statuses, elapsed, options['server_workers'])
+        if options['probe']:
+            self.report_probes(*probes)
+
+    async def run(self, options, headers):
+        queue = asyncio.Queue()
+        for _ in range(options['requests']):
+            queue.put_nowait(None)
+
+        latencies = []
+        statuses = Counter()
+
+        async def worker(session):
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    async with session.request(options['method'], options['url'], data=options['data'], headers=headers) as resp:
+                        await resp.read()
+                        statuses[resp.status] += 1
+                except aiohttp.ClientError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        probe_latencies = []
+        probe_statuses = Counter()
+        done = asyncio.Event()
+
+        async def probe(session):
+            # Its own connection, so it isn't queued behind the load's connection pool
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    async with session.get(options['probe']) as resp:
+                        await resp.read()
+                        probe_statuses[resp.status] += 1
+                except aiohttp.ClientError as e:
+                    probe_statuses[type(e).__name__] += 1
+                probe_latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(options['probe_interval'])
+
+        connector = aiohttp.TCPConnector(limit=options['concurrency'])
+        async with aiohttp.ClientSession(connector=connector) as session, aiohttp.ClientSession() as probe_session:
+            probe_task = asyncio.create_task(probe(probe_session)) if options['probe'] else None
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(session) for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - start
+            done.set()
+            if probe_task:
+                await probe_task
+
+        return latencies, statuses, elapsed, (probe_latencies, probe_statuses)
+
+    def report(self, latencies, statuses, elapsed, server_workers):
+        if not latencies:
+            self.stdout.write("No requests were made.")
+            return
+
+        latencies.sort()
+        rps = len(latencies) / elapsed
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        self.stdout.write(f"Requests:        {len(latencies)} in {elapsed:.2f}s")
+        self.stdout.write(f"Throughput:      {rps:.1f} req/s ({rps / server_workers:.1f} req/s per worker)")
+        self.stdout.write(f"Latency (ms):    mean {statistics.mean(latencies):.1f}  p50 {pct(0.5):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}")
+        self.stdout.write(f"Responses:       {dict(statuses)}")
+
+    def report_probes(self, latencies, statuses):
+        if not latencies:
+            return
+        latencies.sort()
+        self.stdout.write(
+            f"Probe (ms):      p50 {latencies[len(latencies) // 2]:.1f}  max {latencies[-1]:.1f}  "
+            f"over {len(latencies)} requests {dict(statuses)}"
+        )
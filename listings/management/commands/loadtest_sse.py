@@ -0,0 +1,132 @@
+import asyncio
+import json
+import resource
+import time
+from collections import Counter
+
+import aiohttp
+from django.core.management.base import BaseCommand
+
+
+def _rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold many idle connections open on the live (SSE) stream of a running ASGI "
+        "server, then optionally fire one change and time how long it takes to reach "
+        "every connection, e.g. "
+        "loadtest_sse http://127.0.0.1:8000/api/live/ --connections 5000 --server-pid 1234 "
+        "--trigger-url http://127.0.0.1:8000/api/availability/ "
+        "--trigger-data '{\"properties\": [{\"id\": 1, \"is_available\": false}]}' "
+        "--header 'Authorization: Bearer ...'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="e.g. http://127.0.0.1:8000/api/live/")
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--ramp', type=int, default=200, help="Connections opened at a time")
+        parser.add_argument('--hold', type=float, default=5.0, help="Seconds to sit idle once everyone is connected")
+        parser.add_argument('--server-pid', type=int, default=None, help="Worker pid, to report its memory per connection")
+        parser.add_argument('--trigger-url', default=None, help="POSTed once after --hold; every stream should get the event")
+        parser.add_argument('--trigger-data', default=None, help="JSON body for --trigger-url")
+        parser.add_argument('--header', action='append', default=[], help="'Name: value' header for the trigger, repeatable")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for the event to arrive everywhere")
+
+    def handle(self, *args, **options):
+        # One socket per connection: lift the open-files limit as far as we're allowed
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+        headers = dict(h.split(':', 1) for h in options['header'])
+        headers = {k.strip(): v.strip() for k, v in headers.items()}
+        asyncio.run(self.run(options, headers))
+
+    async def run(self, options, headers):
+        pid = options['server_pid']
+        rss_before = _rss_mb(pid) if pid else None
+
+        connected = Counter()
+        received = []  # seconds from the trigger to the event, per connection
+        trigger_sent = None
+        heartbeats = Counter()
+        ready = asyncio.Event()
+        target = options['connections']
+
+        async def listen(session):
+            nonlocal trigger_sent
+            try:
+                async with session.get(options['url'], timeout=aiohttp.ClientTimeout(total=None, sock_read=None)) as resp:
+                    connected[resp.status] += 1
+                    if sum(connected.values()) >= target:
+                        ready.set()
+                    if resp.status != 200:
+                        return
+                    event = None
+                    async for line in resp.content:
+                        line = line.decode().rstrip('\n')
+                        if line.startswith(': ping'):
+                            heartbeats['ping'] += 1
+                        elif line.startswith('event: '):
+                            event = line[len('event: '):]
+                        elif line == '' and event and trigger_sent is not None:
+                            received.append(time.perf_counter() - trigger_sent)
+                            return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                connected[type(e).__name__] += 1
+                if sum(connected.values()) >= target:
+                    ready.set()
+
+        connector = aiohttp.TCPConnector(limit=0, force_close=True)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            start = time.perf_counter()
+            tasks = []
+            for i in range(0, target, options['ramp']):
+                tasks += [asyncio.create_task(listen(session)) for _ in range(min(options['ramp'], target - i))]
+                await asyncio.sleep(0.05)
+            await ready.wait()
+            self.stdout.write(f"Connected:       {dict(connected)} in {time.perf_counter() - start:.1f}s")
+
+            await asyncio.sleep(options['hold'])
+            if pid:
+                rss = _rss_mb(pid)
+                open_streams = connected[200] or 1
+                self.stdout.write(
+                    f"Worker RSS:      {rss_before:.0f} MB -> {rss:.0f} MB "
+                    f"({(rss - rss_before) * 1024 / open_streams:.1f} KB per stream)"
+                )
+            if heartbeats:
+                self.stdout.write(f"Heartbeats:      {heartbeats['ping']} during the hold")
+
+            if options['trigger_url']:
+                data = json.loads(options['trigger_data']) if options['trigger_data'] else None
+                trigger_sent = time.perf_counter()
+                async with aiohttp.ClientSession() as trigger_session:
+                    async with trigger_session.post(options['trigger_url'], json=data, headers=headers) as resp:
+                        self.stdout.write(f"Trigger:         {resp.status} in {(time.perf_counter() - trigger_sent) * 1000:.0f} ms")
+                await asyncio.wait(tasks, timeout=options['timeout'])
+                self.report(received, connected[200])
+
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def report(self, received, open_streams):
+        if not received:
+            self.stdout.write("Fan-out:         no stream received the event")
+            return
+        received.sort()
+
+        def pct(p):
+            return received[min(len(received) - 1, int(len(received) * p))] * 1000
+
+        self.stdout.write(f"Fan-out:         {len(received)}/{open_streams} streams got the event")
+        self.stdout.write(f"Delivery (ms):   p50 {pct(0.5):.0f}  p99 {pct(0.99):.0f}  max {received[-1] * 1000:.0f}")
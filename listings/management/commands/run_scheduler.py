@@ -0,0 +1,69 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from listings import jobs  # noqa: F401  (registers the jobs)
+from listings.models import JobLease
+from listings.scheduler import JOBS, default_owner, run_forever, run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the maintenance jobs (expiring stale bookings, recomputing aggregates, ...) on their "
+        "schedules. Several copies can run at once: a database lease per job keeps each run to one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', action='append', dest='jobs', help="Only this job (repeatable)")
+        parser.add_argument('--once', action='store_true', help="Run whatever is due once and exit")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Run the selected jobs now, due or not, and only report what they would change")
+        parser.add_argument('--poll', type=float, default=getattr(settings, 'SCHEDULER_POLL_SECONDS', 30),
+                            help="Seconds between checks for due jobs")
+        parser.add_argument('--list', action='store_true', help="Show the jobs, their schedule and timing metrics")
+
+    def handle(self, *args, **options):
+        names = options['jobs']
+        unknown = set(names or []) - set(JOBS)
+        if unknown:
+            raise CommandError(f"Unknown job(s): {', '.join(sorted(unknown))}. Known: {', '.join(sorted(JOBS))}")
+
+        if options['list']:
+            return self.list_jobs()
+
+        owner = default_owner()
+        if options['dry_run'] or options['once']:
+            for outcome in run_pending(owner, names, dry_run=options['dry_run']):
+                self.report(outcome, options['dry_run'])
+            return
+
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        self.stdout.write(f"Scheduler {owner} running {', '.join(names or JOBS)} (Ctrl+C to stop)")
+        run_forever(owner, names, options['poll'], stop, on_run=self.report)
+
+    def report(self, outcome, dry_run=False):
+        line = f"{outcome['job']}: {outcome['status']} in {outcome['duration_ms']:.1f} ms {outcome['result'] or ''}"
+        if dry_run:
+            line += " (dry run)"
+        if outcome['status'] == 'ok':
+            self.stdout.write(line)
+        else:
+            self.stderr.write(line + "\n" + outcome['error'])
+
+    def list_jobs(self):
+        leases = {lease.name: lease for lease in JobLease.objects.filter(name__in=JOBS)}
+        for name, job in sorted(JOBS.items()):
+            lease = leases.get(name)
+            if lease is None or not lease.runs:
+                self.stdout.write(f"{name:28} every {job.every}  never run")
+                continue
+            self.stdout.write(
+                f"{name:28} every {job.every}  next {lease.next_run_at:%Y-%m-%d %H:%M}  "
+                f"runs {lease.runs} (failed {lease.failures})  ms last {lease.last_duration_ms:.1f} "
+                f"avg {lease.total_duration_ms / lease.runs:.1f} max {lease.max_duration_ms:.1f}  "
+                f"last result {lease.last_result}"
+            )
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from listings import textdup
+from listings.models import Property
+
+
+def _init_worker():
+    # Spawned (not forked) workers start without Django set up
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _sign(item):
+    pk, title, description = item
+    return pk, textdup.signature(title, description)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the MinHash signatures and LSH buckets of every listing's title/description across a "
+        "pool of processes, then file automatic reports for listings that copy an older one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--missing', action='store_true', help="Only sign listings without a signature")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Signatures saved per transaction")
+        parser.add_argument('--no-flag', action='store_true', help="Only rebuild signatures, don't file reports")
+
+    def handle(self, *args, **options):
+        properties = Property.objects.all()
+        if options['missing']:
+            properties = properties.filter(minhash__isnull=True)
+        todo = properties.order_by('id').values_list('id', 'title', 'description')
+        total = todo.count()
+
+        start = time.perf_counter()
+        signed, pending = 0, {}
+        if total:
+            # Children only do arithmetic; they must not share the parent's database sockets
+            connections.close_all()
+            with multiprocessing.Pool(options['workers'], initializer=_init_worker) as pool:
+                for pk, sig in pool.imap_unordered(_sign, todo.iterator(chunk_size=2000), chunksize=64):
+                    pending[pk] = sig
+                    if len(pending) >= options['batch_size']:
+                        textdup.save_signatures(pending)
+                        signed += len(pending)
+                        pending = {}
+                        self.stdout.write(f"  {signed}/{total} signed ({signed / (time.perf_counter() - start):.0f}/s)")
+            if pending:
+                textdup.save_signatures(pending)
+                signed += len(pending)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Signed {signed} listings in {elapsed:.1f}s with {options['workers']} workers"
+            + (f" ({signed / elapsed:.0f}/s)" if signed else "")
+        )
+
+        if not options['no_flag']:
+            self.flag_duplicates()
+
+    def flag_duplicates(self):
+        start = time.perf_counter()
+        rows = Property.objects.filter(minhash__isnull=False).values_list('id', 'minhash')
+        signatures = dict(rows.iterator(chunk_size=5000))
+
+        pairs = list(textdup.find_pairs(signatures))
+        flagged = 0
+        if pairs:
+            properties = Property.objects.select_related('landlord').in_bulk({pk for pair in pairs for pk in pair[:2]})
+            # Each copy is reported once, against the oldest listing it matches
+            reported = set()
+            for older, newer, score in sorted(pairs):
+                if newer not in reported:
+                    reported.add(newer)
+                    flagged += textdup.flag(properties[newer], properties[older], score) is not None
+        self.stdout.write(
+            f"Compared {len(signatures)} signatures in {time.perf_counter() - start:.1f}s: "
+            f"{len(pairs)} near-duplicate pairs, {flagged} new reports"
+        )
@@ -0,0 +1,128 @@
+"""
+Map data per Web Mercator tile for the Leaflet view.
+
+Below POINTS_MIN_ZOOM a tile is a handful of clusters, one per geohash cell,
+from a single GROUP BY; from there on it is the individual listings with just
+enough fields for a marker. Rows are picked through the indexed geohash column,
+as a few prefix ranges covering the tile. A cell that straddles a tile edge
+belongs to the tile holding its centre, so it's drawn (and counted) once.
+
+Tiles are cached under a generation number that any Property save/delete
+bumps, so a cached tile never outlives a change. Both live in the
+MAPTILES_CACHE alias, which has to be a cache every worker shares (Redis,
+database) when running more than one; with a per-process cache other workers
+keep serving their old tiles for up to TILE_CACHE_SECONDS.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Avg, Count, Min, Q
+from django.db.models.functions import Substr
+
+from .geo import geohash_bounds, geohash_cover, precision_for_zoom, prefix_range, tile_bounds, tiles_for_bbox
+from .models import Property
+
+POINTS_MIN_ZOOM = 15
+MAX_ZOOM = 20
+MAX_TILES = 64  # per bbox request
+TILE_CACHE_SECONDS = 600
+
+GENERATION_KEY = 'maptiles:generation'
+
+
+def _cache():
+    return caches[getattr(settings, 'MAPTILES_CACHE', 'default')]
+
+
+def generation():
+    return _cache().get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate():
+    try:
+        _cache().incr(GENERATION_KEY)
+    except ValueError:
+        _cache().set(GENERATION_KEY, 1, None)
+
+
+def listings_changed():
+    transaction.on_commit(invalidate)
+
+
+def _covering(south, west, north, east, precision):
+    """Listings whose geohash starts with one of the prefixes covering the box (index range scans)."""
+    ranges = Q()
+    for prefix in geohash_cover(south, west, north, east, precision):
+        low, high = prefix_range(prefix)
+        ranges |= Q(geohash__gte=low, geohash__lt=high) if high else Q(geohash__gte=low)
+    return Property.objects.filter(ranges)
+
+
+def _owns(bounds, cell):
+    south, west, north, east = bounds
+    cell_south, cell_west, cell_north, cell_east = geohash_bounds(cell)
+    lat, lng = (cell_south + cell_north) / 2, (cell_west + cell_east) / 2
+    return south <= lat < north and west <= lng < east
+
+
+def build_tile(z, x, y, only_available=False):
+    bounds = south, west, north, east = tile_bounds(z, x, y)
+    precision = precision_for_zoom(z)
+    queryset = _covering(south, west, north, east, precision)
+    if only_available:
+        queryset = queryset.filter(is_available=True)
+
+    if z >= POINTS_MIN_ZOOM:
+        queryset = queryset.filter(latitude__gte=south, latitude__lt=north, longitude__gte=west, longitude__lt=east)
+        points = queryset.values_list('id', 'latitude', 'longitude', 'price_per_month', 'is_available')
+        return {
+            'clusters': [],
+            'points': [
+                {'id': pk, 'lat': lat, 'lng': lng, 'price': price, 'is_available': available}
+                for pk, lat, lng, price, available in points
+            ],
+        }
+
+    cells = (
+        queryset.annotate(cell=Substr('geohash', 1, precision))
+        .values('cell')
+        .annotate(count=Count('id'), lat=Avg('latitude'), lng=Avg('longitude'), min_price=Min('price_per_month'), first_id=Min('id'))
+        .order_by('cell')
+    )
+    clusters = []
+    for cell in cells:
+        if not _owns(bounds, cell['cell']):
+            continue
+        cluster = {
+            'geohash': cell['cell'], 'count': cell['count'],
+            'lat': cell['lat'], 'lng': cell['lng'], 'min_price': cell['min_price'],
+        }
+        # Lone listings can be drawn (and linked) as a normal marker
+        if cell['count'] == 1:
+            cluster['id'] = cell['first_id']
+        clusters.append(cluster)
+    return {'clusters': clusters, 'points': []}
+
+
+def get_tile(z, x, y, only_available=False):
+    key = f'maptiles:{generation()}:{int(only_available)}:{z}/{x}/{y}'
+    tile = _cache().get(key)
+    if tile is None:
+        tile = build_tile(z, x, y, only_available)
+        _cache().set(key, tile, TILE_CACHE_SECONDS)
+    return tile
+
+
+def get_bbox(south, west, north, east, z, only_available=False):
+    """Merged tiles covering a bbox, or None if the bbox spans more than MAX_TILES tiles."""
+    columns, rows = tiles_for_bbox(south, west, north, east, z)
+    if len(columns) * len(rows) > MAX_TILES:
+        return None
+    clusters, points = {}, {}
+    for x in columns:
+        for y in rows:
+            data = get_tile(z, x, y, only_available)
+            # Tiles don't overlap, but keyed anyway so nothing can ever be drawn twice
+            clusters.update((cluster['geohash'], cluster) for cluster in data['clusters'])
+            points.update((point['id'], point) for point in data['points'])
+    return {'clusters': list(clusters.values()), 'points': list(points.values())}
@@ -0,0 +1,161 @@
+"""
+Garbage collection of uploaded images nothing points at any more (deleted
+properties, replaced profile pictures, abandoned uploads).
+
+Neither side is loaded whole. The stored files are listed in name order (one
+directory at a time from FileSystemStorage, a page at a time from a store with
+list_page(), see storage.py) and the names referenced by PropertyImage.image and
+Profile.profile_picture come from the database in the same order, a chunk at a
+time. One merge-join pass over the two sorted streams finds the orphans.
+
+Orphans younger than the grace period are left alone, since an upload's file is
+written before its row commits. Each batch is checked against the database once
+more right before it is deleted.
+"""
+import datetime
+import heapq
+
+from django.conf import settings
+from django.core.files.storage import storages
+from django.db import connection
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .models import Profile, PropertyImage
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 500
+
+# (model, field): every file field whose uploads the GC looks after
+MEDIA_FIELDS = [(PropertyImage, 'image'), (Profile, 'profile_picture')]
+
+
+def _prefixes():
+    return sorted({model._meta.get_field(field).upload_to for model, field in MEDIA_FIELDS})
+
+
+def _referenced(model, field):
+    order = field
+    if connection.vendor == 'postgresql':
+        # Byte order, which is what Python's string comparison (and the merge) uses
+        order = Collate(field, 'C')
+    names = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+    return names.order_by(order).values_list(field, flat=True).distinct().iterator(chunk_size=CHUNK_SIZE)
+
+
+def referenced_names():
+    """Every file name the database points at, sorted, duplicates allowed."""
+    return heapq.merge(*(_referenced(model, field) for model, field in MEDIA_FIELDS))
+
+
+def _walk(storage, path):
+    # Within a directory, a subdirectory sorts as 'name/', so its files come out in overall name order
+    dirs, files = storage.listdir(path)
+    entries = [(name, False) for name in files] + [(name + '/', True) for name in dirs]
+    for name, is_dir in sorted(entries):
+        if is_dir:
+            yield from _walk(storage, path + name)
+        else:
+            yield path + name, None, None
+
+
+def stored_files(storage, prefix):
+    """(name, size or None, modified or None) for every file under prefix, sorted by name."""
+    if hasattr(storage, 'list_page'):
+        after = ''
+        while True:
+            page = storage.list_page(prefix, start_after=after)
+            yield from page
+            if not page:
+                return
+            after = page[-1][0]
+    elif storage.exists(prefix):
+        yield from _walk(storage, prefix)
+
+
+def _checked(names, what):
+    """Passes names through, failing loudly if they aren't sorted (a merge on unsorted input would delete live files)."""
+    last = None
+    for item in names:
+        name = item if isinstance(item, str) else item[0]
+        if last is not None and name < last:
+            raise RuntimeError(f"{what} came back out of order ({last!r} before {name!r}); refusing to continue.")
+        last = name
+        yield item
+
+
+def find_orphans(storage):
+    """Yields (name, size, modified) for stored files no row references, by merge-joining the two sorted streams."""
+    referenced = _checked(referenced_names(), "Referenced file names")
+    current = next(referenced, None)
+    for prefix in _prefixes():
+        for entry in _checked(stored_files(storage, prefix), f"The storage listing of {prefix}"):
+            name = entry[0]
+            while current is not None and current < name:
+                current = next(referenced, None)
+            if current != name:
+                yield entry
+
+
+def _still_referenced(names):
+    found = set()
+    for model, field in MEDIA_FIELDS:
+        found.update(model.objects.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+    return found
+
+
+def _delete(storage, names):
+    if hasattr(storage, 'delete_many'):
+        return storage.delete_many(names)
+    for name in names:
+        storage.delete(name)
+    return len(names)
+
+
+def collect(storage=None, grace=None, batch_size=BATCH_SIZE, dry_run=False, on_orphan=None):
+    """
+    Deletes orphaned media older than `grace` (a timedelta, MEDIA_GC_GRACE_HOURS by
+    default) in batches. Returns counts: orphans found, deleted (or deletable on a
+    dry run), kept for being too new or of unknown age, and bytes freed.
+    """
+    storage = storage or storages['default']
+    if grace is None:
+        grace = datetime.timedelta(hours=getattr(settings, 'MEDIA_GC_GRACE_HOURS', 24))
+    cutoff = timezone.now() - grace
+    summary = {'orphans': 0, 'deleted': 0, 'too_new': 0, 'unknown_age': 0, 'bytes': 0}
+    batch = []
+
+    def flush():
+        live = _still_referenced([name for name, _ in batch])
+        doomed = [(name, size) for name, size in batch if name not in live]
+        if doomed and not dry_run:
+            _delete(storage, [name for name, _ in doomed])
+        summary['deleted'] += len(doomed)
+        summary['bytes'] += sum(size or 0 for _, size in doomed)
+        batch.clear()
+
+    for name, size, modified in find_orphans(storage):
+        summary['orphans'] += 1
+        if modified is None:
+            try:
+                modified = storage.get_modified_time(name)
+            except (NotImplementedError, OSError):
+                summary['unknown_age'] += 1
+                continue
+        if modified > cutoff:
+            summary['too_new'] += 1
+            continue
+        if size is None:
+            try:
+                size = storage.size(name)
+            except (NotImplementedError, OSError):
+                size = None
+        if on_orphan:
+            on_orphan(name, size, modified)
+        batch.append((name, size))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    return summary
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_property_curfew_property_deposit_amount_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('gender_preference', models.CharField(choices=[('All', 'All'), ('Mixed', 'Mixed (Gents & Ladies)'), ('Gents', 'Gents Only'), ('Ladies', 'Ladies Only')], default='All', max_length=10)),
+                ('amenities_mask', models.PositiveSmallIntegerField(default=0, help_text='Required amenities, see AMENITY_BITS')),
+                ('radius_km', models.FloatField(blank=True, help_text='Max distance from campus (blank = any)', null=True)),
+                ('room_capacity', models.PositiveSmallIntegerField(blank=True, help_text='People per room, 5 means 5+ (blank = any)', null=True)),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('whatsapp', 'WhatsApp')], default='email', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_alerts', to='listings.property')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='listings.savedsearch')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['is_active', 'gender_preference', 'max_price'], name='savedsearch_match_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='savedsearchalert',
+            unique_together={('saved_search', 'property')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:41
+
+from django.db import migrations, models
+
+from listings.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Property = apps.get_model('listings', 'Property')
+    located = Property.objects.exclude(latitude=None).exclude(longitude=None).only('id', 'latitude', 'longitude')
+    batch = []
+    for prop in located.iterator(chunk_size=1000):
+        prop.geohash = encode_geohash(prop.latitude, prop.longitude)
+        batch.append(prop)
+        if len(batch) == 1000:
+            Property.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Property.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0014_savedsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
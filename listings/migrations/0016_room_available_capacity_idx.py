@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_property_geohash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['is_available', 'capacity'], name='room_available_capacity_idx'),
+        ),
+    ]
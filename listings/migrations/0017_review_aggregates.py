@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_stats(apps, schema_editor):
+    Property = apps.get_model('listings', 'Property')
+    Review = apps.get_model('listings', 'Review')
+    reviews = Review.objects.filter(property=OuterRef('pk')).values('property')
+    Property.objects.update(
+        review_count=Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n')), 0),
+        rating_avg=Subquery(reviews.annotate(avg=Avg('rating')).values('avg')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0016_room_available_capacity_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rating_avg',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['property', 'created_at'], name='review_property_created_idx'),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_pending_bookings(apps, schema_editor):
+    # Keep the oldest of each set of identical pending requests so the constraints can be added
+    Booking = apps.get_model('listings', 'Booking')
+    seen = set()
+    duplicates = []
+    pending = Booking.objects.filter(status='pending').order_by('created_at', 'id')
+    for pk, student, prop, room in pending.values_list('id', 'student_id', 'property_id', 'room_id').iterator():
+        if (student, prop, room) in seen:
+            duplicates.append(pk)
+        seen.add((student, prop, room))
+    Booking.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0017_review_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('room__isnull', False), ('status', 'pending')), fields=('student', 'property', 'room'), name='unique_pending_booking_room'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('room__isnull', True), ('status', 'pending')), fields=('student', 'property'), name='unique_pending_booking_property'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:15
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0019_property_updated_at_tombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('owner', models.CharField(blank=True, max_length=200)),
+                ('lease_expires_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('next_run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('runs', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration_ms', models.FloatField(blank=True, null=True)),
+                ('total_duration_ms', models.FloatField(default=0)),
+                ('max_duration_ms', models.FloatField(default=0)),
+                ('last_result', models.JSONField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('expired', 'Expired')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0021_image_hashes_automatic_reports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='reason',
+            field=models.CharField(choices=[('fake', 'Fake Listing / Scam'), ('duplicate', 'Duplicate Listing'), ('unavailable', 'Property is already taken'), ('inappropriate', 'Inappropriate Content or Rules'), ('other', 'Other Issue')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ListingTextBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('value', models.BigIntegerField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='text_bands', to='listings.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'value'], name='listingtextband_lookup_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from listings.geo import haversine_km
+
+
+def add_nust(apps, schema_editor):
+    # The campus every distance was measured from until now
+    Campus = apps.get_model('listings', 'Campus')
+    Property = apps.get_model('listings', 'Property')
+    PropertyCampusDistance = apps.get_model('listings', 'PropertyCampusDistance')
+    nust, _ = Campus.objects.get_or_create(slug='nust', defaults={
+        'name': 'National University of Science and Technology', 'short_name': 'NUST', 'city': 'Bulawayo',
+        'latitude': -20.165, 'longitude': 28.642, 'is_default': True,
+    })
+    located = Property.objects.exclude(latitude=None).exclude(longitude=None).values_list('id', 'latitude', 'longitude')
+    PropertyCampusDistance.objects.bulk_create([
+        PropertyCampusDistance(property_id=pk, campus=nust, distance_km=float(haversine_km(nust.latitude, nust.longitude, lat, lng)))
+        for pk, lat, lng in located.iterator(chunk_size=1000)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0022_listing_text_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Campus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="e.g. 'National University of Science and Technology'", max_length=100)),
+                ('short_name', models.CharField(help_text="e.g. 'NUST' (shown in listings and on WhatsApp)", max_length=20)),
+                ('slug', models.SlugField(help_text='Used in links: /api/properties/?campus=nust', unique=True)),
+                ('city', models.CharField(help_text='e.g. Bulawayo', max_length=50)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('is_default', models.BooleanField(default=False, help_text='Distances mean this campus when none is picked.')),
+            ],
+            options={
+                'verbose_name_plural': 'campuses',
+                'ordering': ['city', 'name'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='campus_single_default')],
+            },
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='campus',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.campus'),
+        ),
+        migrations.CreateModel(
+            name='PropertyCampusDistance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField()),
+                ('campus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='property_distances', to='listings.campus')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campus_distances', to='listings.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['campus', 'distance_km'], name='campusdistance_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('property', 'campus'), name='propertycampusdistance_unique')],
+            },
+        ),
+        migrations.RunPython(add_nust, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def use_profile_campus(apps, schema_editor):
+    # Existing searches measure from the student's campus, like new ones do
+    Profile = apps.get_model('listings', 'Profile')
+    SavedSearch = apps.get_model('listings', 'SavedSearch')
+    SavedSearch.objects.update(campus=Subquery(Profile.objects.filter(user_id=OuterRef('user_id')).values('campus')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0023_campuses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedsearch',
+            name='campus',
+            field=models.ForeignKey(blank=True, help_text='Campus the radius is measured from (blank = the default campus)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='listings.campus'),
+        ),
+        migrations.RunPython(use_profile_campus, migrations.RunPython.noop),
+    ]
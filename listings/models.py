@@ -1,11 +1,34 @@
 from django.db import models
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
+from .geo import encode_geohash
 
-class Property(models.Model):
+
+class LoadedValuesMixin:
+    """Remembers field values as loaded (or last saved) so signal handlers can tell what a save() changed."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+
+    def loaded_value(self, attname):
+        """Value of the field when it was loaded (or last saved); None for new instances."""
+        return getattr(self, '_loaded_values', {}).get(attname)
+
+
+class Property(LoadedValuesMixin, models.Model):
     landlord = models.ForeignKey(User, on_delete=models.CASCADE, related_name='properties')
     title = models.CharField(max_length=200, help_text="e.g., 'Modern 2-Bed Cottage near Main Gate'")
     description = models.TextField(help_text="Include amenities like Wi-Fi, Solar, Water tank")
@@ -13,6 +36,8 @@ class Property(models.Model):
     address = models.CharField(max_length=255)
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
+    # --- NEW: SPATIAL KEY FOR MAP CLUSTERING (kept in sync with lat/lng in save) ---
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
     gender_preference = models.CharField(max_length=10, choices=[('Mixed', 'Mixed (Gents & Ladies)'), ('Gents', 'Gents Only'), ('Ladies', 'Ladies Only')], default='Mixed')
     is_available = models.BooleanField(default=True)
     
@@ -26,28 +51,145 @@ class Property(models.Model):
     deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Enter 0 if no deposit")
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # --- NEW: LAST CHANGE TO ANYTHING THE LISTING SHOWS (drives the change feed, see changefeed.py) ---
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # --- NEW: REVIEW AGGREGATES (kept up to date by update_review_stats) ---
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(blank=True, null=True, editable=False)
+
+    # --- NEW: MINHASH OF TITLE + DESCRIPTION FOR NEAR-DUPLICATE DETECTION (see textdup.py) ---
+    minhash = models.BinaryField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return f"{self.title} - ${self.price_per_month}"
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'updated_at'}
+            if {'latitude', 'longitude'} & kwargs['update_fields']:
+                kwargs['update_fields'].add('geohash')
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def update_review_stats(cls, property_ids=None, dry_run=False):
+        """
+        Recompute review_count / rating_avg in one UPDATE (all properties if no ids
+        are given). Only rows whose numbers actually move are written, so they're the
+        only ones that show up in the change feed. dry_run just counts them.
+        """
+        reviews = Review.objects.filter(property=OuterRef('pk')).values('property')
+        queryset = cls.objects.all() if property_ids is None else cls.objects.filter(id__in=property_ids)
+        queryset = queryset.annotate(
+            new_count=Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n')), 0),
+            new_avg=Subquery(reviews.annotate(avg=Avg('rating')).values('avg')),
+        ).exclude(
+            Q(review_count=F('new_count'))
+            & (Q(rating_avg=F('new_avg')) | Q(rating_avg__isnull=True, new_avg__isnull=True))
+        )
+        if dry_run:
+            return queryset.count()
+        return queryset.update(review_count=F('new_count'), rating_avg=F('new_avg'), updated_at=timezone.now())
     
 
+# --- NEW: DELETED LISTINGS, SO THE CHANGE FEED CAN TELL CLIENTS TO DROP THEM ---
+class PropertyTombstone(models.Model):
+    property_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Property #{self.property_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='property_photos/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     room = models.ForeignKey('Room', on_delete=models.CASCADE, related_name='room_images', null=True, blank=True)
+    # --- NEW: PERCEPTUAL HASH FOR REUSED-PHOTO DETECTION (filled in by photohash.py after upload) ---
+    phash = models.BigIntegerField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return f"Image for {self.property.title}"
 
 
+# --- NEW: MULTI-INDEX HASH TABLE OVER PropertyImage.phash (see photohash.py) ---
+class ImageHashBand(models.Model):
+    image = models.ForeignKey(PropertyImage, on_delete=models.CASCADE, related_name='hash_bands')
+    band = models.PositiveSmallIntegerField()
+    value = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'value'], name='imagehashband_lookup_idx'),
+        ]
+
+
+# --- NEW: LSH BUCKETS OVER Property.minhash (see textdup.py) ---
+class ListingTextBand(models.Model):
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='text_bands')
+    band = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'value'], name='listingtextband_lookup_idx'),
+        ]
+
+
+# --- NEW: CAMPUSES AND EVERY LISTING'S PRECOMPUTED DISTANCE TO EACH (see campuses.py) ---
+class Campus(models.Model):
+    name = models.CharField(max_length=100, help_text="e.g. 'National University of Science and Technology'")
+    short_name = models.CharField(max_length=20, help_text="e.g. 'NUST' (shown in listings and on WhatsApp)")
+    slug = models.SlugField(unique=True, help_text="Used in links: /api/properties/?campus=nust")
+    city = models.CharField(max_length=50, help_text="e.g. Bulawayo")
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    is_default = models.BooleanField(default=False, help_text="Distances mean this campus when none is picked.")
+
+    class Meta:
+        ordering = ['city', 'name']
+        verbose_name_plural = 'campuses'
+        constraints = [
+            models.UniqueConstraint(fields=['is_default'], condition=Q(is_default=True), name='campus_single_default'),
+        ]
+
+    def __str__(self):
+        return f"{self.short_name} ({self.city})"
+
+
+class PropertyCampusDistance(models.Model):
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='campus_distances')
+    campus = models.ForeignKey(Campus, on_delete=models.CASCADE, related_name='property_distances')
+    distance_km = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'campus'], name='propertycampusdistance_unique'),
+        ]
+        indexes = [
+            # ?campus=...&max_distance=... / ordering=distance walk this in distance order
+            models.Index(fields=['campus', 'distance_km'], name='campusdistance_lookup_idx'),
+        ]
+
+
 # --- NEW: ROOM MODEL ---
-class Room(models.Model):
+class Room(LoadedValuesMixin, models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='rooms')
     label = models.CharField(max_length=100, help_text="e.g., 'Room 1', 'Master Bedroom'")
     capacity = models.IntegerField(default=1, help_text="Number of people per room")
     is_available = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Room search: available rooms of a given size
+            models.Index(fields=['is_available', 'capacity'], name='room_available_capacity_idx'),
+        ]
+
     def __str__(self):
         return f"{self.property.title} - {self.label} ({self.capacity} heads)"
 
@@ -61,16 +203,21 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('user', 'property')
+        indexes = [
+            # Newest-first review pages for one property
+            models.Index(fields=['property', 'created_at'], name='review_property_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.property.title}"
 
 
-class Booking(models.Model):
+class Booking(LoadedValuesMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('accepted', 'Accepted'),
         ('rejected', 'Rejected'),
+        ('expired', 'Expired'),  # left pending too long (the expire_pending_bookings job)
     ]
 
     property = models.ForeignKey('Property', on_delete=models.CASCADE, related_name='bookings')
@@ -84,6 +231,24 @@ class Booking(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # One pending request per student per room (or per property when no room was picked).
+            # Two constraints because NULL rooms never clash in a unique index.
+            models.UniqueConstraint(
+                fields=['student', 'property', 'room'], condition=models.Q(status='pending', room__isnull=False),
+                name='unique_pending_booking_room',
+            ),
+            models.UniqueConstraint(
+                fields=['student', 'property'], condition=models.Q(status='pending', room__isnull=True),
+                name='unique_pending_booking_property',
+            ),
+        ]
+        indexes = [
+            # Finding stale pending requests to expire
+            models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.student.username} -> {self.property.title} ({self.status})"
     
@@ -105,6 +270,9 @@ class Profile(models.Model):
     bio = models.TextField(blank=True, help_text="Tell students about yourself or your property rules.")
     company_name = models.CharField(max_length=100, blank=True, help_text="Optional: If you operate as a business.")
 
+    # --- NEW: THE STUDENT'S CAMPUS (picked once, e.g. on WhatsApp) ---
+    campus = models.ForeignKey('Campus', on_delete=models.SET_NULL, related_name='+', blank=True, null=True)
+
     def __str__(self):
         return f"{self.user.username} - {self.role}"
     
@@ -122,16 +290,85 @@ def save_user_profile(sender, instance, **kwargs):
 class Report(models.Model):
     REASON_CHOICES = [
         ('fake', 'Fake Listing / Scam'),
+        ('duplicate', 'Duplicate Listing'),
         ('unavailable', 'Property is already taken'),
         ('inappropriate', 'Inappropriate Content or Rules'),
         ('other', 'Other Issue'),
     ]
-    reporter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reports_made')
+    # Blank for reports filed automatically (reused photos or copied text, see photohash.py / textdup.py)
+    reporter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reports_made', blank=True, null=True)
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='reports')
+    # The listing this one appears to copy, for automatic duplicate reports
+    duplicate_of = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='+', blank=True, null=True)
     reason = models.CharField(max_length=20, choices=REASON_CHOICES)
     description = models.TextField(blank=True, help_text="Additional details provided by the student.")
     created_at = models.DateTimeField(auto_now_add=True)
     is_resolved = models.BooleanField(default=False, help_text="Mark as true once the admin has handled this.")
 
     def __str__(self):
-        return f"Report by {self.reporter.username} on {self.property.title}"
\ No newline at end of file
+        return f"Report by {self.reporter.username if self.reporter else 'system'} on {self.property.title}"
+
+
+class SavedSearch(models.Model):
+    """A student's filter set, matched against listings as they are published or freed up."""
+    AMENITY_BITS = {'wifi': 1, 'solar': 2, 'borehole': 4}
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('whatsapp', 'WhatsApp'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    gender_preference = models.CharField(max_length=10, choices=[('All', 'All')] + Property._meta.get_field('gender_preference').choices, default='All')
+    amenities_mask = models.PositiveSmallIntegerField(default=0, help_text="Required amenities, see AMENITY_BITS")
+    radius_km = models.FloatField(blank=True, null=True, help_text="Max distance from campus (blank = any)")
+    campus = models.ForeignKey(Campus, on_delete=models.SET_NULL, related_name='+', blank=True, null=True,
+                               help_text="Campus the radius is measured from (blank = the default campus)")
+    room_capacity = models.PositiveSmallIntegerField(blank=True, null=True, help_text="People per room, 5 means 5+ (blank = any)")
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, default='email')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Matching narrows by (active, gender) and then a range scan on price
+            models.Index(fields=['is_active', 'gender_preference', 'max_price'], name='savedsearch_match_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - under ${self.max_price} ({self.gender_preference})"
+
+
+class SavedSearchAlert(models.Model):
+    """One row per (search, property) already sent, so a listing is only announced once."""
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='alerts')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='search_alerts')
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('saved_search', 'property')
+
+
+# --- NEW: SCHEDULED JOBS (listings/scheduler.py) ---
+class JobLease(models.Model):
+    """
+    One row per scheduled job. Whoever moves lease_expires_at forward in a single
+    UPDATE owns the next run, so several run_scheduler instances never double-run a
+    job. Also keeps the job's timing numbers.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    owner = models.CharField(max_length=200, blank=True)
+    lease_expires_at = models.DateTimeField(default=timezone.now)
+    next_run_at = models.DateTimeField(default=timezone.now)
+
+    runs = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    last_started_at = models.DateTimeField(blank=True, null=True)
+    last_duration_ms = models.FloatField(blank=True, null=True)
+    total_duration_ms = models.FloatField(default=0)
+    max_duration_ms = models.FloatField(default=0)
+    last_result = models.JSONField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} (next {self.next_run_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,186 @@
+"""
+Reused-photo detection: the same picture on different landlords' listings is
+the usual sign of a scam copy.
+
+Every PropertyImage gets a 64-bit difference hash (dHash), which survives
+resizing, recompression and small edits. Two photos count as the same when
+their hashes differ in at most MAX_DISTANCE bits.
+
+Matches are looked up through a multi-index hash table (ImageHashBand) instead
+of comparing against every image. The hash is cut into MAX_DISTANCE + 1 bands,
+and two hashes that close must agree exactly on at least one band (pigeonhole).
+A lookup fetches only the images sharing a band, by index, and checks just
+those. A match against another landlord's photo files a 'fake' Report with no
+reporter, for the admins to review.
+"""
+import logging
+
+import numpy as np
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ImageHashBand, PropertyImage, Report
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+MAX_DISTANCE = 6
+BANDS = MAX_DISTANCE + 1
+# Band widths as even as possible: 64 bits -> 10, 9, 9, 9, 9, 9, 9
+_WIDTHS = [HASH_BITS // BANDS + (1 if i < HASH_BITS % BANDS else 0) for i in range(BANDS)]
+
+
+def dhash(file):
+    """Unsigned 64-bit dHash of an image file object: is each pixel brighter than its right neighbour on a 9x8 thumbnail."""
+    from PIL import Image
+
+    with Image.open(file) as image:
+        # Lets JPEG decode straight at a fraction of full size, which is most of the cost
+        image.draft('L', (64, 64))
+        pixels = list(image.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def to_signed(value):
+    """BigIntegerField is signed; store the unsigned hash's bit pattern."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value & ((1 << 64) - 1)
+
+
+def distance(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+
+def informative(value):
+    """Near-blank or flat-gradient photos hash to (almost) all zeros or ones and would match each other."""
+    return 2 < to_unsigned(value).bit_count() < HASH_BITS - 2
+
+
+def bands(value):
+    """[(band number, band value)] of a hash."""
+    value, result, shift = to_unsigned(value), [], HASH_BITS
+    for number, width in enumerate(_WIDTHS):
+        shift -= width
+        result.append((number, (value >> shift) & ((1 << width) - 1)))
+    return result
+
+
+def hash_file(name, storage=None):
+    with (storage or default_storage).open(name, 'rb') as file:
+        return to_signed(dhash(file))
+
+
+def save_hashes(hashes):
+    """hashes: {image id: signed hash}. Stores them and replaces the images' band rows."""
+    images = [PropertyImage(id=pk, phash=value) for pk, value in hashes.items()]
+    with transaction.atomic():
+        PropertyImage.objects.bulk_update(images, ['phash'], batch_size=1000)
+        ImageHashBand.objects.filter(image_id__in=list(hashes)).delete()
+        ImageHashBand.objects.bulk_create(
+            [ImageHashBand(image_id=pk, band=band, value=value) for pk, h in hashes.items() for band, value in bands(h)],
+            batch_size=2000,
+        )
+
+
+def find_matches(image_id, value, landlord_id):
+    """[(other image id, distance)] of other landlords' photos within MAX_DISTANCE of the hash."""
+    lookup = Q()
+    for band, band_value in bands(value):
+        lookup |= Q(band=band, value=band_value)
+    candidates = (
+        ImageHashBand.objects.filter(lookup)
+        .exclude(image_id=image_id).exclude(image__property__landlord_id=landlord_id)
+        .values_list('image_id', 'image__phash').distinct()
+    )
+    matches = [(pk, distance(value, other)) for pk, other in candidates]
+    return sorted((match for match in matches if match[1] <= MAX_DISTANCE), key=lambda match: match[1])
+
+
+def flag(image, original, dist):
+    """Files one automatic 'fake' Report on image's listing pointing at the listing it copies, unless there is one."""
+    prop, source = image.property, original.property
+    if Report.objects.filter(property=prop, duplicate_of=source, reporter__isnull=True).exists():
+        return None
+    return Report.objects.create(
+        reporter=None,
+        property=prop,
+        duplicate_of=source,
+        reason='fake',
+        description=(
+            f"Automatic: photo #{image.pk} matches photo #{original.pk} on '{source.title}' "
+            f"(#{source.pk}, landlord {source.landlord.username}); {dist} of {HASH_BITS} bits differ."
+        ),
+    )
+
+
+def check_image(image_id):
+    """Hash one uploaded image and flag its listing if the photo is another landlord's (run in the background)."""
+    image = PropertyImage.objects.select_related('property__landlord').get(pk=image_id)
+    try:
+        value = hash_file(image.image.name)
+    except Exception as e:
+        logger.warning("Could not hash image %s (%s): %s", image_id, image.image.name, e)
+        return
+    save_hashes({image.pk: value})
+    if not informative(value):
+        return
+
+    matches = find_matches(image.pk, value, image.property.landlord_id)
+    if matches:
+        # Compare with the closest, oldest photo: that's the one being copied
+        best = min(matches, key=lambda match: (match[1], match[0]))
+        original = PropertyImage.objects.select_related('property__landlord').get(pk=best[0])
+        if original.pk < image.pk:
+            flag(image, original, best[1])
+        else:
+            flag(original, image, best[1])
+
+
+def _close_pairs(values, owners, block=1024):
+    """(i, j, distance) for i < j within MAX_DISTANCE and owned by different landlords, a block of rows at a time."""
+    for start in range(0, len(values), block):
+        rows = values[start:start + block]
+        dist = np.bitwise_count(rows[:, None] ^ values[None, start:])
+        close = (dist <= MAX_DISTANCE) & (owners[start:start + block, None] != owners[None, start:])
+        close &= np.triu(np.ones(close.shape, dtype=bool), k=1)
+        for i, j in zip(*np.nonzero(close)):
+            yield start + i, start + j, int(dist[i, j])
+
+
+def find_pairs(hashes, landlords):
+    """
+    All cross-landlord near-duplicate pairs among {image id: hash}, for the backfill.
+    The same banding as the table, in memory: sort by each band, then compare only
+    within runs of equal band values, vectorised. landlords: {image id: landlord id}.
+    Yields (older image id, newer image id, distance).
+    """
+    ids = np.fromiter(hashes, dtype=np.int64, count=len(hashes))
+    values = np.fromiter((to_unsigned(v) for v in hashes.values()), dtype=np.uint64, count=len(hashes))
+    owners = np.fromiter((landlords[pk] for pk in hashes), dtype=np.int64, count=len(hashes))
+    bits = np.bitwise_count(values)
+    keep = (bits > 2) & (bits < HASH_BITS - 2)  # see informative()
+    ids, values, owners = ids[keep], values[keep], owners[keep]
+
+    found = {}
+    shift = HASH_BITS
+    for width in _WIDTHS:
+        shift -= width
+        keys = (values >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+        order = np.argsort(keys, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(keys[order])) + 1):
+            if len(group) < 2:
+                continue
+            for i, j, dist in _close_pairs(values[group], owners[group]):
+                a, b = sorted((int(ids[group[i]]), int(ids[group[j]])))
+                found[a, b] = dist
+    for (a, b), dist in sorted(found.items()):
+        yield a, b, dist
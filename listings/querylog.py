@@ -0,0 +1,202 @@
+"""
+Slow query capture.
+
+Every request runs with an execute wrapper on each database connection. Any
+statement slower than SLOW_QUERY_MS is kept in a bounded ring buffer together
+with the view and the line of our code that triggered it, plus the EXPLAIN
+plan of its normalized form. The buffer is per worker process and can be
+viewed at /admin/slow-queries/.
+"""
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%s|\?")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_buffer = deque(maxlen=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 200))
+_buffer_lock = threading.Lock()
+
+# One EXPLAIN per normalized statement, so a hot slow query is only explained once.
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+_MAX_PLANS = 500
+
+_local = threading.local()
+
+
+def normalize_sql(sql):
+    """Collapse literals and IN-lists so repeated statements share one key."""
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('?', sql)
+    sql = _IN_LISTS.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _call_site():
+    """The innermost frame that belongs to this project rather than Django/DRF."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if not filename.startswith(base_dir) or 'site-packages' in filename or filename == __file__:
+            continue
+        if os.path.dirname(filename) == base_dir:
+            # manage.py and friends, not interesting
+            continue
+        return f"{filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}"
+    return None
+
+
+def _explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE off) '
+    else:
+        return None
+
+    _local.explaining = True
+    try:
+        # A savepoint keeps a failed EXPLAIN from poisoning the caller's transaction.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        _local.explaining = False
+
+    if connection.vendor == 'sqlite':
+        # Rows are (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(str(row[0]) for row in rows)
+
+
+def _plan_for(connection, sql, params, normalized):
+    key = (connection.alias, normalized)
+    with _plans_lock:
+        if key in _plans:
+            _plans.move_to_end(key)
+            return _plans[key]
+    plan = _explain(connection, sql, params)
+    with _plans_lock:
+        _plans[key] = plan
+        if len(_plans) > _MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+class QueryRecorder:
+    """Execute wrapper that times each statement and records the slow ones."""
+
+    def __init__(self, connection, request=None, threshold_ms=None):
+        self.connection = connection
+        self.request = request
+        if threshold_ms is None:
+            threshold_ms = getattr(settings, 'SLOW_QUERY_MS', 200)
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'explaining', False):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        # A statement that raised isn't recorded: EXPLAINing it inside the now-failed
+        # transaction (Postgres) would raise again and mask the original error
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= self.threshold_ms:
+            self.record(sql, params, many, duration_ms)
+        return result
+
+    def record(self, sql, params, many, duration_ms):
+        normalized = normalize_sql(sql)
+        plan = None if many else _plan_for(self.connection, sql, params, normalized)
+
+        view = None
+        if self.request is not None:
+            match = getattr(self.request, 'resolver_match', None)
+            view = match.view_name if match else self.request.path
+
+        entry = {
+            'at': timezone.now(),
+            'alias': self.connection.alias,
+            'duration_ms': round(duration_ms, 2),
+            'sql': sql,
+            'normalized': normalized,
+            'view': view,
+            'call_site': _call_site(),
+            'plan': plan,
+        }
+        with _buffer_lock:
+            _buffer.append(entry)
+        logger.warning("Slow query (%.1f ms) in %s at %s: %s", duration_ms, view, entry['call_site'], normalized)
+
+
+def recent_queries():
+    """Newest first."""
+    with _buffer_lock:
+        return list(reversed(_buffer))
+
+
+def clear():
+    with _buffer_lock:
+        _buffer.clear()
+    with _plans_lock:
+        _plans.clear()
+
+
+class SlowQueryMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _install(self, request):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(QueryRecorder(connection, request)))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if getattr(settings, 'SLOW_QUERY_MS', None) is None:
+            return self.get_response(request)
+
+        with self._install(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if getattr(settings, 'SLOW_QUERY_MS', None) is None:
+            return await self.get_response(request)
+
+        # Async views query through sync_to_async's thread-sensitive thread, whose connections
+        # aren't the event loop's, so the wrappers have to be installed (and removed) there
+        stack = await sync_to_async(self._install)(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
@@ -0,0 +1,115 @@
+"""
+"Best value" scoring.
+
+Every feature is scaled to 0..1 (1 = better for the student) across the
+available listings, then combined with the weights below in one vectorized
+pass over the feature snapshot. Override the defaults with the
+VALUE_SCORE_WEIGHTS setting, or per request with ?weights=price:2,distance:1.
+"""
+import numbers
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .features import get_features
+
+DEFAULT_WEIGHTS = {
+    'price': 0.35,
+    'distance': 0.25,
+    'amenities': 0.15,
+    'rating': 0.15,
+    'deposit': 0.05,
+    'curfew': 0.05,
+}
+
+# Reviews needed before a listing's own average outweighs the neutral prior
+RATING_PRIOR_WEIGHT = 2
+RATING_PRIOR = 3.0
+
+
+def check_settings():
+    """Called at startup (apps.py): a bad VALUE_SCORE_WEIGHTS would otherwise break every ?ordering=value_score request."""
+    weights = getattr(settings, 'VALUE_SCORE_WEIGHTS', {})
+    unknown = sorted(set(weights) - set(DEFAULT_WEIGHTS))
+    if unknown:
+        raise ImproperlyConfigured(
+            f"VALUE_SCORE_WEIGHTS has unknown keys {unknown}; expected some of {sorted(DEFAULT_WEIGHTS)}."
+        )
+    bad = sorted(name for name, value in weights.items() if not isinstance(value, numbers.Real) or value < 0)
+    if bad:
+        raise ImproperlyConfigured(f"VALUE_SCORE_WEIGHTS values must be numbers >= 0 (check {bad}).")
+
+
+def get_weights(overrides=None):
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'VALUE_SCORE_WEIGHTS', {})}
+    if overrides:
+        weights.update({k: v for k, v in overrides.items() if k in DEFAULT_WEIGHTS})
+    return weights
+
+
+def parse_weights(param):
+    """'price:2,distance:1' -> {'price': 2.0, 'distance': 1.0}, ignoring junk."""
+    weights = {}
+    for part in (param or '').split(','):
+        name, _, value = part.partition(':')
+        try:
+            weights[name.strip()] = max(float(value), 0.0)
+        except ValueError:
+            continue
+    return weights
+
+
+def _lower_is_better(values, mask):
+    """Min-max scale so the cheapest/closest available listing scores 1."""
+    scores = np.full(len(values), 0.5)
+    valid = mask & ~np.isnan(values)
+    if valid.any():
+        low, high = values[valid].min(), values[valid].max()
+        if high > low:
+            scores[valid] = (high - values[valid]) / (high - low)
+        else:
+            scores[valid] = 1.0
+    return scores
+
+
+def compute_scores(features, weights=None, campus=None):
+    """Score for every row of the snapshot, distance being to `campus` (default: the default one); unavailable listings get -inf."""
+    weights = get_weights(weights)
+    available = features['is_available']
+
+    # Bayesian average so one 5-star review doesn't beat twenty 4.5s
+    count = features['review_count']
+    rating = np.nan_to_num(features['rating'], nan=RATING_PRIOR)
+    rating = (rating * count + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (count + RATING_PRIOR_WEIGHT)
+
+    parts = {
+        'price': _lower_is_better(features['price'], available),
+        'distance': _lower_is_better(features.distance_to(campus), available),
+        'deposit': _lower_is_better(features['deposit'], available),
+        'amenities': (features['has_wifi'].astype(float) + features['has_solar'] + features['has_borehole']) / 3,
+        'rating': (rating - 1) / 4,
+        'curfew': (~features['has_curfew']).astype(float),
+    }
+
+    total = sum(weights.values()) or 1.0
+    scores = sum(parts[name] * weight for name, weight in weights.items()) / total
+    return np.where(available, scores, -np.inf)
+
+
+def rank(limit=None, max_price=None, weights=None, campus=None):
+    """[(property_id, score)] of available listings, best first."""
+    features = get_features()
+    with features.lock:
+        scores = compute_scores(features, weights, campus)
+        if max_price is not None:
+            scores = np.where(features['price'] <= max_price, scores, -np.inf)
+        ids = features['id']
+
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if limit is not None and limit < len(candidates):
+            # Only the top N need sorting
+            top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in order]
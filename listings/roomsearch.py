@@ -0,0 +1,85 @@
+"""
+Room-level search ("available 2-person rooms under $120 within 2 km").
+
+Takes the same filters as the listings page and facets endpoint and answers in
+SQL: either the matching rooms themselves, or the properties that have any,
+each with a matching_rooms summary from one grouped query. Distances come from
+the precomputed per-campus table (campuses.py), to ?campus= or the default one.
+"""
+from django.db.models import Count, F, FilteredRelation, Max, Min, Q
+
+from . import campuses
+from .facets import ROOM_LABELS, parse_filters
+from .models import Property, Room
+
+
+# What the search results render of each property
+PROPERTY_FIELDS = ['id', 'title', 'price_per_month', 'address', 'gender_preference', 'latitude', 'longitude']
+
+
+def _capacity_q(label, prefix=''):
+    if label == 'Any':
+        return Q()
+    if label == ROOM_LABELS[-1]:
+        return Q(**{f'{prefix}capacity__gte': len(ROOM_LABELS)})
+    return Q(**{f'{prefix}capacity': int(label)})
+
+
+def _property_q(filters, prefix=''):
+    q = Q(**{f'{prefix}is_available': True})
+    if filters['max_price'] is not None:
+        q &= Q(**{f'{prefix}price_per_month__lte': filters['max_price']})
+    if filters['min_price'] is not None:
+        q &= Q(**{f'{prefix}price_per_month__gte': filters['min_price']})
+    if filters['gender'] != 'All':
+        q &= Q(**{f'{prefix}gender_preference': filters['gender']})
+    for name in filters['amenities']:
+        q &= Q(**{f'{prefix}has_{name}': True})
+    return q
+
+
+def _distance_q(filters, prefix=''):
+    # Listings without coordinates stay in, like on the listings page
+    if filters['max_distance'] is None:
+        return Q()
+    return Q(distance_km__lte=filters['max_distance']) | Q(**{f'{prefix}latitude__isnull': True})
+
+
+def _campus_distance(filters, prefix=''):
+    """Joins each row's precomputed distance to the filtered campus; None without coordinates."""
+    campus = campuses.resolve(filters['campus']) or campuses.default_campus()
+    relation = f'{prefix}campus_distances'
+    return {
+        'campus_km': FilteredRelation(relation, condition=Q(**{f'{relation}__campus': campus})),
+        'distance_km': F('campus_km__distance_km'),
+    }
+
+
+def search_rooms(params):
+    filters = dict(parse_filters(params))
+    rooms = (
+        Room.objects.select_related('property').only(*['property__' + name for name in PROPERTY_FIELDS], 'label', 'capacity', 'is_available')
+        .annotate(**_campus_distance(filters, 'property__'))
+        .filter(Q(is_available=True) & _capacity_q(filters['room_type']) & _property_q(filters, 'property__'))
+        .filter(_distance_q(filters, 'property__'))
+    )
+    return rooms.order_by('property__price_per_month', 'property_id', 'id')
+
+
+def search_properties(params):
+    filters = dict(parse_filters(params))
+    # Filtering on rooms before annotating makes the aggregates count only the matching rooms
+    # (and lets the room index drive the join)
+    matching = Q(rooms__is_available=True) & _capacity_q(filters['room_type'], 'rooms__')
+    properties = (
+        Property.objects.only(*PROPERTY_FIELDS)
+        .filter(_property_q(filters) & matching)
+        .annotate(**_campus_distance(filters))
+        .annotate(
+            matching_rooms=Count('rooms'),
+            matching_min_capacity=Min('rooms__capacity'),
+            matching_max_capacity=Max('rooms__capacity'),
+        )
+        .filter(_distance_q(filters))
+    )
+    return properties.order_by('price_per_month', 'id')
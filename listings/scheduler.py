@@ -0,0 +1,121 @@
+"""
+A small periodic job runner with no broker: `python manage.py run_scheduler`.
+
+Jobs register themselves with @job (see jobs.py) and take a dry_run flag.
+Every job has a JobLease row. To run a job an instance moves its lease forward
+with one conditional UPDATE (only when the job is due and the last lease has
+run out), so however many schedulers are running, each run happens once. If an
+instance dies mid-job the lease simply runs out and someone else picks it up.
+
+Each run records its duration and result on the row (runs, failures, last /
+max / total milliseconds); `run_scheduler --list` and the admin show them.
+"""
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+
+from django.db import close_old_connections
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import JobLease
+
+logger = logging.getLogger(__name__)
+
+# A job's lease never runs out sooner than this, however often it runs
+MIN_LEASE = datetime.timedelta(minutes=10)
+
+
+class Job:
+    def __init__(self, name, fn, every, lease):
+        self.name = name
+        self.fn = fn
+        self.every = every
+        self.lease = lease
+
+
+JOBS = {}
+
+
+def job(every, lease=None, name=None):
+    """Registers fn(dry_run=False) -> JSON-able summary to run every `every` (a timedelta)."""
+    def decorator(fn):
+        job_name = name or fn.__name__
+        JOBS[job_name] = Job(job_name, fn, every, lease or max(every, MIN_LEASE))
+        return fn
+    return decorator
+
+
+def default_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _acquire(job, owner, now):
+    return JobLease.objects.filter(name=job.name, next_run_at__lte=now, lease_expires_at__lte=now).update(
+        owner=owner, lease_expires_at=now + job.lease,
+    ) == 1
+
+
+def run_job(job, owner, dry_run=False):
+    """
+    Runs the job if it's due and nobody else holds it, returning what happened
+    (None if it wasn't our turn). A dry run always runs and writes nothing.
+    """
+    started = timezone.now()
+    if not dry_run and not _acquire(job, owner, started):
+        return None
+
+    start = time.perf_counter()
+    status, result, error = 'ok', None, ''
+    try:
+        result = job.fn(dry_run=dry_run)
+    except Exception:
+        status, error = 'failed', traceback.format_exc()
+        logger.exception("Scheduled job %s failed", job.name)
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    if not dry_run:
+        recorded = JobLease.objects.filter(name=job.name, owner=owner).update(
+            owner='', lease_expires_at=timezone.now(), next_run_at=started + job.every,
+            runs=F('runs') + 1, failures=F('failures') + (status != 'ok'),
+            last_started_at=started, last_duration_ms=duration_ms,
+            total_duration_ms=F('total_duration_ms') + duration_ms,
+            max_duration_ms=Greatest('max_duration_ms', Value(duration_ms)),
+            last_result=result, last_error=error,
+        )
+        if not recorded:
+            logger.warning("Job %s outlived its %s lease; another scheduler may have run it too", job.name, job.lease)
+
+    logger.info("job=%s status=%s duration_ms=%.1f dry_run=%s result=%s", job.name, status, duration_ms, dry_run, result)
+    return {'job': job.name, 'status': status, 'duration_ms': duration_ms, 'result': result, 'error': error}
+
+
+def run_pending(owner, names=None, dry_run=False):
+    """One pass over the jobs (all, or just `names`); returns the runs that happened."""
+    jobs = [JOBS[name] for name in (names or JOBS)]
+    if not dry_run:
+        JobLease.objects.bulk_create([JobLease(name=job.name) for job in jobs], ignore_conflicts=True)
+
+    runs = []
+    for job in jobs:
+        close_old_connections()
+        outcome = run_job(job, owner, dry_run)
+        if outcome:
+            runs.append(outcome)
+    return runs
+
+
+def run_forever(owner, names=None, poll_seconds=30, stop=None, on_run=None):
+    """Polls for due jobs until `stop` (a threading.Event) is set."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        for outcome in run_pending(owner, names):
+            if on_run:
+                on_run(outcome)
+        close_old_connections()
+        stop.wait(poll_seconds)
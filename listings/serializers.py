@@ -1,10 +1,68 @@
 from rest_framework import serializers
-from .models import Property, PropertyImage, Review, Booking, Profile, Room
+from rest_framework.permissions import SAFE_METHODS
+from .models import Campus, Property, PropertyImage, Review, Booking, Profile, Room, SavedSearch
 from django.contrib.auth.models import User
-import math
-
-UNI_LAT = -20.165
-UNI_LNG = 28.642
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from . import campuses
+from .geo import haversine_km
+
+
+def _split_param(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Lets the client shape the payload through the query string:
+
+        ?fields=id,title,price_per_month   only these fields
+        ?expand=rooms                      add a nested relation back in
+
+    With neither parameter the usual payload is returned (minus any expandable
+    field whose default is False). Views call requested_fields() as well, so
+    that relations which won't be serialized aren't prefetched either.
+
+    Only reads are shaped: on POST/PUT/PATCH pruning would drop writable fields
+    and silently ignore the submitted values, so both parameters are ignored.
+    """
+    # nested field name -> included when the client doesn't ask for anything
+    expandable_fields = {}
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Field names to render, or None for the default payload."""
+        params = getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+        if request.method not in SAFE_METHODS:
+            params = {}
+        fields = _split_param(params.get('fields', ''))
+        expand = _split_param(params.get('expand', '')) & set(cls.expandable_fields)
+        all_fields = set(cls.Meta.fields)
+
+        if fields:
+            return (fields & all_fields) | expand
+        if expand:
+            return (all_fields - set(cls.expandable_fields)) | expand
+
+        hidden = {name for name, default in cls.expandable_fields.items() if not default}
+        return all_fields - hidden if hidden else None
+
+    @classmethod
+    def wants(cls, request, *names):
+        fields = cls.requested_fields(request)
+        return fields is None or any(name in fields for name in names)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the serializer the view builds gets a request in its context; nested
+        # serializers declared as fields are constructed without one and stay whole.
+        request = self._context.get('request')
+        if request is None:
+            return
+        wanted = self.requested_fields(request)
+        if wanted is not None:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -110,6 +168,21 @@ class ReviewSerializer(serializers.ModelSerializer):
         return name if name else obj.user.username
 
 
+# Property payloads only carry the newest few reviews; the rest are paged from /api/properties/<id>/reviews/
+LATEST_REVIEWS = 3
+
+
+def latest_reviews_prefetch(prefix=''):
+    newest = Review.objects.select_related('user').order_by('-created_at', '-id')[:LATEST_REVIEWS]
+    return Prefetch(f'{prefix}reviews', queryset=newest, to_attr='latest_reviews')
+
+
+class CampusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Campus
+        fields = ['id', 'name', 'short_name', 'slug', 'city', 'latitude', 'longitude', 'is_default']
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source='user.username')
     email = serializers.ReadOnlyField(source='user.email')
@@ -119,7 +192,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = ['username', 'email', 'full_name', 'role', 'profile_picture', 'phone_number', 'program', 'year_of_study', 'bio', 'company_name']
+        fields = ['username', 'email', 'full_name', 'role', 'profile_picture', 'phone_number', 'program', 'year_of_study', 'bio', 'company_name', 'campus']
 
     def get_full_name(self, obj):
         name = f"{obj.user.first_name} {obj.user.last_name}".strip()
@@ -132,9 +205,12 @@ class RoomSerializer(serializers.ModelSerializer):
         fields = ['id', 'property', 'label', 'capacity', 'is_available']
 
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'images': True, 'reviews': True, 'rooms': True}
+
     images = PropertyImageSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True) 
+    cover_image = serializers.SerializerMethodField()
+    reviews = serializers.SerializerMethodField()
     distance = serializers.SerializerMethodField()
     
     # --- NEW: Return Full Name for the Landlord ---
@@ -152,8 +228,8 @@ class PropertySerializer(serializers.ModelSerializer):
         model = Property
         fields = [
             'id', 'landlord_name', 'title', 'description', 'price_per_month', 
-            'address', 'latitude', 'longitude', 'is_available', 'images', 
-            'reviews', 'created_at', 'distance', 'gender_preference', 
+            'address', 'latitude', 'longitude', 'is_available', 'images', 'cover_image',
+            'reviews', 'review_count', 'rating_avg', 'created_at', 'distance', 'gender_preference', 
             'landlord_profile_picture', 'landlord_phone', 'landlord_bio', 'landlord_company',
             'is_favorited', 'rooms',
             'has_wifi', 'has_borehole', 'has_solar', 
@@ -165,30 +241,55 @@ class PropertySerializer(serializers.ModelSerializer):
         name = f"{obj.landlord.first_name} {obj.landlord.last_name}".strip()
         return name if name else obj.landlord.username
 
+    def get_reviews(self, obj):
+        if hasattr(obj, 'latest_reviews'):
+            latest = obj.latest_reviews
+        else:
+            latest = obj.reviews.select_related('user').order_by('-created_at', '-id')[:LATEST_REVIEWS]
+        return ReviewSerializer(latest, many=True).data
+
+    def get_cover_image(self, obj):
+        # PropertyViewSet annotates the first image's file name so the slim
+        # (?fields=) payloads don't have to prefetch every image.
+        if hasattr(obj, 'cover_image_name'):
+            name = obj.cover_image_name
+        else:
+            first = next(iter(obj.images.all()), None)
+            name = first.image.name if first else None
+        if not name:
+            return None
+
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited_flag'):
+            return obj.is_favorited_flag
+
+        # Views that already know the user's favourites pass them in to skip a query per row
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is not None:
+            return obj.id in favorite_ids
+
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.favorited_by.filter(id=request.user.id).exists()
         return False
 
     def get_distance(self, obj):
-        if not obj.latitude or not obj.longitude:
-            return None
-        
-        try:
-            lat1, lon1 = math.radians(UNI_LAT), math.radians(UNI_LNG)
-            lat2, lon2 = math.radians(float(obj.latitude)), math.radians(float(obj.longitude))
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = math.sin(dlat / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2
-            c = 2 * math.asin(math.sqrt(a))
-            km = 6371 * c
-            return round(km, 1) 
-        except (ValueError, TypeError):
+        # km to the campus picked with ?campus= (precomputed, annotated by PropertyViewSet), else to the default one
+        if hasattr(obj, 'campus_distance'):
+            return round(obj.campus_distance, 1) if obj.campus_distance is not None else None
+        if obj.latitude is None or obj.longitude is None:
             return None
+        latitude, longitude = campuses.point(self.context.get('campus'))
+        return round(float(haversine_km(latitude, longitude, obj.latitude, obj.longitude)), 1)
+
 
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'property_detail': False}
 
-class BookingSerializer(serializers.ModelSerializer):
     # --- NEW: Return Full Name for the Student ---
     student_name = serializers.SerializerMethodField()
     
@@ -199,15 +300,101 @@ class BookingSerializer(serializers.ModelSerializer):
     student_phone = serializers.ReadOnlyField(source='student.profile.phone_number')
     landlord_phone = serializers.ReadOnlyField(source='property.landlord.profile.phone_number')
 
+    # Only sent with ?expand=property_detail
+    property_detail = PropertySerializer(source='property', read_only=True)
+
     class Meta:
         model = Booking
         fields = [
             'id', 'property', 'property_title', 'room', 'room_label', 'student', 'student_name', 
             'student_program', 'student_year', 'student_phone', 'landlord_phone',
-            'move_in_date', 'message', 'status', 'created_at'
+            'move_in_date', 'message', 'status', 'created_at', 'property_detail',
         ]
         read_only_fields = ['student', 'created_at']
 
     def get_student_name(self, obj):
         name = f"{obj.student.first_name} {obj.student.last_name}".strip()
-        return name if name else obj.student.username
\ No newline at end of file
+        return name if name else obj.student.username
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    # The client sends/receives ["wifi", "solar"]; the model stores a bitmask for indexed matching
+    amenities = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(SavedSearch.AMENITY_BITS)), required=False,
+    )
+
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'max_price', 'gender_preference', 'amenities', 'radius_km', 'campus', 'room_capacity', 'channel', 'is_active', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate_room_capacity(self, value):
+        if value is not None and not 1 <= value <= 5:
+            raise serializers.ValidationError("Room capacity must be between 1 and 5 (5 means 5+).")
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('channel') == 'whatsapp':
+            user = self.context['request'].user
+            if not user.profile.phone_number:
+                raise serializers.ValidationError({"channel": "Add a phone number to your profile to get WhatsApp alerts."})
+        amenities = attrs.pop('amenities', None)
+        if amenities is not None:
+            attrs['amenities_mask'] = sum(SavedSearch.AMENITY_BITS[name] for name in set(amenities))
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['amenities'] = [name for name, bit in SavedSearch.AMENITY_BITS.items() if instance.amenities_mask & bit]
+        return data
+
+
+class AvailabilityChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    is_available = serializers.BooleanField()
+
+
+class BulkAvailabilitySerializer(serializers.Serializer):
+    properties = AvailabilityChangeSerializer(many=True, required=False, max_length=500)
+    rooms = AvailabilityChangeSerializer(many=True, required=False, max_length=500)
+
+    def validate(self, attrs):
+        if not attrs.get('properties') and not attrs.get('rooms'):
+            raise serializers.ValidationError("Send at least one property or room.")
+        return attrs
+
+
+class RoomSearchPropertySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Property
+        fields = ['id', 'title', 'price_per_month', 'address', 'gender_preference', 'latitude', 'longitude']  # roomsearch.PROPERTY_FIELDS
+
+
+class RoomSearchResultSerializer(serializers.ModelSerializer):
+    property = RoomSearchPropertySerializer(read_only=True)
+    distance = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Room
+        fields = ['id', 'label', 'capacity', 'is_available', 'property', 'distance']
+
+    def get_distance(self, obj):
+        return round(obj.distance_km, 1) if obj.distance_km is not None else None
+
+
+class PropertyRoomMatchSerializer(RoomSearchPropertySerializer):
+    distance = serializers.SerializerMethodField()
+    matching_rooms = serializers.SerializerMethodField()
+
+    class Meta(RoomSearchPropertySerializer.Meta):
+        fields = RoomSearchPropertySerializer.Meta.fields + ['distance', 'matching_rooms']
+
+    def get_distance(self, obj):
+        return round(obj.distance_km, 1) if obj.distance_km is not None else None
+
+    def get_matching_rooms(self, obj):
+        return {
+            'count': obj.matching_rooms,
+            'min_capacity': obj.matching_min_capacity,
+            'max_capacity': obj.matching_max_capacity,
+        }
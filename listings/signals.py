@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User 
-from .models import Profile
+from .models import Booking, Campus, Profile, Property, PropertyImage, Room, Review
+from . import alerts, campuses, changefeed, features, live, maptiles, photohash, textdup
+from .tasks import run_in_background
+from .availability import availability_changed
 
 # 1. This triggers when a new User is created
 @receiver(post_save, sender=User)
@@ -13,4 +17,112 @@ def create_user_profile(sender, instance, created, **kwargs):
 # 2. This triggers when an existing User is saved
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+
+# 3. Keep the in-memory feature snapshot (ranking) in step with listing changes
+@receiver([post_save, post_delete], sender=Property)
+def property_features_changed(sender, instance, **kwargs):
+    features.property_changed([instance.pk])
+
+@receiver([post_save, post_delete], sender=Property)
+def property_map_changed(sender, instance, **kwargs):
+    maptiles.listings_changed()
+
+@receiver([post_save, post_delete], sender=Room)
+@receiver([post_save, post_delete], sender=Review)
+def related_features_changed(sender, instance, **kwargs):
+    features.property_changed([instance.property_id])
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_stats_changed(sender, instance, **kwargs):
+    Property.update_review_stats([instance.property_id])
+
+
+# 4. Saved-search alerts for new listings, listings that free up again, and new rooms
+@receiver(post_save, sender=Property)
+def property_published(sender, instance, created, **kwargs):
+    if instance.is_available and (created or instance.loaded_value('is_available') is False):
+        alerts.listings_published([instance.pk])
+
+@receiver(post_save, sender=Room)
+def room_published(sender, instance, created, **kwargs):
+    if created and instance.is_available:
+        alerts.listings_published([instance.property_id])
+
+
+# 5. Bulk availability updates bypass save(), so the hooks above run once per batch here
+@receiver(availability_changed)
+def availability_batch_changed(sender, property_ids, published_ids, properties=None, rooms=None, **kwargs):
+    features.property_changed(property_ids)
+    maptiles.listings_changed()
+    if published_ids:
+        alerts.listings_published(published_ids)
+    if properties or rooms:
+        transaction.on_commit(lambda: live.publish_availability(properties, rooms))
+
+
+# 6. Change feed: tombstones for deleted listings, updated_at for changes made through related rows
+@receiver(post_delete, sender=Property)
+def property_tombstone(sender, instance, **kwargs):
+    changefeed.property_deleted(instance.pk)
+
+@receiver([post_save, post_delete], sender=Room)
+@receiver([post_save, post_delete], sender=PropertyImage)
+@receiver([post_save, post_delete], sender=Review)
+def related_listing_changed(sender, instance, **kwargs):
+    changefeed.touch([instance.property_id])
+
+
+# 7. Live (SSE) pushes, sent once the change is committed
+@receiver(post_save, sender=Property)
+def property_availability_pushed(sender, instance, created, **kwargs):
+    if not created and instance.loaded_value('is_available') not in (None, instance.is_available):
+        changes = {instance.pk: instance.is_available}
+        transaction.on_commit(lambda: live.publish_availability(properties=changes))
+
+@receiver(post_save, sender=Room)
+def room_availability_pushed(sender, instance, created, **kwargs):
+    if not created and instance.loaded_value('is_available') not in (None, instance.is_available):
+        changes = [(instance.pk, instance.property_id, instance.is_available)]
+        transaction.on_commit(lambda: live.publish_availability(rooms=changes))
+
+@receiver(post_save, sender=Booking)
+def booking_status_pushed(sender, instance, created, **kwargs):
+    # New requests go to the landlord; after that only status changes are news
+    if created or instance.loaded_value('status') not in (None, instance.status):
+        args = (instance.pk, instance.property_id, instance.status, instance.student_id)
+        transaction.on_commit(lambda: live.publish_booking(*args))
+
+
+# 8. Hash new photos off the request and flag ones lifted from another landlord's listing
+@receiver(post_save, sender=PropertyImage)
+def image_uploaded(sender, instance, created, **kwargs):
+    if created and instance.image:
+        run_in_background(photohash.check_image, instance.pk)
+
+
+# 9. Re-sign listing text off the request when it changes and flag copies of older listings
+@receiver(post_save, sender=Property)
+def listing_text_changed(sender, instance, created, **kwargs):
+    if created or any(instance.loaded_value(field) != getattr(instance, field) for field in ('title', 'description')):
+        run_in_background(textdup.check_property, instance.pk)
+
+
+# 10. Precomputed listing-to-campus distances: a listing's rows when it moves, a campus's whenever it's saved (rare, admin only)
+@receiver(post_save, sender=Property)
+def property_moved(sender, instance, created, **kwargs):
+    if created or any(instance.loaded_value(field) != getattr(instance, field) for field in ('latitude', 'longitude')):
+        campuses.update_distances(property_ids=[instance.pk])
+
+@receiver(post_save, sender=Campus)
+def campus_saved(sender, instance, **kwargs):
+    campuses.update_distances(campus_ids=[instance.pk])
+    campuses.campuses_changed()
+    features.campuses_changed()
+
+@receiver(post_delete, sender=Campus)
+def campus_deleted(sender, instance, **kwargs):
+    campuses.campuses_changed()
+    features.campuses_changed()
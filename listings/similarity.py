@@ -0,0 +1,156 @@
+"""
+"Similar listings" nearest-neighbour search.
+
+Each property becomes a point in a normalized feature space (price, position,
+gender preference, amenities, room sizes) and the available ones are put in a
+KD-tree. The tree is derived from the feature snapshot in features.py.
+
+The first query builds it. After that, when the snapshot changes, the tree is
+rebuilt on the background pool (at most every REBUILD_SECONDS) and swapped in
+whole; queries keep using the previous tree meanwhile, so a burst of
+Property/Room/Review saves never puts a rebuild on the request path. The query
+point always comes from the current snapshot, and results that have since
+become unavailable are dropped, so the staleness is limited to which listings
+are in the tree.
+"""
+import threading
+import time
+
+import numpy as np
+
+from .features import CAPACITY_BUCKETS, get_features
+from . import campuses, tasks
+
+# How far apart two listings have to be on each axis to count as "1 unit" different
+PRICE_SCALE = 50.0      # dollars
+DISTANCE_SCALE = 1.5    # km
+AMENITY_WEIGHT = 0.5
+CAPACITY_WEIGHT = 0.5
+GENDER_WEIGHT = 1.0
+
+KM_PER_DEGREE = 111.32
+
+# Minimum seconds between two background rebuilds of the tree
+REBUILD_SECONDS = 5
+
+
+def feature_vectors(features):
+    """
+    One row per snapshot row; Euclidean distance between rows is 'how different'.
+    `features` is the snapshot or any mapping of its columns (e.g. one row sliced out).
+    """
+    n = len(features['id'])
+    # Positions are projected to km around the default campus; listings without coordinates sit on it
+    origin_lat, origin_lng = campuses.point()
+    lat = np.where(np.isnan(features['latitude']), origin_lat, features['latitude'])
+    lng = np.where(np.isnan(features['longitude']), origin_lng, features['longitude'])
+    y_km = (lat - origin_lat) * KM_PER_DEGREE
+    x_km = (lng - origin_lng) * KM_PER_DEGREE * np.cos(np.radians(origin_lat))
+
+    gender = np.zeros((n, 3))
+    gender[np.arange(n), features['gender']] = GENDER_WEIGHT
+
+    masks = features['room_capacity_mask'].astype(np.int64)
+    capacities = np.stack([(masks >> bit) & 1 for bit in range(CAPACITY_BUCKETS)], axis=1) * CAPACITY_WEIGHT
+
+    amenities = np.stack([features['has_wifi'], features['has_solar'], features['has_borehole']], axis=1) * AMENITY_WEIGHT
+
+    return np.column_stack([
+        features['price'] / PRICE_SCALE,
+        x_km / DISTANCE_SCALE,
+        y_km / DISTANCE_SCALE,
+        gender,
+        amenities,
+        capacities,
+    ])
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.rebuilding = False
+        self.last_build = 0.0
+        # (tree, tree_ids, vectors, rows) swapped in as one tuple so readers never see a half-built index:
+        # tree_ids is the property id of each tree point, vectors has every snapshot row at build time,
+        # rows maps property id -> row in vectors.
+        self.state = (None, None, None, {})
+
+    def build(self, features):
+        with features.lock:
+            vectors = feature_vectors(features)
+            ids = features['id'].copy()
+            available = features['is_available'].copy()
+            version = features.version
+
+        # scipy.spatial costs ~350 ms to import; only pay for it once someone asks for similar listings
+        from scipy.spatial import cKDTree
+
+        tree = cKDTree(vectors[available]) if available.any() else None
+        self.state = (tree, ids[available], vectors, {int(pk): i for i, pk in enumerate(ids)})
+        self.version = version
+        self.last_build = time.monotonic()
+
+    def _rebuild(self):
+        try:
+            self.build(get_features())
+        finally:
+            self.rebuilding = False
+
+    def ensure_current(self):
+        features = get_features()
+        if self.version is None:
+            # Nothing to serve yet: the first query waits for the build
+            with self.lock:
+                if self.version is None:
+                    self.build(features)
+        elif self.version != features.version and not self.rebuilding \
+                and time.monotonic() - self.last_build >= REBUILD_SECONDS:
+            with self.lock:
+                if self.rebuilding:
+                    return features
+                self.rebuilding = True
+            try:
+                tasks.submit(self._rebuild)
+            except Exception:
+                self.rebuilding = False
+                raise
+        return features
+
+    def similar(self, property_id, k=5):
+        """[(property_id, distance)] of the k nearest available listings, closest first."""
+        features = self.ensure_current()
+        if property_id not in features.index:
+            # Created by another worker since our snapshot was built
+            features.refresh([property_id])
+
+        with features.lock:
+            row = features.index.get(property_id)
+            if row is None:
+                return []
+            point = feature_vectors({name: features[name][row:row + 1] for name in features.columns})[0]
+
+        tree, tree_ids, _, _ = self.state
+        if tree is None:
+            return []
+
+        # One extra in case the listing itself is in the tree, plus slack for ones taken since the build
+        count = min(2 * k + 1, len(tree_ids))
+        distances, points = tree.query(point, k=count)
+        distances, points = np.atleast_1d(distances), np.atleast_1d(points)
+
+        results = []
+        with features.lock:
+            for d, p in zip(distances, points):
+                pk = int(tree_ids[p])
+                row = features.index.get(pk)
+                if pk != property_id and row is not None and features['is_available'][row]:
+                    results.append((pk, float(d)))
+        return results[:k]
+
+
+_index = SimilarityIndex()
+
+
+def similar_properties(property_id, k=5):
+    return _index.similar(property_id, k)
@@ -0,0 +1,44 @@
+"""
+Local stand-in for a remote media store (S3, Cloudinary, ...).
+
+Files are kept under MEDIA_ROOT like FileSystemStorage, but they're listed the
+way object-store APIs do it: a page of keys at a time, in key order, after a
+cursor, with each key's size and modified time and no directories. That lets
+the paged path of the media GC (mediagc.py) run without cloud credentials:
+
+    STORAGES['default'] = {'BACKEND': 'listings.storage.PagedListingStorage'}
+"""
+import datetime
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class PagedListingStorage(FileSystemStorage):
+    page_size = 1000
+
+    def list_page(self, prefix='', start_after='', limit=None):
+        """[(name, size, modified)] for up to `limit` keys under prefix that sort after start_after."""
+        limit = limit or self.page_size
+        root = self.path('')
+        names = []
+        # A real store answers this from its index; walking the tree is fine for a stand-in
+        for dirpath, _, files in os.walk(self.path(prefix.rsplit('/', 1)[0]) if '/' in prefix else root):
+            rel = os.path.relpath(dirpath, root).replace(os.sep, '/')
+            for file in files:
+                name = file if rel == '.' else f'{rel}/{file}'
+                if name.startswith(prefix) and name > start_after:
+                    names.append(name)
+        names.sort()
+
+        page = []
+        for name in names[:limit]:
+            stat = os.stat(self.path(name))
+            page.append((name, stat.st_size, datetime.datetime.fromtimestamp(stat.st_mtime, tz=datetime.timezone.utc)))
+        return page
+
+    def delete_many(self, names):
+        """Bulk delete, as object stores offer (S3 takes 1000 keys per call)."""
+        for name in names:
+            self.delete(name)
+        return len(names)
@@ -0,0 +1,41 @@
+"""
+Fire-and-forget work that shouldn't hold up a request (notifications, hashing).
+
+Jobs are handed to a small thread pool once the surrounding transaction
+commits, so they never see rows that end up rolled back. The pool lives in the
+worker process: anything still queued when a worker is recycled is lost, so
+only use it for work that is safe to miss or is re-derived later.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+    thread_name_prefix='campusacc-task',
+)
+
+
+def _run(fn, args, kwargs):
+    # Same connection housekeeping Django does around a request
+    close_old_connections()
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(fn, '__name__', fn))
+    finally:
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the background pool right away (for work that doesn't depend on uncommitted rows)."""
+    return _executor.submit(_run, fn, args, kwargs)
+
+
+def run_in_background(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the background pool after the current transaction commits."""
+    transaction.on_commit(lambda: submit(fn, *args, **kwargs))
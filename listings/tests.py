@@ -1,3 +1,1198 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import io
+import os
+import contextlib
+import random
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from backend.database import database_config
+
+from . import alerts, async_views, availability, campuses, changefeed, compression, facets, features, geo, imports, live, maptiles, mediagc, photohash, querylog, ranking, renderers, scheduler, similarity, tasks, textdup, throttling, views, whatsapp
+from .idempotency import Replay
+from .models import Booking, Campus, JobLease, ListingTextBand, Profile, Property, PropertyCampusDistance, PropertyImage, Report, Review, Room, SavedSearch, SavedSearchAlert
+
+
+def _listing(landlord, **fields):
+    defaults = {'title': "Cottage", 'description': "x", 'price_per_month': 100, 'address': "a"}
+    return Property.objects.create(landlord=landlord, **{**defaults, **fields})
+
+
+def _fresh_snapshot():
+    """Per-process caches (campus list, feature snapshot) don't see a test's rollback; rebuild them."""
+    campuses.campuses_changed()
+    features.campuses_changed()
+
+
+@contextlib.contextmanager
+def _background_inline(test):
+    """Run on_commit background jobs synchronously, in the test's thread and transaction."""
+    with mock.patch.object(tasks, 'submit', side_effect=lambda fn, *args, **kwargs: fn(*args, **kwargs)), \
+            test.captureOnCommitCallbacks(execute=True):
+        yield
+
+
+def _components(nodes, pairs):
+    """Connected components by brute force: keep merging groups that share a pair."""
+    groups = [{node} for node in nodes]
+    for a, b in pairs:
+        ga = next(group for group in groups if a in group)
+        gb = next(group for group in groups if b in group)
+        if ga is not gb:
+            groups.remove(gb)
+            ga |= gb
+    return sorted(sorted(group) for group in groups if len(group) > 1)
+
+
+class TextClustersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        landlord = User.objects.create_user('landlord', password='x')
+        sig = textdup.signature("Modern cottage near the main gate", "Solar backup, borehole water and fast Wi-Fi for two students")
+        # bulk_create: no signals, so nothing gets re-signed behind the test's back
+        cls.ids = [p.pk for p in Property.objects.bulk_create([
+            Property(landlord=landlord, title=f"Cottage {i}", description="x", price_per_month=100, address="a", minhash=sig)
+            for i in range(12)
+        ])]
+        # One shared bucket so clusters() loads every listing as a candidate
+        ListingTextBand.objects.bulk_create([ListingTextBand(property_id=pk, band=0, value=1) for pk in cls.ids])
+
+    def clusters_for(self, pairs):
+        with mock.patch.object(textdup, 'find_pairs', return_value=[(min(a, b), max(a, b), 1.0) for a, b in pairs]):
+            return sorted(sorted(pk for pk, _ in members) for _, members in textdup.clusters())
+
+    def test_chain_through_later_ids_is_one_cluster(self):
+        a, b, c, d, e, f = self.ids[:6]
+        pairs = [(a, c), (b, e), (d, f), (d, e), (c, f), (c, e)]
+        self.assertEqual(self.clusters_for(pairs), [sorted([a, b, c, d, e, f])])
+
+    def test_matches_brute_force_components(self):
+        rng = random.Random(48)
+        for _ in range(300):
+            nodes = rng.sample(self.ids, rng.randint(2, len(self.ids)))
+            pairs = [tuple(rng.sample(nodes, 2)) for _ in range(rng.randint(1, 10))]
+            self.assertEqual(self.clusters_for(pairs), _components(self.ids, pairs), pairs)
+
+    def test_oldest_listing_leads_each_cluster(self):
+        a, b, c = self.ids[:3]
+        with mock.patch.object(textdup, 'find_pairs', return_value=[(b, c, 1.0), (a, c, 1.0)]):
+            [(oldest, members)] = textdup.clusters()
+        self.assertEqual(oldest, a)
+        self.assertEqual([pk for pk, _ in members], [a, b, c])
+
+
+class ChangeTokenTests(SimpleTestCase):
+    def test_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(changefeed.decode_token(changefeed.encode_token(moment)), moment)
+
+    def test_decoded_token_is_aware(self):
+        self.assertEqual(changefeed.decode_token('0'), datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc))
+
+    def test_bad_tokens_raise_value_error(self):
+        for token in ['abc', '1.5', None, '99999999999999999999999999', '-99999999999999999999999999', '9' * 400]:
+            with self.subTest(token=token), self.assertRaises(ValueError):
+                changefeed.decode_token(token)
+
+
+class ChangesEndpointTests(TestCase):
+    def test_out_of_range_token_is_a_400(self):
+        response = self.client.get('/api/properties/changes/', {'since': '99999999999999999999999999'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_token_from_the_first_call_is_accepted(self):
+        token = self.client.get('/api/properties/changes/').json()['token']
+        response = self.client.get('/api/properties/changes/', {'since': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['reset'])
+
+
+class LivePushTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('host', password='x')
+        cls.student = User.objects.create_user('student', password='x')
+        cls.prop = Property.objects.create(landlord=cls.landlord, title="Cottage", description="x", price_per_month=100, address="a")
+        cls.room = Room.objects.create(property=cls.prop, label="Room 1")
+        cls.booking = Booking.objects.create(property=cls.prop, room=cls.room, student=cls.student, move_in_date='2026-01-01')
+
+    def published(self, change):
+        with mock.patch.object(live.hub, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            change()
+        return publish.call_args_list
+
+    def test_room_edit_without_availability_change_is_quiet(self):
+        room = Room.objects.get(pk=self.room.pk)
+        room.capacity = 3
+        self.assertEqual(self.published(room.save), [])
+
+    def test_room_availability_change_is_pushed(self):
+        room = Room.objects.get(pk=self.room.pk)
+        room.is_available = False
+        [call] = self.published(room.save)
+        self.assertEqual(call.args[0], 'availability')
+        self.assertEqual(call.args[1]['rooms'], [{'id': room.pk, 'property': self.prop.pk, 'is_available': False}])
+
+    def test_booking_status_change_reaches_student_and_landlord(self):
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.status = 'accepted'
+        [call] = self.published(booking.save)
+        self.assertEqual(call.args[1]['status'], 'accepted')
+        self.assertEqual(call.kwargs['audience'], {self.student.pk, self.landlord.pk})
+
+    def test_booking_edit_without_status_change_is_quiet(self):
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.message = "Can I view it on Saturday?"
+        self.assertEqual(self.published(booking.save), [])
+
+    def test_booking_save_does_not_load_the_property(self):
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.status = 'rejected'
+        with mock.patch.object(live.hub, 'publish'), self.assertNumQueries(1):
+            booking.save()
+
+
+class ThrottleIdentTests(SimpleTestCase):
+    def ident(self, forwarded_for):
+        request = RequestFactory().post('/api/register/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for)
+        return throttling.RegisterThrottle().get_key(request)
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 0})
+    def test_forwarded_for_ignored_without_proxies(self):
+        self.assertEqual(self.ident('1.2.3.4'), '10.0.0.1')
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_spoofed_entries_ignored_behind_one_proxy(self):
+        # The client sent "6.6.6.6"; the proxy appended the address it actually saw
+        self.assertEqual(self.ident('6.6.6.6, 203.0.113.7'), '203.0.113.7')
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    def conn_max_age(self, **env):
+        with mock.patch.dict(os.environ, env):
+            for name in ('DATABASE_URL', 'DB_CONN_MAX_AGE', 'DJANGO_SERVER'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            return database_config(Path('/tmp'))['CONN_MAX_AGE']
+
+    def test_persistent_connections_under_wsgi(self):
+        self.assertEqual(self.conn_max_age(), 600)
+
+    def test_no_persistent_connections_under_asgi(self):
+        self.assertEqual(self.conn_max_age(DJANGO_SERVER='asgi'), 0)
+
+    def test_explicit_setting_wins(self):
+        self.assertEqual(self.conn_max_age(DJANGO_SERVER='asgi', DB_CONN_MAX_AGE='60'), 60)
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('owner', password='x')
+        cls.prop = Property.objects.create(landlord=cls.landlord, title="Cottage", description="x", price_per_month=100, address="a")
+
+    def test_fields_shape_reads(self):
+        response = self.client.get(f'/api/properties/{self.prop.pk}/', {'fields': 'id,title'})
+        self.assertEqual(set(response.json()), {'id', 'title'})
+
+    def test_fields_ignored_on_writes(self):
+        client = APIClient()
+        client.force_authenticate(self.landlord)
+        response = client.patch(f'/api/properties/{self.prop.pk}/?fields=id', {'title': "Renamed"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], "Renamed")
+        self.prop.refresh_from_db()
+        self.assertEqual(self.prop.title, "Renamed")
+
+
+class QueryRecorderTests(TestCase):
+    def setUp(self):
+        querylog.clear()
+        self.addCleanup(querylog.clear)
+
+    def test_slow_statement_is_recorded_with_its_plan(self):
+        with connection.execute_wrapper(querylog.QueryRecorder(connection, threshold_ms=0)):
+            Property.objects.filter(price_per_month__lt=100).count()
+        [entry] = querylog.recent_queries()
+        self.assertIn('listings_property', entry['sql'])
+        self.assertIsNotNone(entry['plan'])
+
+    def test_failed_statement_raises_its_own_error_and_is_not_recorded(self):
+        def fail(sql, params, many, context):
+            raise ZeroDivisionError
+        recorder = querylog.QueryRecorder(connection, threshold_ms=0)
+        with self.assertRaises(ZeroDivisionError):
+            recorder(fail, 'SELECT 1', (), False, {})
+        self.assertEqual(querylog.recent_queries(), [])
+
+    def test_middleware_runs_natively_in_an_async_chain(self):
+        async def get_response(request):
+            return None
+        self.assertTrue(iscoroutinefunction(querylog.SlowQueryMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(querylog.SlowQueryMiddleware(lambda request: None)))
+
+    @override_settings(SLOW_QUERY_MS=0)
+    async def test_async_view_queries_are_recorded(self):
+        response = await self.async_client.get('/api/async/properties/')
+        self.assertEqual(response.status_code, 200)
+        views = {entry['view'] for entry in querylog.recent_queries()}
+        self.assertTrue(any(view and view.endswith('async-property-list') for view in views), views)
+
+
+class ValueWeightsTests(SimpleTestCase):
+    @override_settings(VALUE_SCORE_WEIGHTS={'price': 0.5, 'distance': 0.5})
+    def test_known_weights_pass(self):
+        ranking.check_settings()
+
+    @override_settings(VALUE_SCORE_WEIGHTS={'prize': 0.5})
+    def test_unknown_key_is_reported_at_startup(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "'prize'"):
+            ranking.check_settings()
+
+    @override_settings(VALUE_SCORE_WEIGHTS={'price': 'high'})
+    def test_non_numeric_weight_is_reported(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ranking.check_settings()
+
+
+class WhatsAppSendFailureTests(TestCase):
+    outbox = ('Hi', [('whatsapp:+263770000002', "New booking request")])
+
+    def test_failed_send_is_logged_with_traceback(self):
+        with mock.patch.object(views, 'handle_message', return_value=self.outbox), \
+                mock.patch.object(views, 'send_whatsapp', side_effect=RuntimeError("twilio down")), \
+                self.assertLogs('listings.views', 'ERROR') as logs:
+            response = self.client.post('/api/whatsapp/', {'Body': 'hi', 'From': 'whatsapp:+263770000001'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('whatsapp:+263770000002', logs.output[0])
+        self.assertIn('RuntimeError: twilio down', logs.output[0])
+
+    def test_failed_async_send_is_logged_with_traceback(self):
+        with mock.patch.object(async_views, 'handle_message', return_value=self.outbox), \
+                mock.patch.object(async_views, 'send_whatsapp_async', side_effect=RuntimeError("twilio down")), \
+                self.assertLogs('listings.async_views', 'ERROR') as logs:
+            response = self.client.post('/api/async/whatsapp/', {'Body': 'hi', 'From': 'whatsapp:+263770000001'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('RuntimeError: twilio down', logs.output[0])
+
+
+class ReplayTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_first_attempt_runs(self):
+        self.assertEqual(Replay('booking', 1, 'k').begin(), (None, False))
+
+    def test_concurrent_attempt_is_busy(self):
+        Replay('booking', 1, 'k').begin()
+        self.assertEqual(Replay('booking', 1, 'k').begin(), (None, True))
+
+    def test_stored_value_is_replayed(self):
+        first = Replay('booking', 1, 'k', 'fp')
+        first.begin()
+        first.store((201, {'id': 7}))
+        self.assertEqual(Replay('booking', 1, 'k', 'fp').begin(), (('fp', (201, {'id': 7})), False))
+
+    def test_released_attempt_can_be_retried(self):
+        first = Replay('booking', 1, 'k')
+        first.begin()
+        first.release()
+        self.assertEqual(Replay('booking', 1, 'k').begin(), (None, False))
+
+    def test_keys_are_per_scope_and_owner(self):
+        Replay('booking', 1, 'k').begin()
+        self.assertEqual(Replay('booking', 2, 'k').begin(), (None, False))
+        self.assertEqual(Replay('twilio', 1, 'k').begin(), (None, False))
+
+
+class IdempotentBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        landlord = User.objects.create_user('lord', password='x')
+        cls.student = User.objects.create_user('learner', password='x')
+        cls.prop = Property.objects.create(landlord=landlord, title="Cottage", description="x", price_per_month=100, address="a")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def post(self, key, **data):
+        return self.client.post('/api/bookings/', {'property': self.prop.pk, 'move_in_date': '2026-11-01', **data},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeat_returns_first_response_without_a_second_booking(self):
+        first, second = self.post('abc'), self.post('abc')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(Booking.objects.filter(student=self.student).count(), 1)
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.post('abc')
+        self.assertEqual(self.post('abc', message="Different").status_code, 422)
+
+
+class SchedulerLeaseTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.job = scheduler.Job('test_job', self.work, every=datetime.timedelta(hours=1), lease=datetime.timedelta(minutes=10))
+        JobLease.objects.create(name='test_job')
+
+    def work(self, dry_run=False):
+        self.calls.append(dry_run)
+        return {'done': 1}
+
+    def test_due_job_runs_once_and_is_rescheduled(self):
+        outcome = scheduler.run_job(self.job, 'a')
+        self.assertEqual(outcome['status'], 'ok')
+        self.assertIsNone(scheduler.run_job(self.job, 'b'))
+        lease = JobLease.objects.get(name='test_job')
+        self.assertEqual((lease.runs, lease.owner, lease.last_result), (1, '', {'done': 1}))
+        self.assertEqual(lease.next_run_at, lease.last_started_at + self.job.every)
+        self.assertEqual(self.calls, [False])
+
+    def test_held_lease_keeps_others_out(self):
+        self.assertTrue(scheduler._acquire(self.job, 'a', timezone.now()))
+        self.assertFalse(scheduler._acquire(self.job, 'b', timezone.now()))
+        self.assertIsNone(scheduler.run_job(self.job, 'b'))
+        self.assertEqual(self.calls, [])
+
+    def test_expired_lease_is_taken_over(self):
+        self.assertTrue(scheduler._acquire(self.job, 'a', timezone.now()))
+        later = timezone.now() + self.job.lease + datetime.timedelta(seconds=1)
+        self.assertTrue(scheduler._acquire(self.job, 'b', later))
+        self.assertEqual(JobLease.objects.get(name='test_job').owner, 'b')
+
+    def test_failure_is_recorded_and_releases_the_lease(self):
+        def broken(dry_run=False):
+            raise RuntimeError("boom")
+        self.job.fn = broken
+        with self.assertLogs('listings.scheduler', 'ERROR'):
+            outcome = scheduler.run_job(self.job, 'a')
+        self.assertEqual(outcome['status'], 'failed')
+        lease = JobLease.objects.get(name='test_job')
+        self.assertEqual((lease.runs, lease.failures, lease.owner), (1, 1, ''))
+        self.assertIn('RuntimeError: boom', lease.last_error)
+
+    def test_dry_run_runs_without_taking_the_lease(self):
+        scheduler._acquire(self.job, 'a', timezone.now())
+        self.assertEqual(scheduler.run_job(self.job, 'b', dry_run=True)['status'], 'ok')
+        lease = JobLease.objects.get(name='test_job')
+        self.assertEqual((lease.runs, lease.owner), (0, 'a'))
+        self.assertEqual(self.calls, [True])
+
+
+class MediaGCTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = FileSystemStorage(location=tmp.name)
+        self.landlord = User.objects.create_user('gc', password='x')
+        prop = Property.objects.create(landlord=self.landlord, title="Cottage", description="x", price_per_month=100, address="a")
+
+        old = (timezone.now() - datetime.timedelta(days=3)).timestamp()
+        for name in ['property_photos/a.jpg', 'property_photos/b.jpg', 'property_photos/sub/c.jpg',
+                     'property_photos/z.jpg', 'profile_pics/me.jpg', 'profile_pics/old.jpg']:
+            self.storage.save(name, ContentFile(b'x' * 10))
+            os.utime(self.storage.path(name), (old, old))
+        self.storage.save('property_photos/new.jpg', ContentFile(b'x'))
+
+        # bulk_create: no upload signals (hashing) for rows whose files are fakes
+        PropertyImage.objects.bulk_create([PropertyImage(property=prop, image=name)
+                                           for name in ['property_photos/b.jpg', 'property_photos/z.jpg']])
+        Profile.objects.filter(user=self.landlord).update(profile_picture='profile_pics/me.jpg')
+
+    def test_find_orphans_merges_listing_and_references(self):
+        orphans = sorted(name for name, _, _ in mediagc.find_orphans(self.storage))
+        self.assertEqual(orphans, ['profile_pics/old.jpg', 'property_photos/a.jpg',
+                                   'property_photos/new.jpg', 'property_photos/sub/c.jpg'])
+
+    def test_collect_spares_recent_uploads(self):
+        summary = mediagc.collect(self.storage, grace=datetime.timedelta(hours=24))
+        self.assertEqual((summary['orphans'], summary['deleted'], summary['too_new'], summary['bytes']), (4, 3, 1, 30))
+        self.assertFalse(self.storage.exists('property_photos/a.jpg'))
+        self.assertTrue(self.storage.exists('property_photos/b.jpg'))
+        self.assertTrue(self.storage.exists('property_photos/new.jpg'))
+        self.assertTrue(self.storage.exists('profile_pics/me.jpg'))
+
+    def test_dry_run_deletes_nothing(self):
+        summary = mediagc.collect(self.storage, grace=datetime.timedelta(hours=24), dry_run=True)
+        self.assertEqual(summary['deleted'], 3)
+        self.assertTrue(self.storage.exists('property_photos/a.jpg'))
+
+    def test_row_added_mid_run_is_not_deleted(self):
+        def referenced_meanwhile(name, size, modified):
+            if name == 'property_photos/a.jpg':
+                Profile.objects.filter(user=self.landlord).update(profile_picture=name)
+        mediagc.collect(self.storage, grace=datetime.timedelta(hours=24), on_orphan=referenced_meanwhile)
+        self.assertTrue(self.storage.exists('property_photos/a.jpg'))
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        landlord = User.objects.create_user('facets', password='x')
+        _listing(landlord, price_per_month=80, has_wifi=True, has_solar=True, gender_preference='Ladies')
+        _listing(landlord, price_per_month=120, has_wifi=True, gender_preference='Gents')
+        _listing(landlord, price_per_month=140, has_solar=True, gender_preference='Ladies')
+        _listing(landlord, price_per_month=300, gender_preference='Mixed')
+
+    def setUp(self):
+        _fresh_snapshot()
+
+    def get(self, **params):
+        return self.client.get('/api/properties/facets/', params)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        data = self.get(amenities='wifi', gender='Ladies').json()
+        self.assertEqual(data['total'], 1)
+        # Gender counts keep the wifi filter but not the gender one; amenity counts the other way round
+        self.assertEqual(data['gender'], {'Mixed': 0, 'Gents': 1, 'Ladies': 1})
+        self.assertEqual(data['amenities'], {'wifi': 1, 'solar': 2, 'borehole': 0})
+
+    def test_price_histogram_ignores_the_price_filter(self):
+        data = self.get(max_price=100, bin_width=100).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual([b['count'] for b in data['price']['histogram']], [1, 2, 0, 1])
+
+    def test_outlier_price_gets_an_open_ended_bin(self):
+        _listing(User.objects.get(username='facets'), price_per_month=99_999_999)
+        _fresh_snapshot()
+        price = self.get(bin_width=5).json()['price']
+        self.assertLessEqual(len(price['histogram']), facets.MAX_BINS + 1)
+        self.assertEqual(price['histogram'][-1], {'min': price['histogram'][-2]['max'], 'max': None, 'count': 1})
+        self.assertEqual(sum(b['count'] for b in price['histogram']), 5)
+
+    def test_bins_widen_to_stay_within_the_limit(self):
+        price = self.get(bin_width=5).json()['price']
+        self.assertEqual(price['bin_width'], 5)
+        many = [_listing(User.objects.get(username='facets'), price_per_month=p) for p in range(400, 2400, 100)]
+        _fresh_snapshot()
+        price = self.get(bin_width=5).json()['price']
+        self.assertLessEqual(len(price['histogram']), facets.MAX_BINS + 1)
+        self.assertEqual(price['bin_width'] % 5, 0)
+        self.assertEqual(sum(b['count'] for b in price['histogram']), 4 + len(many))
+
+    def test_bad_bin_width_is_a_400(self):
+        for width in ['0', '-5', 'abc', '100000000']:
+            with self.subTest(width=width):
+                self.assertEqual(self.get(bin_width=width).status_code, 400)
+
+
+class SimilarListingsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        landlord = User.objects.create_user('similar', password='x')
+        cls.base = _listing(landlord, price_per_month=100, latitude=-20.16, longitude=28.64)
+        cls.near = _listing(landlord, price_per_month=105, latitude=-20.161, longitude=28.641)
+        cls.mid = _listing(landlord, price_per_month=200, latitude=-20.17, longitude=28.65)
+        cls.far = _listing(landlord, price_per_month=900, latitude=-20.3, longitude=28.9)
+
+    def setUp(self):
+        _fresh_snapshot()
+        self.index = similarity.SimilarityIndex()
+
+    def test_closest_first(self):
+        self.assertEqual([pk for pk, _ in self.index.similar(self.base.pk, k=3)], [self.near.pk, self.mid.pk, self.far.pk])
+
+    def test_stale_tree_is_served_while_rebuilding_in_the_background(self):
+        self.index.similar(self.base.pk)
+        self.index.last_build -= similarity.REBUILD_SECONDS
+        Property.objects.filter(pk=self.near.pk).update(is_available=False)
+        features.get_features().refresh([self.near.pk])
+
+        with mock.patch.object(tasks, 'submit') as submit:
+            results = [pk for pk, _ in self.index.similar(self.base.pk, k=3)]
+            # Taken listings drop out even before the tree catches up
+            self.assertEqual(results, [self.mid.pk, self.far.pk])
+            submit.assert_called_once_with(self.index._rebuild)
+            # Only one rebuild at a time
+            self.index.similar(self.base.pk)
+            self.assertEqual(submit.call_count, 1)
+
+        self.index._rebuild()
+        self.assertEqual(self.index.version, features.get_features().version)
+        self.assertNotIn(self.near.pk, self.index.state[1])
+
+    def test_rebuilds_are_rate_limited(self):
+        self.index.similar(self.base.pk)
+        features.get_features().refresh([self.near.pk])
+        with mock.patch.object(tasks, 'submit') as submit:
+            self.index.similar(self.base.pk)
+        submit.assert_not_called()
+
+    def test_endpoint_404s_for_bad_ids(self):
+        self.assertEqual(self.client.get('/api/properties/abc/similar/').status_code, 404)
+        self.assertEqual(self.client.get('/api/properties/999999/similar/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/properties/{self.base.pk}/similar/').status_code, 200)
+
+
+class ImportedDuplicateTests(TestCase):
+    description = ("Spacious room a short walk from the main gate with solar backup, a borehole, "
+                   "fast Wi-Fi and a secure parking area for two students.")
+
+    def test_imported_copy_of_another_landlords_listing_is_flagged(self):
+        owner = User.objects.create_user('owner', password='x')
+        copier = User.objects.create_user('copier', password='x')
+        with _background_inline(self):
+            original = _listing(owner, title="Hillside Cottage", description=self.description)
+        rows = [(2, {'ref': 'A1', 'title': "Hillside Cottage", 'description': self.description,
+                     'price_per_month': '90', 'address': "1 Other Rd"})]
+        with _background_inline(self):
+            summary = imports.import_properties(copier, rows)
+
+        self.assertEqual(summary['properties'], 1)
+        copy = Property.objects.get(landlord=copier)
+        self.assertIsNotNone(copy.minhash)
+        self.assertTrue(ListingTextBand.objects.filter(property=copy).exists())
+        report = Report.objects.get(property=copy)
+        self.assertEqual((report.duplicate_of_id, report.reason, report.reporter), (original.pk, 'fake', None))
+
+
+class MapTileTests(TestCase):
+    # Tile columns line up with geohash columns (both halve longitude), but Mercator rows don't line up
+    # with geohash rows, so cells straddle the top/bottom edges of tiles. This is the bottom edge of the
+    # zoom 12 tile holding NUST.
+    Z = 12
+    EDGE_LAT = geo.tile_bounds(12, 2373, 2281)[0]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('mapper', password='x')
+        cls.north = _listing(cls.landlord, latitude=cls.EDGE_LAT + 0.0005, longitude=28.645)
+        cls.south = _listing(cls.landlord, latitude=cls.EDGE_LAT - 0.0005, longitude=28.645)
+        cls.away = _listing(cls.landlord, latitude=-20.10, longitude=28.55, is_available=False)
+        _listing(cls.landlord)  # no coordinates: never on the map
+
+    def setUp(self):
+        cache.clear()
+
+    def tile_of(self, prop, z):
+        columns, rows = geo.tiles_for_bbox(prop.latitude, prop.longitude, prop.latitude, prop.longitude, z)
+        return z, columns[0], rows[0]
+
+    def test_cover_contains_every_point_in_the_box(self):
+        rng = random.Random(35)
+        for _ in range(200):
+            z = rng.randint(2, 18)
+            x, y = rng.randrange(2 ** z), rng.randrange(2 ** z // 4, 3 * 2 ** z // 4)
+            south, west, north, east = geo.tile_bounds(z, x, y)
+            cover = geo.geohash_cover(south, west, north, east, geo.precision_for_zoom(z))
+            self.assertLessEqual(len(cover), 16)
+            for _ in range(5):
+                lat, lng = rng.uniform(south, north), rng.uniform(west, east)
+                gh = geo.encode_geohash(lat, lng)
+                prefix = next((prefix for prefix in cover if gh.startswith(prefix)), None)
+                self.assertIsNotNone(prefix, (z, x, y, gh, cover))
+                low, high = geo.prefix_range(prefix)
+                self.assertTrue(low <= gh and (high is None or gh < high))
+
+    def test_points_tile(self):
+        response = self.client.get('/api/properties/map/', {'tile': '%d/%d/%d' % self.tile_of(self.away, 16)})
+        self.assertEqual([p['id'] for p in response.json()['points']], [self.away.pk])
+        data = maptiles.get_tile(*self.tile_of(self.away, 16), only_available=True)
+        self.assertEqual(data['points'], [])
+
+    def test_cell_straddling_a_tile_edge_is_drawn_once(self):
+        z, x, y = self.tile_of(self.north, self.Z)
+        self.assertEqual(self.tile_of(self.south, self.Z), (z, x, y + 1))
+        cell = self.north.geohash[:geo.precision_for_zoom(z)]
+        self.assertEqual(cell, self.south.geohash[:len(cell)])
+
+        tiles = [maptiles.get_tile(z, x, y), maptiles.get_tile(z, x, y + 1)]
+        holders = [tile for tile in tiles if any(c['geohash'] == cell for c in tile['clusters'])]
+        self.assertEqual(len(holders), 1)
+
+        response = self.client.get('/api/properties/map/', {'bbox': '28.5,-20.2,28.75,-20.05', 'zoom': z})
+        clusters = response.json()['clusters']
+        self.assertEqual(len({c['geohash'] for c in clusters}), len(clusters))
+        self.assertEqual(sum(c['count'] for c in clusters), 3)
+
+    def test_tile_query_uses_the_geohash_index(self):
+        south, west, north, east = geo.tile_bounds(*self.tile_of(self.north, self.Z))
+        sql, params = maptiles._covering(south, west, north, east, 6).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('geohash', plan)
+        self.assertNotIn("SCAN listings_property'", plan)
+
+    def test_saving_a_listing_invalidates_cached_tiles(self):
+        tile = self.tile_of(self.away, 16)
+        self.assertEqual(len(maptiles.get_tile(*tile)['points']), 1)
+        with _background_inline(self):
+            _listing(self.landlord, latitude=self.away.latitude, longitude=self.away.longitude)
+        self.assertEqual(len(maptiles.get_tile(*tile)['points']), 2)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('owner', password='x')
+        cls.other = User.objects.create_user('rival', password='x')
+        for user in (cls.landlord, cls.other):
+            user.profile.role = 'landlord'
+            user.profile.save()
+        cls.mine = _listing(cls.landlord, title="=HYPERLINK(\"http://evil\")", latitude=-20.16)
+        cls.theirs = _listing(cls.other, title="Theirs")
+
+    def _get(self, user, path, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(path, params)
+
+    def _csv(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_quotes_formula_cells_but_not_numbers(self):
+        body = self._csv(self._get(self.landlord, '/api/export/properties.csv'))
+        self.assertIn("'=HYPERLINK", body)
+        self.assertIn(',-20.16,', body)
+
+    def test_ndjson_keeps_values_as_is(self):
+        response = self._get(self.landlord, '/api/export/properties.ndjson')
+        self.assertIn(b'"title":"=HYPERLINK', b''.join(response.streaming_content).replace(b' ', b''))
+
+    def test_landlord_only_gets_own_rows(self):
+        body = self._csv(self._get(self.landlord, '/api/export/properties.csv', landlord=self.other.pk))
+        self.assertIn('HYPERLINK', body)
+        self.assertNotIn('Theirs', body)
+
+    def test_landlord_cannot_export_reports(self):
+        self.assertEqual(self._get(self.landlord, '/api/export/reports.csv').status_code, 403)
+
+    def test_students_are_refused(self):
+        student = User.objects.create_user('student', password='x')
+        self.assertEqual(self._get(student, '/api/export/bookings.csv').status_code, 403)
+
+
+class CompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        landlord = User.objects.create_user('owner', password='x')
+        for i in range(20):
+            _listing(landlord, title=f"Cottage {i}", description="Close to campus, solar and borehole. " * 5)
+
+    def test_negotiates_brotli_then_gzip(self):
+        response = self.client.get('/api/properties/', headers={'accept-encoding': 'gzip, br'})
+        self.assertEqual(response['Content-Encoding'], 'br' if compression.brotli else 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get('/api/properties/', headers={'accept-encoding': 'gzip, br;q=0'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Cottage 19', gzip.decompress(response.content))
+
+    def test_identity_without_accept_encoding(self):
+        response = self.client.get('/api/properties/')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_middleware_runs_natively_in_an_async_chain(self):
+        async def get_response(request):
+            return None
+        self.assertTrue(iscoroutinefunction(compression.CompressionMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(compression.CompressionMiddleware(lambda request: None)))
+
+    async def test_async_responses_are_compressed(self):
+        response = await self.async_client.get('/api/async/properties/', headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'Cottage 19', gzip.decompress(response.content))
+
+
+class FastJSONRendererTests(TestCase):
+    def assertSameBytes(self, data):
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_matches_drf_byte_for_byte(self):
+        self.assertSameBytes({
+            'title': "K\u016bmbira \u2014 near NUST \u2028 new line \u2029",
+            'price': decimal.Decimal('120.50'),
+            'at': timezone.now(),
+            'day': datetime.date(2025, 1, 31),
+            'lazy': gettext_lazy("Available"),
+            'values': [1, 2.5, 0.1 + 0.2, None, True, {1: 'int key'}],
+        })
+
+    def test_matches_drf_on_a_property_list(self):
+        landlord = User.objects.create_user('owner', password='x')
+        _listing(landlord, title="Room \u2028 \U0001f3e0", latitude=-20.16, longitude=28.58)
+        response = self.client.get('/api/properties/')
+        data = response.data
+        self.assertEqual(response.content, JSONRenderer().render(data))
+        self.assertSameBytes(data)
+
+    def test_indent_falls_back_to_drf(self):
+        context = {'indent': 2}
+        data = {'a': [1, 2]}
+        self.assertEqual(renderers.FastJSONRenderer().render(data, renderer_context=context),
+                         JSONRenderer().render(data, renderer_context=context))
+
+
+class CampusTests(TestCase):
+    # The test database has NUST from the campuses migration, as the default campus
+    @classmethod
+    def setUpTestData(cls):
+        cls.nust = Campus.objects.get(slug='nust')
+        cls.lsu = Campus.objects.create(name="Lupane State University", short_name="LSU", slug='lsu', city="Lupane",
+                                        latitude=-18.93, longitude=27.80)
+        cls.landlord = User.objects.create_user('owner', password='x')
+        cls.near_nust = _listing(cls.landlord, title="By NUST", latitude=-20.16, longitude=28.64)
+        cls.near_lsu = _listing(cls.landlord, title="By LSU", latitude=-18.935, longitude=27.805)
+        cls.student = User.objects.create_user('student', password='x', email='s@example.com')
+        cls.student.profile.campus = cls.lsu
+        cls.student.profile.save()
+
+    def setUp(self):
+        _fresh_snapshot()
+        self.addCleanup(_fresh_snapshot)
+
+    def _titles(self, **params):
+        return [row['title'] for row in self.client.get('/api/properties/', params).json()]
+
+    def test_campus_picks_which_distances_filter(self):
+        self.assertEqual(self._titles(campus='lsu', max_distance=5), ["By LSU"])
+        self.assertEqual(self._titles(campus='nust', max_distance=5), ["By NUST"])
+        # No campus: the default one
+        self.assertEqual(self._titles(max_distance=5), ["By NUST"])
+
+    def test_unknown_campus_is_a_400(self):
+        self.assertEqual(self.client.get('/api/properties/', {'campus': 'nowhere'}).status_code, 400)
+
+    def test_moving_a_campus_recomputes_its_distances(self):
+        self.lsu.latitude, self.lsu.longitude = self.nust.latitude, self.nust.longitude
+        self.lsu.save()
+        _fresh_snapshot()
+        row = PropertyCampusDistance.objects.get(property=self.near_nust, campus=self.lsu)
+        self.assertLess(row.distance_km, 1)
+        self.assertEqual(self._titles(campus='lsu', max_distance=5), ["By NUST"])
+
+    def test_moving_a_listing_recomputes_its_distances(self):
+        self.near_lsu.latitude, self.near_lsu.longitude = -20.161, 28.641
+        self.near_lsu.save()
+        self.assertLess(PropertyCampusDistance.objects.get(property=self.near_lsu, campus=self.nust).distance_km, 1)
+
+    def _saved_search(self, **fields):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.post('/api/saved-searches/', {'max_price': 500, 'radius_km': 5, **fields}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return SavedSearch.objects.get(pk=response.json()['id'])
+
+    def test_saved_search_defaults_to_the_students_campus(self):
+        search = self._saved_search()
+        self.assertEqual(search.campus, self.lsu)
+        self.assertIn(search, alerts.matches_for(self.near_lsu))
+        self.assertNotIn(search, alerts.matches_for(self.near_nust))
+
+    def test_saved_search_radius_uses_its_own_campus(self):
+        search = self._saved_search(campus=self.nust.pk)
+        self.assertIn(search, alerts.matches_for(self.near_nust))
+        self.assertNotIn(search, alerts.matches_for(self.near_lsu))
+
+    def test_saved_search_without_a_campus_uses_the_default(self):
+        search = self._saved_search(campus=None)
+        self.assertIsNone(search.campus)
+        self.assertIn(search, alerts.matches_for(self.near_nust))
+        self.assertNotIn(search, alerts.matches_for(self.near_lsu))
+
+
+class SavedSearchMatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('owner', password='x')
+        cls.student = User.objects.create_user('student', password='x', email='s@example.com')
+        cls.prop = _listing(cls.landlord, price_per_month=150, gender_preference='Ladies', has_wifi=True, has_solar=True,
+                            latitude=-20.16, longitude=28.64)
+
+    def setUp(self):
+        _fresh_snapshot()
+
+    def _search(self, **fields):
+        return SavedSearch.objects.create(user=self.student, **{'max_price': 200, **fields})
+
+    def _matches(self, prop=None):
+        return set(alerts.matches_for(prop or self.prop))
+
+    def test_price(self):
+        under, exact, over = self._search(max_price=100), self._search(max_price=150), self._search(max_price=300)
+        self.assertEqual(self._matches(), {exact, over})
+        self.assertNotIn(under, self._matches())
+
+    def test_gender(self):
+        ladies, gents, anyone = self._search(gender_preference='Ladies'), self._search(gender_preference='Gents'), self._search()
+        self.assertEqual(self._matches(), {ladies, anyone})
+        self.assertNotIn(gents, self._matches())
+
+    def test_every_required_amenity_must_be_there(self):
+        bit = SavedSearch.AMENITY_BITS
+        wifi = self._search(amenities_mask=bit['wifi'])
+        wifi_solar = self._search(amenities_mask=bit['wifi'] | bit['solar'])
+        borehole = self._search(amenities_mask=bit['borehole'])
+        self.assertEqual(self._matches(), {wifi, wifi_solar})
+        self.assertNotIn(borehole, self._matches())
+
+    def test_radius_from_campus(self):
+        # NUST (the default campus) is about half a kilometre away
+        near, far = self._search(radius_km=1), self._search(radius_km=50)
+        tight = self._search(radius_km=0.1)
+        self.assertEqual(self._matches(), {near, far})
+        self.assertNotIn(tight, self._matches())
+        # Listings without coordinates pass any radius
+        unplaced = _listing(self.landlord, price_per_month=150)
+        self.assertIn(tight, self._matches(unplaced))
+
+    def test_room_capacity(self):
+        Room.objects.create(property=self.prop, label="A", capacity=2)
+        Room.objects.create(property=self.prop, label="B", capacity=6)
+        Room.objects.create(property=self.prop, label="C", capacity=1, is_available=False)
+        double, big, single = self._search(room_capacity=2), self._search(room_capacity=5), self._search(room_capacity=1)
+        self.assertEqual(self._matches(), {double, big})
+        self.assertNotIn(single, self._matches())
+
+    def test_landlords_own_and_inactive_searches_are_skipped(self):
+        SavedSearch.objects.create(user=self.landlord, max_price=200)
+        self._search(is_active=False)
+        self.assertEqual(self._matches(), set())
+
+    def test_each_listing_is_sent_once(self):
+        search = self._search()
+        alerts.send_alerts([self.prop.pk])
+        alerts.send_alerts([self.prop.pk])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(SavedSearchAlert.objects.filter(saved_search=search, property=self.prop).exists())
+        self.assertEqual(self._matches(), set())
+
+
+class BulkAvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('owner', password='x')
+        cls.landlord.profile.role = 'landlord'
+        cls.landlord.profile.phone_number = '+263770000001'
+        cls.landlord.profile.save()
+        cls.other = User.objects.create_user('rival', password='x')
+        cls.mine = _listing(cls.landlord, title="Mine")
+        cls.theirs = _listing(cls.other, title="Theirs")
+        cls.my_room = Room.objects.create(property=cls.mine, label="A")
+        cls.their_room = Room.objects.create(property=cls.theirs, label="B")
+
+    def _post(self, data):
+        client = APIClient()
+        client.force_authenticate(self.landlord)
+        return client.post('/api/availability/', data, format='json')
+
+    def test_other_landlords_rows_are_skipped_not_changed(self):
+        response = self._post({
+            'properties': [{'id': self.mine.pk, 'is_available': False}, {'id': self.theirs.pk, 'is_available': False},
+                           {'id': 999999, 'is_available': False}],
+            'rooms': [{'id': self.my_room.pk, 'is_available': False}, {'id': self.their_room.pk, 'is_available': False}],
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['properties'], [{'id': self.mine.pk, 'is_available': False}])
+        self.assertEqual(body['rooms'], [{'id': self.my_room.pk, 'is_available': False}])
+        self.assertEqual(body['skipped'], {'properties': [self.theirs.pk, 999999], 'rooms': [self.their_room.pk]})
+
+        self.assertFalse(Property.objects.get(pk=self.mine.pk).is_available)
+        self.assertTrue(Property.objects.get(pk=self.theirs.pk).is_available)
+        self.assertTrue(Room.objects.get(pk=self.their_room.pk).is_available)
+
+    def test_reopening_sends_one_batch_signal(self):
+        Property.objects.filter(pk=self.mine.pk).update(is_available=False)
+        received = []
+        handler = lambda **kwargs: received.append(kwargs)
+        availability.availability_changed.connect(handler)
+        self.addCleanup(availability.availability_changed.disconnect, handler)
+
+        self._post({'properties': [{'id': self.mine.pk, 'is_available': True}]})
+        [kwargs] = received
+        self.assertEqual(kwargs['published_ids'], [self.mine.pk])
+        self.assertEqual(kwargs['properties'], {self.mine.pk: True})
+
+    def test_whatsapp_full_and_open(self):
+        reply, _ = whatsapp.handle_message(f"FULL {self.mine.pk} {self.theirs.pk}", 'whatsapp:+263770000001')
+        self.assertIn(f"Marked as ❌ FULL: {self.mine.pk}", reply)
+        self.assertIn(f"Not yours or not found: {self.theirs.pk}", reply)
+        self.assertFalse(Property.objects.get(pk=self.mine.pk).is_available)
+        self.assertTrue(Property.objects.get(pk=self.theirs.pk).is_available)
+
+        reply, _ = whatsapp.handle_message(f"open {self.mine.pk}", 'whatsapp:+263770000001')
+        self.assertIn("AVAILABLE", reply)
+        self.assertTrue(Property.objects.get(pk=self.mine.pk).is_available)
+
+    def test_whatsapp_bulk_commands_need_a_landlord(self):
+        reply, _ = whatsapp.handle_message(f"FULL {self.theirs.pk}", 'whatsapp:+263779999999')
+        self.assertIn("Only registered landlords", reply)
+
+    def test_whatsapp_rejects_non_numeric_ids(self):
+        reply, _ = whatsapp.handle_message("FULL 3 five", 'whatsapp:+263770000001')
+        self.assertIn("followed by their ID numbers", reply)
+
+
+class RoomSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        landlord = User.objects.create_user('owner', password='x')
+        cls.cheap = _listing(landlord, title="Cheap", price_per_month=100, has_wifi=True, latitude=-20.16, longitude=28.64)
+        cls.dear = _listing(landlord, title="Dear", price_per_month=300, latitude=-20.16, longitude=28.64)
+        cls.far = _listing(landlord, title="Far", price_per_month=100, latitude=-18.93, longitude=27.80)
+        cls.unplaced = _listing(landlord, title="Unplaced", price_per_month=100)
+        cls.full = _listing(landlord, title="Full", price_per_month=100, is_available=False)
+        for prop in (cls.cheap, cls.dear, cls.far, cls.unplaced, cls.full):
+            Room.objects.create(property=prop, label="Double", capacity=2)
+        Room.objects.create(property=cls.cheap, label="Double 2", capacity=2)
+        Room.objects.create(property=cls.cheap, label="Taken double", capacity=2, is_available=False)
+        Room.objects.create(property=cls.cheap, label="Dorm", capacity=6)
+
+    def setUp(self):
+        _fresh_snapshot()
+
+    def _get(self, **params):
+        response = self.client.get('/api/rooms/search/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_rooms_matching_size_and_listing_filters(self):
+        rooms = self._get(room_type='2', max_price=150)
+        self.assertEqual(sorted(room['label'] for room in rooms if room['property']['id'] == self.cheap.pk), ["Double", "Double 2"])
+        self.assertEqual({room['property']['title'] for room in rooms}, {"Cheap", "Far", "Unplaced"})
+        self.assertTrue(all(room['capacity'] == 2 and room['is_available'] for room in rooms))
+
+    def test_largest_size_means_that_many_or_more(self):
+        self.assertEqual([room['label'] for room in self._get(room_type='5+')], ["Dorm"])
+
+    def test_amenities_and_distance(self):
+        self.assertEqual({room['property']['title'] for room in self._get(amenities='wifi')}, {"Cheap"})
+        # Listings without coordinates pass the distance filter
+        self.assertEqual({room['property']['title'] for room in self._get(max_distance=5)}, {"Cheap", "Dear", "Unplaced"})
+
+    def test_group_by_property_summarises_matching_rooms(self):
+        properties = {row['title']: row for row in self._get(group='property', room_type='2', max_distance=5)}
+        self.assertEqual(set(properties), {"Cheap", "Dear", "Unplaced"})
+        self.assertEqual(properties["Cheap"]['matching_rooms'], {'count': 2, 'min_capacity': 2, 'max_capacity': 2})
+        self.assertLess(properties["Cheap"]['distance'], 1)
+        self.assertIsNone(properties["Unplaced"]['distance'])
+
+        any_size = {row['title']: row for row in self._get(group='property')}
+        self.assertEqual(any_size["Cheap"]['matching_rooms'], {'count': 3, 'min_capacity': 2, 'max_capacity': 6})
+
+    def test_unknown_campus_is_a_400(self):
+        self.assertEqual(self.client.get('/api/rooms/search/', {'campus': 'nowhere'}).status_code, 400)
+
+
+class ReviewPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.prop = _listing(User.objects.create_user('owner', password='x'))
+        # Several reviews share a timestamp, so the id tiebreak matters
+        same_time = timezone.now()
+        cls.reviews = []
+        for i in range(25):
+            review = Review.objects.create(property=cls.prop, user=User.objects.create_user(f'student{i}'), rating=i % 5 + 1, comment=f"r{i}")
+            cls.reviews.append(review)
+        Review.objects.filter(pk__in=[r.pk for r in cls.reviews[:10]]).update(created_at=same_time)
+
+    def _ids(self, url, **params):
+        data = self.client.get(url, params).json()
+        return [row['id'] for row in data['results']], data['next']
+
+    def test_pages_cover_every_review_once_newest_first(self):
+        url = f'/api/properties/{self.prop.pk}/reviews/'
+        seen, params = [], {'page_size': 10}
+        while url:
+            ids, url = self._ids(url, **params)
+            seen += ids
+            params = {}
+            if len(seen) == 10:
+                # A review posted mid-way doesn't shift the later pages
+                Review.objects.create(property=self.prop, user=User.objects.create_user('late'), rating=5, comment="late")
+        expected = list(Review.objects.filter(pk__in=[r.pk for r in self.reviews]).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        ids, _ = self._ids(f'/api/properties/{self.prop.pk}/reviews/', page_size=1000)
+        self.assertEqual(len(ids), 25)
+        with mock.patch.object(views.ReviewPagination, 'max_page_size', 5):
+            ids, _ = self._ids(f'/api/properties/{self.prop.pk}/reviews/', page_size=1000)
+        self.assertEqual(len(ids), 5)
+
+    def test_unknown_property_is_a_404(self):
+        self.assertEqual(self.client.get('/api/properties/999999/reviews/').status_code, 404)
+
+
+class ReviewAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.prop = _listing(User.objects.create_user('owner', password='x'))
+        cls.good = Review.objects.create(property=cls.prop, user=User.objects.create_user('a'), rating=5, comment="x")
+        cls.poor = Review.objects.create(property=cls.prop, user=User.objects.create_user('b'), rating=2, comment="x")
+
+    def _stats(self):
+        self.prop.refresh_from_db()
+        return self.prop.review_count, self.prop.rating_avg
+
+    def test_saving_and_deleting_reviews_keeps_the_numbers(self):
+        self.assertEqual(self._stats(), (2, 3.5))
+        self.poor.delete()
+        self.assertEqual(self._stats(), (1, 5.0))
+        self.good.delete()
+        self.assertEqual(self._stats(), (0, None))
+
+    def test_recompute_only_touches_drifted_rows(self):
+        self.assertEqual(Property.update_review_stats(dry_run=True), 0)
+        Property.objects.filter(pk=self.prop.pk).update(review_count=7)
+        self.assertEqual(Property.update_review_stats(dry_run=True), 1)
+        self.assertEqual(Property.update_review_stats(), 1)
+        self.assertEqual(self._stats(), (2, 3.5))
+
+
+class PropertyImportTests(TestCase):
+    csv = (
+        "ref,title,description,price_per_month,address,gender_preference,room_label,room_capacity\n"
+        "A1,Hillside Cottage,Quiet,120,12 Main Rd,Ladies,Room 1,2\n"
+        "A1,,,,,,Room 2,3\n"
+        "B1,Bad price,Quiet,lots,1 Rd,Mixed,Room 1,2\n"
+        "C1,Bad room,Quiet,90,2 Rd,Mixed,Room 1,many\n"
+        ",No ref,Quiet,90,3 Rd,Mixed,,\n"
+        "\n"
+        "D1,No rooms,Quiet,80,4 Rd,Gents,,\n"
+        "A1,Hillside again,Quiet,120,12 Main Rd,Ladies,Room 3,1\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.landlord = User.objects.create_user('agency', password='x')
+        cls.landlord.profile.role = 'landlord'
+        cls.landlord.profile.save()
+
+    def _upload(self, user, content, name='listings.csv'):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/properties/import/', {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def test_good_properties_go_in_and_bad_rows_are_reported_by_number(self):
+        with _background_inline(self):
+            response = self._upload(self.landlord, self.csv)
+        self.assertEqual(response.status_code, 201)
+        summary = response.json()
+        self.assertEqual((summary['properties'], summary['rooms']), (2, 2))
+        errors = {error['row']: error['errors'] for error in summary['errors']}
+        # Numbers are file lines: the blank line 7 still counts, so the stray A1 is line 9
+        self.assertEqual(sorted(errors), [4, 5, 6, 9])
+        self.assertIn('price_per_month', errors[4])
+        self.assertIn('room_capacity', errors[5])
+        self.assertIn('ref', errors[6])
+        self.assertIn('ref', errors[9])
+
+        hillside = Property.objects.get(landlord=self.landlord, title="Hillside Cottage")
+        self.assertEqual(sorted(hillside.rooms.values_list('label', 'capacity')), [("Room 1", 2), ("Room 2", 3)])
+        self.assertTrue(Property.objects.filter(landlord=self.landlord, title="No rooms", rooms=None).exists())
+        self.assertFalse(Property.objects.filter(title__in=["Bad price", "Bad room", "No ref"]).exists())
+
+    def test_small_batches_write_the_same_rows(self):
+        rows = imports.read_rows(io.BytesIO(self.csv.encode()), 'listings.csv')
+        with _background_inline(self):
+            summary = imports.import_properties(self.landlord, rows, batch_size=1)
+        self.assertEqual((summary['properties'], summary['rooms'], len(summary['errors'])), (2, 2, 4))
+
+    def test_nothing_imported_is_a_400(self):
+        response = self._upload(self.landlord, "ref,title\n,Nope\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['row'], 2)
+
+    def test_missing_header_is_a_400(self):
+        response = self._upload(self.landlord, "title,price_per_month\nCottage,100\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('file', response.json())
+
+    def test_students_cannot_import(self):
+        student = User.objects.create_user('student', password='x')
+        self.assertEqual(self._upload(student, self.csv).status_code, 403)
+
+
+class ReusedPhotoTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = FileSystemStorage(location=tmp.name)
+        patcher = mock.patch.object(photohash, 'default_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.owner = User.objects.create_user('owner', password='x')
+        self.copier = User.objects.create_user('copier', password='x')
+        self.original_listing = _listing(self.owner, title="Hillside Cottage")
+        self.copy_listing = _listing(self.copier, title="Cheap Cottage")
+
+    def _photo(self, name, seed, size=(320, 240)):
+        from PIL import Image, ImageFilter
+        rng = random.Random(seed)
+        image = Image.new('L', (16, 12))
+        image.putdata([rng.randrange(256) for _ in range(16 * 12)])
+        buffer = io.BytesIO()
+        image.resize(size, Image.Resampling.BILINEAR).filter(ImageFilter.GaussianBlur(2)).convert('RGB').save(buffer, 'JPEG', quality=70)
+        return self.storage.save(name, ContentFile(buffer.getvalue()))
+
+    def _image(self, prop, name):
+        # bulk_create: no upload signal, the check is run by hand below
+        [image] = PropertyImage.objects.bulk_create([PropertyImage(property=prop, image=name)])
+        return image
+
+    def test_another_landlords_copy_files_a_report(self):
+        original = self._image(self.original_listing, self._photo('a.jpg', seed=1))
+        photohash.check_image(original.pk)
+        # Same photo, smaller and recompressed
+        copy = self._image(self.copy_listing, self._photo('b.jpg', seed=1, size=(200, 150)))
+        photohash.check_image(copy.pk)
+
+        report = Report.objects.get()
+        self.assertEqual((report.property, report.duplicate_of, report.reason, report.reporter),
+                         (self.copy_listing, self.original_listing, 'fake', None))
+        self.assertIn(f"photo #{copy.pk} matches photo #{original.pk}", report.description)
+
+        # Checking again doesn't file a second report
+        photohash.check_image(copy.pk)
+        self.assertEqual(Report.objects.count(), 1)
+
+    def test_own_photos_and_different_photos_are_not_flagged(self):
+        first = self._image(self.original_listing, self._photo('a.jpg', seed=1))
+        photohash.check_image(first.pk)
+        same_landlord = _listing(self.owner, title="Hillside Cottage 2")
+        photohash.check_image(self._image(same_landlord, self._photo('b.jpg', seed=1)).pk)
+        photohash.check_image(self._image(self.copy_listing, self._photo('c.jpg', seed=2)).pk)
+        self.assertFalse(Report.objects.exists())
+
+    def test_backfill_pairs_match_the_table_lookup(self):
+        images = [
+            self._image(self.original_listing, self._photo('a.jpg', seed=1)),
+            self._image(self.copy_listing, self._photo('b.jpg', seed=1, size=(200, 150))),
+            self._image(self.copy_listing, self._photo('c.jpg', seed=2)),
+        ]
+        hashes = {image.pk: photohash.hash_file(image.image.name, self.storage) for image in images}
+        landlords = {image.pk: image.property.landlord_id for image in images}
+        pairs = list(photohash.find_pairs(hashes, landlords))
+        self.assertEqual([(a, b) for a, b, _ in pairs], [(images[0].pk, images[1].pk)])
+
+        photohash.save_hashes(hashes)
+        matches = photohash.find_matches(images[1].pk, hashes[images[1].pk], self.copier.pk)
+        self.assertEqual([pk for pk, _ in matches], [images[0].pk])
@@ -0,0 +1,229 @@
+"""
+Near-duplicate listing text: the same title/description pasted onto many
+Property rows, by one landlord padding out search results or by a scammer
+copying someone else's listing.
+
+Every property gets a MinHash signature (Property.minhash) of the word
+3-grams in its title and description. The share of positions where two
+signatures agree estimates how much of the two texts' shingles overlap
+(Jaccard similarity); SIMILARITY or more counts as a copy.
+
+The signature is cut into BANDS bands of ROWS values, and each band's hash is
+stored in ListingTextBand, indexed on (band, value) (locality-sensitive
+hashing). Listings that near-duplicate each other collide on some band with
+high probability; unrelated ones almost never do. A lookup fetches only the
+listings sharing a bucket, by index, and checks just those. A match files a
+Report with no reporter: 'fake' when the copy belongs to another landlord,
+'duplicate' when it's the same landlord's.
+"""
+import hashlib
+import re
+
+import numpy as np
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import ListingTextBand, Property, Report
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# Changing one word in twenty already takes a 3-gram Jaccard down to ~0.75. With 32 bands of 4 rows
+# pairs at this similarity share a bucket ~99% of the time, unrelated ones (~0.1) practically never
+SIMILARITY = 0.6
+SHINGLE_WORDS = 3
+# Texts this short ("Room to let") match each other by accident
+MIN_SHINGLES = 8
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: stored signatures must stay comparable across processes and deploys
+_rng = np.random.default_rng(48)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+_WORD = re.compile(r'\w+')
+
+
+def shingles(title, description):
+    """The set of word 3-grams, lowercased, as 32-bit hashes."""
+    words = _WORD.findall(f"{title} {description}".lower())
+    grams = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 0))}
+    return {int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=4).digest(), 'little') for gram in grams}
+
+
+def signature(title, description):
+    """MinHash signature as bytes (NUM_PERM uint32s), or None when there's too little text to judge."""
+    hashed = shingles(title, description)
+    if len(hashed) < MIN_SHINGLES:
+        return None
+    values = np.fromiter(hashed, dtype=np.uint64, count=len(hashed))
+    # (a*x + b) mod p for every shingle and permutation; uint64 overflow wraps, which the min doesn't mind
+    permuted = (np.outer(values, _A) + _B) % np.uint64(_PRIME) & np.uint64(_MAX_HASH)
+    return permuted.min(axis=0).astype('<u4').tobytes()
+
+
+def _array(sig):
+    return np.frombuffer(bytes(sig), dtype='<u4')
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(_array(a) == _array(b)))
+
+
+def bands(sig):
+    """[(band number, signed 64-bit bucket hash)] of a signature."""
+    raw = bytes(sig)
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(), 'little', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def save_signatures(signatures):
+    """signatures: {property id: signature or None}. Stores them and replaces the properties' bucket rows."""
+    properties = [Property(id=pk, minhash=sig) for pk, sig in signatures.items()]
+    with transaction.atomic():
+        # Not Property.save(): a signature isn't something the change feed should see
+        Property.objects.bulk_update(properties, ['minhash'], batch_size=1000)
+        ListingTextBand.objects.filter(property_id__in=list(signatures)).delete()
+        ListingTextBand.objects.bulk_create(
+            [ListingTextBand(property_id=pk, band=band, value=value)
+             for pk, sig in signatures.items() if sig is not None for band, value in bands(sig)],
+            batch_size=2000,
+        )
+
+
+def find_matches(property_id, sig):
+    """[(other property id, similarity)] of listings at SIMILARITY or more, most similar first."""
+    lookup = Q()
+    for band, value in bands(sig):
+        lookup |= Q(band=band, value=value)
+    candidates = (
+        ListingTextBand.objects.filter(lookup).exclude(property_id=property_id)
+        .values_list('property_id', 'property__minhash').distinct()
+    )
+    matches = [(pk, similarity(sig, other)) for pk, other in candidates if other is not None]
+    return sorted((match for match in matches if match[1] >= SIMILARITY), key=lambda match: -match[1])
+
+
+def flag(prop, original, score):
+    """Files one automatic Report on prop pointing at the listing its text copies, unless there is one."""
+    if Report.objects.filter(property=prop, duplicate_of=original, reporter__isnull=True).exists():
+        return None
+    same_landlord = prop.landlord_id == original.landlord_id
+    return Report.objects.create(
+        reporter=None,
+        property=prop,
+        duplicate_of=original,
+        reason='duplicate' if same_landlord else 'fake',
+        description=(
+            f"Automatic: the title and description are ~{score:.0%} the same as '{original.title}' "
+            f"(#{original.pk}, {'same landlord' if same_landlord else f'landlord {original.landlord.username}'})."
+        ),
+    )
+
+
+def _flag_copy(prop, sig):
+    matches = find_matches(prop.pk, sig)
+    # Only the oldest copy is reported against; the rest of the cluster shows up in the admin
+    older = [match for match in matches if match[0] < prop.pk]
+    if older:
+        best = min(older, key=lambda match: match[0])
+        flag(prop, Property.objects.select_related('landlord').get(pk=best[0]), best[1])
+
+
+def check_property(property_id):
+    """Re-sign one listing after its text changed and flag it if it copies an older one (run in the background)."""
+    prop = Property.objects.select_related('landlord').filter(pk=property_id).first()
+    if prop is None:
+        return
+    sig = signature(prop.title, prop.description)
+    save_signatures({prop.pk: sig})
+    if sig is not None:
+        _flag_copy(prop, sig)
+
+
+def check_properties(property_ids):
+    """check_property for a batch created without post_save (bulk imports): signed and saved together, then checked."""
+    properties = Property.objects.select_related('landlord').in_bulk(property_ids)
+    signatures = {pk: signature(prop.title, prop.description) for pk, prop in properties.items()}
+    save_signatures(signatures)
+    # Oldest first, so copies within the batch are reported against the first of them
+    for pk in sorted(signatures):
+        if signatures[pk] is not None:
+            _flag_copy(properties[pk], signatures[pk])
+
+
+def _close_pairs(sigs, block=256):
+    """(i, j, similarity) for i < j at SIMILARITY or more, a block of rows at a time."""
+    for start in range(0, len(sigs), block):
+        rows = sigs[start:start + block]
+        scores = (rows[:, None, :] == sigs[None, start:, :]).mean(axis=2)
+        close = (scores >= SIMILARITY) & np.triu(np.ones(scores.shape, dtype=bool), k=1)
+        for i, j in zip(*np.nonzero(close)):
+            yield start + i, start + j, float(scores[i, j])
+
+
+def find_pairs(signatures):
+    """
+    All near-duplicate pairs among {property id: signature}, with the same banding
+    as the table, in memory: group by each band and compare only within groups,
+    vectorised. Yields (older id, newer id, similarity).
+    """
+    signatures = {pk: sig for pk, sig in signatures.items() if sig is not None}
+    if not signatures:
+        return
+    ids = np.fromiter(signatures, dtype=np.int64, count=len(signatures))
+    sigs = np.stack([_array(sig) for sig in signatures.values()])
+
+    found = {}
+    for band in range(BANDS):
+        keys = np.ascontiguousarray(sigs[:, band * ROWS:(band + 1) * ROWS]).view(np.dtype((np.void, ROWS * 4))).ravel()
+        _, groups = np.unique(keys, return_inverse=True)
+        order = np.argsort(groups, kind='stable')
+        for group in np.split(order, np.flatnonzero(np.diff(groups[order])) + 1):
+            if len(group) < 2:
+                continue
+            for i, j, score in _close_pairs(sigs[group]):
+                a, b = sorted((int(ids[group[i]]), int(ids[group[j]])))
+                found[a, b] = score
+    for (a, b), score in sorted(found.items()):
+        yield a, b, score
+
+
+def clusters():
+    """
+    Groups of near-duplicate listings, largest first, as [(oldest id, [(id, similarity to the oldest)])].
+    Only listings sharing a bucket with another one are loaded.
+    """
+    shared = ListingTextBand.objects.filter(band=OuterRef('band'), value=OuterRef('value')).exclude(property_id=OuterRef('property_id'))
+    candidate_ids = ListingTextBand.objects.filter(Exists(shared)).values('property_id')
+    signatures = dict(Property.objects.filter(id__in=candidate_ids).values_list('id', 'minhash'))
+
+    parent = {}
+
+    def root(pk):
+        while parent.get(pk, pk) != pk:
+            # Path halving: point pk at its grandparent, then step there
+            parent[pk] = parent.get(parent[pk], parent[pk])
+            pk = parent[pk]
+        return pk
+
+    for a, b, _ in find_pairs(signatures):
+        ra, rb = root(a), root(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    groups = {}
+    for pk in list(parent):
+        groups.setdefault(root(pk), set()).add(pk)
+    result = []
+    for oldest, members in groups.items():
+        members.add(oldest)
+        scored = [(pk, similarity(signatures[oldest], signatures[pk])) for pk in sorted(members)]
+        result.append((oldest, scored))
+    return sorted(result, key=lambda cluster: (-len(cluster[1]), cluster[0]))
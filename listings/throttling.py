@@ -0,0 +1,142 @@
+"""
+Token-bucket rate limits for the unauthenticated endpoints (WhatsApp webhook,
+register, password reset, JWT token).
+
+Each key (sender phone, client IP, username, ...) gets a bucket of `count`
+tokens that refills at count/period. A request takes one token or is turned
+away before the view touches the database. Buckets live in this process by
+default; set THROTTLE_BACKEND = 'cache' to share them between workers through
+the Django cache (THROTTLE_CACHE alias).
+
+Per-IP buckets trust X-Forwarded-For only as far as REST_FRAMEWORK['NUM_PROXIES']
+says there are proxies in front of us; set it to match the deployment, or a
+client can pick a fresh "IP" per request by rotating the header.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'sec': 1, 'min': 60, 'hour': 3600, 'day': 86400}
+
+DEFAULT_RATES = {
+    'whatsapp': '20/min',        # per sender phone
+    'register': '10/hour',       # per IP
+    'password_reset': '5/hour',  # per IP
+    'password_reset_email': '3/hour',
+    'token': '30/min',           # per IP
+    'token_user': '10/min',      # per username
+}
+
+
+def parse_rate(rate):
+    """'20/min' -> (capacity, tokens per second)."""
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period]
+
+
+class LocalBucketStore:
+    """Buckets in a bounded in-process LRU."""
+    def __init__(self, max_keys=50000):
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+        self.max_keys = max_keys
+
+    def take(self, key, capacity, refill):
+        now = time.monotonic()
+        with self.lock:
+            tokens, stamp = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / refill
+
+
+class CacheBucketStore:
+    """Buckets in a shared Django cache. Not atomic: racing workers can let a few extra requests through."""
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, refill):
+        now = time.time()
+        tokens, stamp = self.cache.get(f'bucket:{key}', (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * refill)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Kept until the bucket would be full again anyway
+        self.cache.set(f'bucket:{key}', (tokens, now), int((capacity - tokens) / refill) + 1)
+        return allowed, 0 if allowed else (1 - tokens) / refill
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if getattr(settings, 'THROTTLE_BACKEND', 'local') == 'cache':
+                    _store = CacheBucketStore(getattr(settings, 'THROTTLE_CACHE', 'default'))
+                else:
+                    _store = LocalBucketStore()
+    return _store
+
+
+def allow(scope, ident):
+    """(allowed, seconds to wait) for one request by `ident` against the `scope` rate."""
+    rates = {**DEFAULT_RATES, **getattr(settings, 'THROTTLE_RATES', {})}
+    if not ident or rates.get(scope) is None:
+        return True, 0
+    capacity, refill = parse_rate(rates[scope])
+    return get_store().take(f'{scope}:{ident}', capacity, refill)
+
+
+class BucketThrottle(BaseThrottle):
+    """DRF throttle over allow(); subclasses pick the scope and what identifies the caller."""
+    scope = None
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        allowed, self.wait_seconds = allow(self.scope, self.get_key(request))
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class RegisterThrottle(BucketThrottle):
+    scope = 'register'
+
+
+class PasswordResetThrottle(BucketThrottle):
+    scope = 'password_reset'
+
+
+class PasswordResetEmailThrottle(BucketThrottle):
+    scope = 'password_reset_email'
+
+    def get_key(self, request):
+        return str(request.data.get('email', '')).strip().lower()
+
+
+class TokenThrottle(BucketThrottle):
+    scope = 'token'
+
+
+class TokenUserThrottle(BucketThrottle):
+    scope = 'token_user'
+
+    def get_key(self, request):
+        return str(request.data.get('username', '')).strip().lower()
@@ -1,40 +1,48 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
 from .views import (
     PropertyViewSet, 
     BookingViewSet,
+    CampusViewSet,
+    SavedSearchViewSet,
     RegisterView, 
+    ThrottledTokenObtainPairView,
+    ThrottledTokenRefreshView,
     CreateReviewView,
+    PropertyReviewsView,
+    ExportView,
     PropertyImageCreateView,
     UserInfoView,
     RequestPasswordResetView,
     PasswordResetConfirmView,
     RoomCreateView,
     RoomDetailView,
+    RoomSearchView,
+    BulkAvailabilityView,
     WhatsAppWebhookView,  # <--- NEW: Imported the Twilio webhook view
 )
+from . import async_views
 
 # 1. The Router handles all the standard "CRUD" URLs automatically
 router = DefaultRouter()
 router.register(r'properties', PropertyViewSet)
 router.register(r'bookings', BookingViewSet, basename='booking')
+router.register(r'saved-searches', SavedSearchViewSet, basename='saved-search')
+router.register(r'campuses', CampusViewSet)
 
 urlpatterns = [
     # Router URLs (Properties & Bookings)
     path('', include(router.urls)),
 
     # 2. Authentication URLs
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/', ThrottledTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', ThrottledTokenRefreshView.as_view(), name='token_refresh'),
     path('register/', RegisterView.as_view(), name='register'),
 
     # 3. Custom Action URLs
     # Reviews
     path('properties/<int:pk>/review/', CreateReviewView.as_view(), name='create-review'),
+    path('properties/<int:pk>/reviews/', PropertyReviewsView.as_view(), name='property-reviews'),
     
     # Image Upload
     path('upload-image/', PropertyImageCreateView.as_view(), name='upload-image'),
@@ -48,8 +56,18 @@ urlpatterns = [
     
     # Rooms
     path('rooms/', RoomCreateView.as_view(), name='create-room'),
+    path('rooms/search/', RoomSearchView.as_view(), name='room-search'),
     path('rooms/<int:pk>/', RoomDetailView.as_view(), name='room-detail'),
+    path('availability/', BulkAvailabilityView.as_view(), name='bulk-availability'),
     
+    # Exports (streamed CSV / NDJSON)
+    path('export/<slug:name>.<slug:fmt>', ExportView.as_view(), name='export'),
+
     # 5. WhatsApp Webhook (The Bot Endpoint)
     path('whatsapp/', WhatsAppWebhookView.as_view(), name='whatsapp-webhook'),
+
+    # 6. Async (ASGI) versions of the hot read paths and the webhook
+    path('async/properties/', async_views.property_list, name='async-property-list'),
+    path('async/properties/<int:pk>/', async_views.property_detail, name='async-property-detail'),
+    path('async/whatsapp/', async_views.whatsapp_webhook, name='async-whatsapp-webhook'),
 ]
\ No newline at end of file
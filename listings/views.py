@@ -1,34 +1,55 @@
-from django.utils import timezone
-from twilio.rest import Client
+import logging
+
 from django.shortcuts import render
 from rest_framework import viewsets, generics, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
 from django.contrib.auth.models import User
-from django.db.models import Q 
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Exists, F, FilteredRelation, OuterRef, Subquery
 from rest_framework.views import APIView
-from rest_framework.exceptions import PermissionDenied
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework.exceptions import PermissionDenied, NotFound, ValidationError
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 
-# --- NEW: Twilio specific imports ---
-from django.http import HttpResponse
-from twilio.twiml.messaging_response import MessagingResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
 
-from .models import Property, PropertyImage, Review, Booking, Report, Profile, Room
+from .models import Campus, Property, PropertyImage, Review, Booking, Report, Profile, Room, SavedSearch
 from .serializers import (
     PropertySerializer, 
     PropertyImageSerializer, 
+    CampusSerializer,
     BookingSerializer, 
     UserSerializer, 
     ReviewSerializer,
     ProfileSerializer,
     RoomSerializer,
+    SavedSearchSerializer,
+    BulkAvailabilitySerializer,
+    RoomSearchResultSerializer,
+    PropertyRoomMatchSerializer,
+    latest_reviews_prefetch,
+)
+from .whatsapp import handle_message, send_whatsapp, twiml_reply
+from . import campuses, changefeed, exports, facets, imports, maptiles, ranking, roomsearch, similarity, throttling
+from .throttling import (
+    RegisterThrottle,
+    PasswordResetThrottle,
+    PasswordResetEmailThrottle,
+    TokenThrottle,
+    TokenUserThrottle,
 )
+from .availability import set_availability
+from .idempotency import Replay, fingerprint
+
+logger = logging.getLogger(__name__)
 
 # 1. PROPERTY VIEWSET
 class PropertyViewSet(viewsets.ModelViewSet):
@@ -36,6 +57,61 @@ class PropertyViewSet(viewsets.ModelViewSet):
     serializer_class = PropertySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        # Only join/prefetch what the requested shape (?fields= / ?expand=) will render
+        wants = lambda *names: PropertySerializer.wants(self.request, *names)
+        queryset = Property.objects.all()
+
+        if wants('landlord_profile_picture', 'landlord_phone', 'landlord_bio', 'landlord_company'):
+            queryset = queryset.select_related('landlord__profile')
+        elif wants('landlord_name'):
+            queryset = queryset.select_related('landlord')
+        if not wants('description'):
+            queryset = queryset.defer('description')
+
+        if wants('images'):
+            queryset = queryset.prefetch_related('images__room')
+        if wants('reviews'):
+            queryset = queryset.prefetch_related(latest_reviews_prefetch())
+        if wants('rooms'):
+            queryset = queryset.prefetch_related('rooms')
+
+        if wants('cover_image'):
+            first_image = PropertyImage.objects.filter(property=OuterRef('pk')).order_by('id').values('image')[:1]
+            queryset = queryset.annotate(cover_image_name=Subquery(first_image))
+        if wants('is_favorited') and self.request.user.is_authenticated:
+            favorited = Property.favorited_by.through.objects.filter(property=OuterRef('pk'), user=self.request.user)
+            queryset = queryset.annotate(is_favorited_flag=Exists(favorited))
+
+        # ?campus= / ?max_distance= / ?ordering=distance: join the precomputed distance to that campus (or the default one)
+        params = self.request.query_params
+        if params.get('campus') or params.get('max_distance') or params.get('ordering') == 'distance':
+            campus = self.get_campus() or campuses.default_campus()
+            queryset = queryset.annotate(
+                campus_km=FilteredRelation('campus_distances', condition=Q(campus_distances__campus=campus)),
+                campus_distance=F('campus_km__distance_km'),
+            )
+            if params.get('max_distance'):
+                try:
+                    max_distance = float(params['max_distance'])
+                except ValueError:
+                    raise ValidationError("max_distance must be a number of km.")
+                # Listings without coordinates stay in, like on the listings page
+                queryset = queryset.filter(Q(campus_distance__lte=max_distance) | Q(latitude__isnull=True))
+            if params.get('ordering') == 'distance':
+                queryset = queryset.order_by(F('campus_distance').asc(nulls_last=True), 'id')
+
+        return queryset
+
+    def get_campus(self):
+        try:
+            return campuses.resolve(self.request.query_params.get('campus'))
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'campus': self.get_campus()}
+
     def perform_create(self, serializer):
         serializer.save(landlord=self.request.user)
 
@@ -51,9 +127,101 @@ class PropertyViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You can only delete your own properties.")
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('ordering') != 'value_score':
+            return super().list(request, *args, **kwargs)
+
+        # Best value first, scored in one pass over the in-memory feature snapshot
+        weights = ranking.parse_weights(request.query_params.get('weights'))
+        position = {pk: i for i, (pk, score) in enumerate(ranking.rank(weights=weights, campus=self.get_campus()))}
+        queryset = self.filter_queryset(self.get_queryset()).filter(is_available=True)
+        properties = sorted(queryset, key=lambda p: position.get(p.id, len(position)))
+        serializer = self.get_serializer(properties, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        # Sidebar counts for the current filters, from the in-memory snapshot
+        try:
+            return Response(facets.facets(request.query_params))
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        # Delta sync: what changed or was deleted since ?since=<token> (every listing when there's no token)
+        try:
+            properties, removed, token, reset = changefeed.changes(
+                self.filter_queryset(self.get_queryset()), request.query_params.get('since'))
+        except ValueError as e:
+            raise ValidationError(str(e))
+        serializer = self.get_serializer(properties, many=True)
+        response = Response({'token': token, 'reset': reset, 'changed': serializer.data, 'removed': removed})
+        # A cached copy only delays the client's token a little, it never skips a change;
+        # but is_favorited is per user, so only anonymous answers are shared
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=30)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    @action(detail=False, methods=['get'], url_path='map')
+    def map_tiles(self, request):
+        # Clusters (low zoom) or slim points (high zoom) for ?tile=z/x/y or ?bbox=west,south,east,north&zoom=z
+        only_available = request.query_params.get('only_available', '').lower() in ('1', 'true', 'yes')
+        try:
+            if 'tile' in request.query_params:
+                z, x, y = (int(part) for part in request.query_params['tile'].split('/'))
+                if not (0 <= z <= maptiles.MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+                    raise ValueError
+                response = Response(maptiles.get_tile(z, x, y, only_available))
+                patch_cache_control(response, public=True, max_age=60)
+                return response
+
+            west, south, east, north = (float(part) for part in request.query_params['bbox'].split(','))
+            z = min(max(int(request.query_params.get('zoom', 13)), 0), maptiles.MAX_ZOOM)
+        except (KeyError, ValueError):
+            raise ValidationError("Pass tile=z/x/y, or bbox=west,south,east,north with zoom.")
+
+        data = maptiles.get_bbox(south, west, north, east, z, only_available)
+        if data is None:
+            raise ValidationError("That bounding box is too large for this zoom level.")
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        # Nearest available listings in feature space, from the in-memory KD-tree
+        try:
+            k = min(max(int(request.query_params.get('k', 5)), 1), 20)
+        except ValueError:
+            k = 5
+        # Same lookup (and 404 for a missing or malformed id) as the detail route
+        property_id = self.get_object().pk
+
+        position = {pk: i for i, (pk, distance) in enumerate(similarity.similar_properties(property_id, k))}
+        properties = sorted(self.get_queryset().filter(id__in=position), key=lambda p: position[p.id])
+        serializer = self.get_serializer(properties, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAuthenticated],
+            parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        # CSV/XLSX upload of many properties and rooms at once (layout in listings/imports.py)
+        if request.user.profile.role != 'landlord':
+            raise PermissionDenied("Only landlords can import properties.")
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"file": "Upload a CSV or XLSX file."})
+        try:
+            summary = imports.import_properties(request.user, imports.read_rows(upload.file, upload.name))
+        except ValueError as e:
+            raise ValidationError({"file": str(e)})
+        return Response(summary, status=201 if summary['properties'] else 400)
+
     @action(detail=False, methods=['get'])
     def my_listings(self, request):
-        properties = self.queryset.filter(landlord=request.user)
+        properties = self.get_queryset().filter(landlord=request.user)
         serializer = self.get_serializer(properties, many=True)
         return Response(serializer.data)
 
@@ -71,7 +239,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def favorites(self, request):
-        favorited_properties = Property.objects.filter(favorited_by=request.user)
+        favorited_properties = self.get_queryset().filter(favorited_by=request.user)
         serializer = self.get_serializer(favorited_properties, many=True)
         return Response(serializer.data)
 
@@ -99,12 +267,72 @@ class BookingViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return Booking.objects.filter(
+        queryset = Booking.objects.filter(
             Q(student=user) | Q(property__landlord=user)
         ).distinct().order_by('-created_at')
+        return self.shape_queryset(queryset)
+
+    def shape_queryset(self, queryset):
+        # Join only the relations the requested fields (?fields= / ?expand=) read
+        wants = lambda *names: BookingSerializer.wants(self.request, *names)
+        related = []
+        if wants('property_detail'):
+            related.append('property__landlord__profile')
+            queryset = queryset.prefetch_related('property__images__room', latest_reviews_prefetch('property__'), 'property__rooms')
+        elif wants('landlord_phone'):
+            related.append('property__landlord__profile')
+        elif wants('property_title'):
+            related.append('property')
+        if wants('room_label'):
+            related.append('room')
+        if wants('student_program', 'student_year', 'student_phone'):
+            related.append('student__profile')
+        elif wants('student_name'):
+            related.append('student')
+        return queryset.select_related(*related) if related else queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if BookingSerializer.wants(self.request, 'property_detail') and self.request.user.is_authenticated:
+            # One query for the nested is_favorited flags instead of one per booking
+            context['favorite_ids'] = set(self.request.user.favorite_properties.values_list('id', flat=True))
+        return context
+
+    def create(self, request, *args, **kwargs):
+        # Idempotency-Key: a repeated POST (double click, client retry) gets the first response back
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 200:
+            raise ValidationError({"Idempotency-Key": "Use at most 200 characters."})
+
+        replay = Replay('booking', request.user.pk, key, fingerprint(request.data))
+        stored, busy = replay.begin()
+        if busy:
+            return Response({"detail": "A request with this Idempotency-Key is still being processed."}, status=409)
+        if stored is not None:
+            request_fingerprint, (status_code, data) = stored
+            if request_fingerprint != replay.request_fingerprint:
+                return Response({"detail": "This Idempotency-Key was already used for a different request."}, status=422)
+            response = Response(data, status=status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            replay.release()
+            raise
+        replay.store((response.status_code, dict(response.data)))
+        return response
 
     def perform_create(self, serializer):
-        booking = serializer.save(student=self.request.user)
+        try:
+            with transaction.atomic():
+                booking = serializer.save(student=self.request.user)
+        except IntegrityError:
+            # The pending-booking unique constraints caught a duplicate that slipped past the checks above
+            raise ValidationError("You already have a pending request for this property.")
         landlord_email = booking.property.landlord.email
         if landlord_email:
             send_mail(
@@ -131,15 +359,40 @@ class BookingViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def manage(self, request):
-        bookings = Booking.objects.filter(property__landlord=request.user).order_by('-created_at')
+        bookings = self.shape_queryset(Booking.objects.filter(property__landlord=request.user).order_by('-created_at'))
         serializer = self.get_serializer(bookings, many=True)
         return Response(serializer.data)
     
+# 2b. SAVED SEARCHES (alerts are sent from listings/alerts.py)
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        # The radius is from the student's own campus unless the search names another
+        campus = serializer.validated_data.get('campus', self.request.user.profile.campus)
+        serializer.save(user=self.request.user, campus=campus)
+
 # 3. SPECIALIZED VIEWS
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    # No auth lookup, so a throttled request never reaches the database
+    authentication_classes = []
+    throttle_classes = [RegisterThrottle]
+
+
+# JWT login / refresh with per-IP and per-username limits (PBKDF2 makes every login attempt expensive)
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    throttle_classes = [TokenThrottle, TokenUserThrottle]
+
+
+class ThrottledTokenRefreshView(TokenRefreshView):
+    throttle_classes = [TokenThrottle]
 
 class PropertyImageCreateView(generics.CreateAPIView):
     queryset = PropertyImage.objects.all()
@@ -156,6 +409,52 @@ class CreateReviewView(generics.CreateAPIView):
         property_instance = Property.objects.get(pk=property_id)
         serializer.save(user=self.request.user, property=property_instance)
 
+class ReviewPagination(CursorPagination):
+    # Keyset pages: stable while new reviews arrive, and no OFFSET scan on popular listings
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+
+class PropertyReviewsView(generics.ListAPIView):
+    serializer_class = ReviewSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = ReviewPagination
+
+    def get_queryset(self):
+        if not Property.objects.filter(pk=self.kwargs['pk']).exists():
+            raise NotFound()
+        return Review.objects.filter(property_id=self.kwargs['pk']).select_related('user')
+
+class ExportView(APIView):
+    # Streams /api/export/<properties|bookings|reviews|reports>.<csv|ndjson>?since=&until=&landlord=
+    # Staff can export everything; landlords only rows for their own properties (and no reports).
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, name, fmt):
+        if name not in exports.EXPORTS or fmt not in exports.FORMATS:
+            raise NotFound()
+
+        landlord = request.query_params.get('landlord') or None
+        if landlord is not None and not landlord.isdigit():
+            raise ValidationError("landlord must be a user id.")
+        if not request.user.is_staff:
+            if request.user.profile.role != 'landlord' or name == 'reports':
+                raise PermissionDenied("You don't have access to this export.")
+            landlord = request.user.id
+
+        filters = {'since': request.query_params.get('since'), 'until': request.query_params.get('until'), 'landlord': landlord}
+        try:
+            # Validate the filters up front so bad input is a 400, not a broken stream
+            exports.export_queryset(name, **filters)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        response = StreamingHttpResponse(exports.stream(name, fmt, **filters), content_type=exports.FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(name, fmt)}"'
+        return response
+
 # 4. USER INFO VIEW
 class UserInfoView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -179,11 +478,15 @@ class UserInfoView(APIView):
         serializer = ProfileSerializer(profile, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
+            # Listings show the landlord's name/phone/photo, so they count as changed
+            changefeed.touch(request.user.properties.values_list('id', flat=True))
             return Response(serializer.data)
         return Response(serializer.errors, status=400)
     
 class RequestPasswordResetView(APIView):
     permission_classes = [permissions.AllowAny] 
+    authentication_classes = []
+    throttle_classes = [PasswordResetThrottle, PasswordResetEmailThrottle]
 
     def post(self, request):
         email = request.data.get('email')
@@ -235,154 +538,81 @@ class RoomDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
 
+class RoomSearchView(generics.ListAPIView):
+    # ?room_type=2&max_price=120&max_distance=2 (same filters as the listings page);
+    # ?group=property returns properties with a matching_rooms summary instead of rooms
+    permission_classes = [permissions.AllowAny]
+    pagination_class = LimitOffsetPagination
+
+    def group_by_property(self):
+        return self.request.query_params.get('group') == 'property'
+
+    def get_queryset(self):
+        try:
+            if self.group_by_property():
+                return roomsearch.search_properties(self.request.query_params)
+            return roomsearch.search_rooms(self.request.query_params)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+    def get_serializer_class(self):
+        return PropertyRoomMatchSerializer if self.group_by_property() else RoomSearchResultSerializer
+
+
+class CampusViewSet(viewsets.ReadOnlyModelViewSet):
+    # The campuses ?campus= accepts (by slug or id), for the campus picker
+    queryset = Campus.objects.all()
+    serializer_class = CampusSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+
+class BulkAvailabilityView(APIView):
+    # Mark many properties/rooms full or available in one request (one UPDATE per model)
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkAvailabilitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = {
+            kind: {item['id']: item['is_available'] for item in serializer.validated_data.get(kind, [])}
+            for kind in ('properties', 'rooms')
+        }
+        return Response(set_availability(request.user, **changes))
+
+
 # 5. WHATSAPP BOT WEBHOOK
 class WhatsAppWebhookView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
 
     def post(self, request):
-        incoming_msg = request.data.get('Body', '').strip().lower()
-        sender_phone = request.data.get('From', '')
-
-        response = MessagingResponse()
-        msg = response.message()
+        # Over the per-sender limit: an empty reply, so Twilio neither retries nor messages the sender
+        if not throttling.allow('whatsapp', request.data.get('From', ''))[0]:
+            return HttpResponse(twiml_reply(''), content_type='application/xml')
 
-        # 1. THE STUDENT DISCOVERY COMMANDS
-        if 'hello' in incoming_msg or 'hi' in incoming_msg:
-            msg.body("Welcome to CampusAcc! 🎓\n\nLet's find your room. Reply with your maximum monthly budget (e.g., 150).")
-        
-        elif incoming_msg.isdigit():
-            budget = int(incoming_msg)
-            
-            total_matches = Property.objects.filter(price_per_month__lte=budget, is_available=True).count()
-            top_rooms = Property.objects.filter(price_per_month__lte=budget, is_available=True).order_by('price_per_month')[:5]
-            
-            if total_matches == 0:
-                msg.body(f"Sorry, I couldn't find any available rooms under ${budget} right now. 😔 Try replying with a slightly higher budget!")
-            else:
-                response_text = f"I found {total_matches} available rooms under ${budget}! 🎉\n\nHere are the top picks:\n\n"
-                
-                for prop in top_rooms[:3]:
-                    response_text += f"🏡 *{prop.title}*\n💰 ${prop.price_per_month}/month\n"
-                    if prop.address: response_text += f"📍 {prop.address}\n"
-                    
-                    perks = []
-                    if prop.has_wifi: perks.append("Wi-Fi")
-                    if prop.has_solar: perks.append("Solar")
-                    if prop.has_borehole: perks.append("Borehole")
-                    if perks: response_text += f"✨ {', '.join(perks)}\n"
-                        
-                    response_text += f"👉 Reply 'BOOK {prop.id}' to request.\n\n"
-                
-                if total_matches > 3:
-                    response_text += "*More options:*\n"
-                    for prop in top_rooms[3:5]:
-                        response_text += f"▪️ {prop.title} - ${prop.price_per_month}/mo\n"
-                
-                if total_matches > 5:
-                    remaining = total_matches - 5
-                    response_text += f"\n🌐 +{remaining} more listings found! View full galleries and chat with landlords here:\nhttps://studenthousing.co.zw/rooms"
-                else:
-                    response_text += "\n🌐 View full galleries and chat with landlords here:\nhttps://studenthousing.co.zw/rooms"
-                
-                msg.body(response_text)  
-       
-        elif incoming_msg.startswith('book '):
-            parts = incoming_msg.split()
-            if len(parts) >= 2 and parts[1].isdigit():
-                prop_id = int(parts[1])
-                try:
-                    prop = Property.objects.get(id=prop_id)
-                    clean_phone = sender_phone.replace('whatsapp:', '')
-                    profile = Profile.objects.filter(phone_number=clean_phone).first()
-                    
-                    if profile:
-                        user = profile.user
-                    else:
-                        user = User.objects.create_user(username=clean_phone, password='BotGeneratedPassword123!')
-                        user.profile.phone_number = clean_phone
-                        user.profile.save()
-                    
-                    if Booking.objects.filter(student=user).exists():
-                        msg.body("You've already used your free WhatsApp booking request! 🚀\n\nTo apply for more rooms and chat with landlords, log in to your dashboard here:\nhttps://studenthousing.co.zw/login")
-                    else:
-                        Booking.objects.create(
-                            property=prop,
-                            student=user,
-                            move_in_date=timezone.now().date(),
-                            message="This request was generated automatically via the CampusAcc WhatsApp Discovery Bot."
-                        )
-                        
-                        landlord_phone = prop.landlord.profile.phone_number
-                        if landlord_phone:
-                            if not landlord_phone.startswith('+'): landlord_phone = '+' + landlord_phone
-                            try:
-                                # SECURE IMPLEMENTATION: Pull credentials from settings
-                                client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-                                client.messages.create(
-                                    from_=settings.TWILIO_SANDBOX_NUMBER,
-                                    to=f'whatsapp:{landlord_phone}',
-                                    body=f"🚨 *New CampusAcc Booking!* 🚨\n\nA student ({clean_phone}) just requested to book '{prop.title}'.\n\nLog in to your dashboard to review and accept the request:\nhttps://studenthousing.co.zw/login"
-                                )
-                            except Exception as e:
-                                print(f"Failed to send WhatsApp to landlord: {e}")
-
-                        msg.body(f"✅ Success! Your booking request for '{prop.title}' has been sent directly to the landlord.\n\nThey will contact you right here on WhatsApp soon!")
-                except Property.DoesNotExist:
-                    msg.body("Oops! I couldn't find a property with that exact ID. 😔 Please check the number and try again.")
-            else:
-                msg.body("To book a room, reply with 'BOOK' followed by the ID number (e.g., BOOK 5).")
-
-        # --- NEW: THE LANDLORD DASHBOARD COMMAND ---
-        elif incoming_msg in ['update', 'manage']:
-            clean_phone = sender_phone.replace('whatsapp:', '')
-            profile = Profile.objects.filter(phone_number=clean_phone).first()
-            
-            # Security Check: Are they a registered landlord?
-            if profile and profile.role == 'landlord':
-                properties = Property.objects.filter(landlord=profile.user)
-                
-                if properties.exists():
-                    response_text = "🛠️ *Landlord Dashboard*\n\nHere are your properties:\n\n"
-                    for prop in properties:
-                        status = "✅ AVAILABLE" if prop.is_available else "❌ FULL"
-                        response_text += f"▪️ *{prop.title}*\n"
-                        response_text += f"   Status: {status}\n"
-                        response_text += f"   👉 Reply 'TOGGLE {prop.id}' to change.\n\n"
-                    msg.body(response_text)
-                else:
-                    msg.body("You don't have any properties listed yet! Log in to the website to add your first room.")
-            else:
-                msg.body("Only registered landlords can use the 'update' command. If you are a student looking for a room, try saying 'Hi' or replying with your budget!")
-
-        # --- NEW: THE LANDLORD TOGGLE COMMAND ---
-        elif incoming_msg.startswith('toggle '):
-            parts = incoming_msg.split()
-            if len(parts) >= 2 and parts[1].isdigit():
-                prop_id = int(parts[1])
-                clean_phone = sender_phone.replace('whatsapp:', '')
-                profile = Profile.objects.filter(phone_number=clean_phone).first()
-                
-                if profile and profile.role == 'landlord':
-                    try:
-                        # Double Security: Ensure this property actually belongs to THIS landlord
-                        prop = Property.objects.get(id=prop_id, landlord=profile.user)
-                        
-                        # Flip the boolean switch
-                        prop.is_available = not prop.is_available
-                        prop.save()
-                        
-                        new_status = "✅ AVAILABLE" if prop.is_available else "❌ FULL"
-                        msg.body(f"Success! 🔄\n\n*{prop.title}* is now marked as {new_status}.")
-                        
-                    except Property.DoesNotExist:
-                        msg.body("Oops! I couldn't find a property with that ID that belongs to you. Please check the list and try again.")
-                else:
-                    msg.body("Only registered landlords can toggle property statuses.")
-            else:
-                msg.body("To change a property status, reply with 'TOGGLE' followed by the ID number (e.g., TOGGLE 5).")
-
-        # 3. The Fallback (If they say something random)
-        else:
-            msg.body("I didn't quite catch that. Try saying 'Hi' to search for housing, or 'UPDATE' if you are a landlord!")
+        # Twilio retries deliveries it timed out on: answer those from the first run
+        replay = Replay('twilio', 'message', request.data.get('MessageSid', '')) if request.data.get('MessageSid') else None
+        if replay:
+            stored, busy = replay.begin()
+            if stored is not None or busy:
+                return HttpResponse(stored[1] if stored else twiml_reply(''), content_type='application/xml')
 
-        return HttpResponse(str(response), content_type='application/xml')
\ No newline at end of file
+        try:
+            reply, outbox = handle_message(request.data.get('Body', ''), request.data.get('From', ''))
+        except Exception:
+            if replay:
+                replay.release()
+            raise
+        twiml = twiml_reply(reply)
+        # Stored before the notifications go out, so a retry arriving meanwhile doesn't repeat them
+        if replay:
+            replay.store(twiml)
+
+        for to, body in outbox:
+            try:
+                send_whatsapp(to, body)
+            except Exception:
+                logger.exception("Failed to send WhatsApp to %s", to)
+
+        return HttpResponse(twiml, content_type='application/xml')
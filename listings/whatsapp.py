@@ -0,0 +1,257 @@
+"""
+The WhatsApp discovery bot.
+
+handle_message() works out the reply to an incoming message and any WhatsApp
+notifications it triggers. It does not send anything itself, so the sync
+webhook (views.WhatsAppWebhookView) and the async one (async_views.whatsapp_webhook)
+can deliver the notifications with a blocking or a non-blocking Twilio client.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Property, PropertyCampusDistance, Booking, Profile
+from . import campuses, ranking
+from .availability import set_availability
+
+
+# The Twilio SDK is only imported when a message actually comes in or goes out, so
+# workers that never serve the bot don't load it (see bench_startup)
+def twiml_reply(text):
+    from twilio.twiml.messaging_response import MessagingResponse
+
+    response = MessagingResponse()
+    if text:
+        response.message().body(text)
+    return str(response)
+
+
+def send_whatsapp(to, body):
+    from twilio.rest import Client
+
+    client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    client.messages.create(from_=settings.TWILIO_SANDBOX_NUMBER, to=to, body=body)
+
+
+async def send_whatsapp_async(to, body):
+    from twilio.http.async_http_client import AsyncTwilioHttpClient
+    from twilio.rest import Client
+
+    http_client = AsyncTwilioHttpClient()
+    try:
+        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+        await client.messages.create_async(from_=settings.TWILIO_SANDBOX_NUMBER, to=to, body=body)
+    finally:
+        await http_client.close()
+
+
+def _student(clean_phone):
+    """The profile for this number, creating a bot account the first time we need one."""
+    profile = Profile.objects.filter(phone_number=clean_phone).select_related('user', 'campus').first()
+    if profile:
+        return profile
+    user = User.objects.create_user(username=clean_phone, password='BotGeneratedPassword123!')
+    user.profile.phone_number = clean_phone
+    user.profile.save()
+    return user.profile
+
+
+def _campus_menu():
+    lines = [f"{i}. {campus.short_name} ({campus.city})" for i, campus in enumerate(campuses.all_campuses(), 1)]
+    return "\n".join(lines) + "\n\nReply 'CAMPUS' and the number (e.g., CAMPUS 1)."
+
+
+def _pick_campus(choice):
+    options = campuses.all_campuses()
+    if choice.isdigit() and 1 <= int(choice) <= len(options):
+        return options[int(choice) - 1]
+    try:
+        return campuses.resolve(choice)
+    except ValueError:
+        return None
+
+
+def handle_message(incoming_msg, sender_phone):
+    """Returns (reply_text, outbox) where outbox is a list of (to, body) WhatsApp messages."""
+    incoming_msg = incoming_msg.strip().lower()
+    outbox = []
+
+    # 1. THE STUDENT DISCOVERY COMMANDS
+    # --- NEW: CAMPUS PICKER (checked first: campus names can contain 'hi') ---
+    if incoming_msg == 'campus' or incoming_msg.startswith('campus '):
+        choice = incoming_msg[len('campus'):].strip()
+        campus = _pick_campus(choice) if choice else None
+        if campus is None:
+            return f"Which campus are you at? 🏫\n\n{_campus_menu()}", outbox
+
+        profile = _student(sender_phone.replace('whatsapp:', ''))
+        profile.campus = campus
+        profile.save(update_fields=['campus'])
+        return f"Got it, {campus.short_name}! 📍 I'll show you rooms by distance from there.\n\nReply with your maximum monthly budget (e.g., 150).", outbox
+
+    elif 'hello' in incoming_msg or 'hi' in incoming_msg:
+        profile = Profile.objects.filter(phone_number=sender_phone.replace('whatsapp:', '')).only('campus').first()
+        if len(campuses.all_campuses()) > 1 and not (profile and profile.campus_id):
+            return f"Welcome to CampusAcc! 🎓\n\nFirst, which campus are you at?\n\n{_campus_menu()}", outbox
+        return "Welcome to CampusAcc! 🎓\n\nLet's find your room. Reply with your maximum monthly budget (e.g., 150).", outbox
+
+    elif incoming_msg.isdigit():
+        budget = int(incoming_msg)
+        profile = Profile.objects.filter(phone_number=sender_phone.replace('whatsapp:', '')).select_related('campus').first()
+        campus = (profile.campus if profile else None) or campuses.default_campus()
+
+        total_matches = Property.objects.filter(price_per_month__lte=budget, is_available=True).count()
+
+        # Best value within budget rather than simply the cheapest, distance measured from the student's campus
+        top_ids = [pk for pk, score in ranking.rank(limit=5, max_price=budget, campus=campus)]
+        by_id = Property.objects.in_bulk(top_ids)
+        top_rooms = [by_id[pk] for pk in top_ids if pk in by_id]
+        distances = dict(
+            PropertyCampusDistance.objects.filter(campus=campus, property_id__in=top_ids).values_list('property_id', 'distance_km')
+        ) if campus else {}
+
+        if total_matches == 0:
+            return f"Sorry, I couldn't find any available rooms under ${budget} right now. 😔 Try replying with a slightly higher budget!", outbox
+
+        response_text = f"I found {total_matches} available rooms under ${budget}! 🎉\n\nHere are the top picks:\n\n"
+
+        for prop in top_rooms[:3]:
+            response_text += f"🏡 *{prop.title}*\n💰 ${prop.price_per_month}/month\n"
+            if prop.address: response_text += f"📍 {prop.address}\n"
+            if prop.id in distances: response_text += f"🚶 {distances[prop.id]:.1f} km from {campus.short_name}\n"
+
+            perks = []
+            if prop.has_wifi: perks.append("Wi-Fi")
+            if prop.has_solar: perks.append("Solar")
+            if prop.has_borehole: perks.append("Borehole")
+            if perks: response_text += f"✨ {', '.join(perks)}\n"
+
+            response_text += f"👉 Reply 'BOOK {prop.id}' to request.\n\n"
+
+        if total_matches > 3:
+            response_text += "*More options:*\n"
+            for prop in top_rooms[3:5]:
+                response_text += f"▪️ {prop.title} - ${prop.price_per_month}/mo\n"
+
+        if total_matches > 5:
+            remaining = total_matches - 5
+            response_text += f"\n🌐 +{remaining} more listings found! View full galleries and chat with landlords here:\nhttps://studenthousing.co.zw/rooms"
+        else:
+            response_text += "\n🌐 View full galleries and chat with landlords here:\nhttps://studenthousing.co.zw/rooms"
+
+        return response_text, outbox
+
+    elif incoming_msg.startswith('book '):
+        parts = incoming_msg.split()
+        if not (len(parts) >= 2 and parts[1].isdigit()):
+            return "To book a room, reply with 'BOOK' followed by the ID number (e.g., BOOK 5).", outbox
+
+        prop_id = int(parts[1])
+        try:
+            prop = Property.objects.select_related('landlord__profile').get(id=prop_id)
+        except Property.DoesNotExist:
+            return "Oops! I couldn't find a property with that exact ID. 😔 Please check the number and try again.", outbox
+
+        clean_phone = sender_phone.replace('whatsapp:', '')
+        user = _student(clean_phone).user
+
+        if Booking.objects.filter(student=user).exists():
+            return "You've already used your free WhatsApp booking request! 🚀\n\nTo apply for more rooms and chat with landlords, log in to your dashboard here:\nhttps://studenthousing.co.zw/login", outbox
+
+        try:
+            with transaction.atomic():
+                Booking.objects.create(
+                    property=prop,
+                    student=user,
+                    move_in_date=timezone.now().date(),
+                    message="This request was generated automatically via the CampusAcc WhatsApp Discovery Bot."
+                )
+        except IntegrityError:
+            # A duplicate delivery of the same BOOK message got here first
+            return f"Your booking request for '{prop.title}' is already with the landlord. They will contact you right here on WhatsApp soon!", outbox
+
+        landlord_phone = prop.landlord.profile.phone_number
+        if landlord_phone:
+            if not landlord_phone.startswith('+'): landlord_phone = '+' + landlord_phone
+            outbox.append((
+                f'whatsapp:{landlord_phone}',
+                f"🚨 *New CampusAcc Booking!* 🚨\n\nA student ({clean_phone}) just requested to book '{prop.title}'.\n\nLog in to your dashboard to review and accept the request:\nhttps://studenthousing.co.zw/login"
+            ))
+
+        return f"✅ Success! Your booking request for '{prop.title}' has been sent directly to the landlord.\n\nThey will contact you right here on WhatsApp soon!", outbox
+
+    # --- THE LANDLORD DASHBOARD COMMAND ---
+    elif incoming_msg in ['update', 'manage']:
+        clean_phone = sender_phone.replace('whatsapp:', '')
+        profile = Profile.objects.filter(phone_number=clean_phone).first()
+
+        # Security Check: Are they a registered landlord?
+        if not (profile and profile.role == 'landlord'):
+            return "Only registered landlords can use the 'update' command. If you are a student looking for a room, try saying 'Hi' or replying with your budget!", outbox
+
+        properties = Property.objects.filter(landlord=profile.user)
+        if not properties.exists():
+            return "You don't have any properties listed yet! Log in to the website to add your first room.", outbox
+
+        response_text = "🛠️ *Landlord Dashboard*\n\nHere are your properties:\n\n"
+        for prop in properties:
+            status = "✅ AVAILABLE" if prop.is_available else "❌ FULL"
+            response_text += f"▪️ *{prop.title}*\n"
+            response_text += f"   Status: {status}\n"
+            response_text += f"   👉 Reply 'TOGGLE {prop.id}' to change.\n\n"
+        response_text += "Tip: reply 'FULL 3 5 9' or 'OPEN 3 5 9' to update several at once."
+        return response_text, outbox
+
+    # --- THE LANDLORD TOGGLE COMMAND ---
+    elif incoming_msg.startswith('toggle '):
+        parts = incoming_msg.split()
+        if not (len(parts) >= 2 and parts[1].isdigit()):
+            return "To change a property status, reply with 'TOGGLE' followed by the ID number (e.g., TOGGLE 5).", outbox
+
+        prop_id = int(parts[1])
+        clean_phone = sender_phone.replace('whatsapp:', '')
+        profile = Profile.objects.filter(phone_number=clean_phone).first()
+
+        if not (profile and profile.role == 'landlord'):
+            return "Only registered landlords can toggle property statuses.", outbox
+
+        try:
+            # Double Security: Ensure this property actually belongs to THIS landlord
+            prop = Property.objects.get(id=prop_id, landlord=profile.user)
+        except Property.DoesNotExist:
+            return "Oops! I couldn't find a property with that ID that belongs to you. Please check the list and try again.", outbox
+
+        # Flip the boolean switch
+        prop.is_available = not prop.is_available
+        prop.save()
+
+        new_status = "✅ AVAILABLE" if prop.is_available else "❌ FULL"
+        return f"Success! 🔄\n\n*{prop.title}* is now marked as {new_status}.", outbox
+
+    # --- THE LANDLORD BULK COMMANDS (FULL 3 5 9 / OPEN 3 5 9) ---
+    elif incoming_msg.partition(' ')[0] in ('full', 'open'):
+        parts = incoming_msg.split()
+        command = parts[0].upper()
+        ids = [int(part) for part in parts[1:] if part.isdigit()]
+        if not ids or len(ids) != len(parts) - 1:
+            return f"To mark several properties at once, reply with '{command}' followed by their ID numbers (e.g., {command} 3 5 9).", outbox
+
+        clean_phone = sender_phone.replace('whatsapp:', '')
+        profile = Profile.objects.filter(phone_number=clean_phone).select_related('user').first()
+
+        if not (profile and profile.role == 'landlord'):
+            return f"Only registered landlords can use the '{command}' command.", outbox
+
+        result = set_availability(profile.user, properties={pk: command == 'OPEN' for pk in ids})
+        new_status = "✅ AVAILABLE" if command == 'OPEN' else "❌ FULL"
+        if not result['properties']:
+            return "Oops! None of those IDs belong to your properties. Reply 'UPDATE' to see your list.", outbox
+
+        response_text = f"Success! 🔄\n\nMarked as {new_status}: {', '.join(str(p['id']) for p in result['properties'])}"
+        if result['skipped']['properties']:
+            response_text += f"\n\nNot yours or not found: {', '.join(str(pk) for pk in result['skipped']['properties'])}"
+        return response_text, outbox
+
+    # 3. The Fallback (If they say something random)
+    return "I didn't quite catch that. Try saying 'Hi' to search for housing, 'CAMPUS' to change your campus, or 'UPDATE' if you are a landlord!", outbox